@@ -0,0 +1,225 @@
+"""Times each stage of the cleaning/plotting pipeline on synthetic LabVIEW exports.
+
+    python benchmarks/run_benchmarks.py --rows 1e4 1e5 1e6 --channels 40
+    python benchmarks/run_benchmarks.py --rows 1e5 --compare          # flag regressions
+
+Every run appends one JSON line per (rows, channels) case to benchmarks/history.jsonl with the
+best-of-`--repeat` time of each stage, so speedups and regressions can be compared across
+commits. Generated exports are cached in --data-dir and reused.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from magtrace.dataio import (LiveFileTail, combine_labview_headers, load_cleaned,  # noqa: E402
+                             read_labview_export)
+from magtrace.live import LiveRingBuffer  # noqa: E402
+from magtrace.processing import apply_scale_offset, clean_dataframe, combine_runs, filter_time  # noqa: E402
+from magtrace.synthetic import write_labview_export  # noqa: E402
+
+HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'history.jsonl')
+
+STAGES = ['header_parse', 'body_parse', 'time_filter', 'scale_offset', 'plot_render', 'save', 'combine', 'live_tail']
+
+# A stage counts as regressed when it is this much slower than the median of earlier runs
+REGRESSION_RATIO = 1.25
+
+
+class StageTimer:
+    """Keeps the best time of each named stage over repeated runs."""
+
+    def __init__(self):
+        self.times = {}
+
+    def add(self, name, seconds):
+        self.times[name] = min(seconds, self.times.get(name, float('inf')))
+
+    @contextlib.contextmanager
+    def __call__(self, name):
+        start = time.perf_counter()
+        yield
+        self.add(name, time.perf_counter() - start)
+
+
+def run_case(export_path, work_dir, timer):
+    # The cleaner's path: headers, body, time range with exclude regions, scale/offset, plot, save
+    with timer('header_parse'):
+        with open(export_path, 'r', encoding='utf-8') as f:
+            lines = [f.readline() for _ in range(4)]
+        combine_labview_headers(lines[2].strip().split(';'), lines[3].strip().split(';'))
+
+    with timer('body_parse'):
+        df = read_labview_export(export_path)
+        df['Timestamp'] = df['Timestamp'] / 1000 / 60
+
+    t_min, t_max = float(df['Timestamp'].min()), float(df['Timestamp'].max())
+    span = t_max - t_min
+    time_range = (t_min + 0.05 * span, t_max - 0.05 * span)
+    exclude_regions = [(t_min + f * span, t_min + (f + 0.02) * span) for f in (0.2, 0.5, 0.8)]
+    scales = {'CH1': '÷100', 'CH2': '÷1000', 'CH9(Hall sensor 1)': '÷10'}
+    offsets = {'CH1': 0.01, 'CH2': -0.002}
+
+    with timer('time_filter'):
+        filtered = filter_time(df, time_range, exclude_regions)
+
+    with timer('scale_offset'):
+        scaled = {col: apply_scale_offset(filtered[col], scale, offsets.get(col, 0.0))
+                  for col, scale in scales.items() if col in filtered.columns}
+
+    with timer('plot_render'):
+        # Same figure size as the cleaner, drawn with Agg so no display is needed
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        figure = Figure(figsize=(8, 6))
+        canvas = FigureCanvasAgg(figure)
+        ax = figure.add_subplot(111)
+        for col, values in scaled.items():
+            ax.plot(filtered['Timestamp'], values, label=col)
+        ax.legend()
+        canvas.draw()
+
+    cleaned_path = os.path.join(work_dir, 'cleaned.csv')
+    with timer('save'):
+        clean_dataframe(df, time_range, exclude_regions, scales, offsets).to_csv(cleaned_path, index=False)
+
+    combined_path = os.path.join(work_dir, 'combined.csv')
+    with timer('combine'):
+        combine_runs([load_cleaned(cleaned_path), load_cleaned(cleaned_path)]).to_csv(combined_path, index=False)
+
+    # The live viewer's path: the export grows in 64 KiB appends, each followed by a tail read
+    live_path = os.path.join(work_dir, 'live.txt')
+    with open(export_path, 'rb') as f:
+        head = b''.join(f.readline() for _ in range(4))
+        body = f.read()
+    with open(live_path, 'wb') as f:
+        f.write(head)
+    tail = LiveFileTail(live_path)
+    tail.read_header()
+    buffer = LiveRingBuffer(tail.columns, capacity=200000, time_column='Timestamp')
+    elapsed = 0.0
+    with open(live_path, 'ab') as f:
+        for start in range(0, len(body), 65536):
+            f.write(body[start:start + 65536])
+            f.flush()
+            t0 = time.perf_counter()
+            buffer.append(tail.read_new_rows())
+            elapsed += time.perf_counter() - t0
+    buffer.close()
+    timer.add('live_tail', elapsed)
+    return len(df)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(HISTORY_PATH)).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    import matplotlib
+    import pandas as pd
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'matplotlib': matplotlib.__version__,
+        'machine': platform.node(),
+        'platform': platform.platform(),
+    }
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(result, history):
+    # Median of earlier runs of the same case on the same machine
+    earlier = [h for h in history if h['rows'] == result['rows'] and h['channels'] == result['channels']
+               and h.get('env', {}).get('machine') == result['env']['machine']]
+    regressions = []
+    for stage, seconds in result['stages'].items():
+        previous = [h['stages'][stage] for h in earlier if stage in h['stages']]
+        if not previous:
+            continue
+        ratio = seconds / np.median(previous)
+        flag = 'REGRESSION' if ratio > REGRESSION_RATIO else ''
+        print(f"    {stage:<14} {ratio:5.2f}x of median of {len(previous)} run(s) {flag}")
+        if flag:
+            regressions.append(stage)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MagTrace pipeline on synthetic exports.")
+    parser.add_argument('--rows', nargs='+', type=float, default=[1e4, 1e5], help="row counts, e.g. 1e4 1e6")
+    parser.add_argument('--channels', nargs='+', type=int, default=[40], help="number of CH channels")
+    parser.add_argument('--repeat', type=int, default=3, help="best of this many runs per stage")
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'magtrace_bench'),
+                        help="where generated exports are cached")
+    parser.add_argument('--history', default=HISTORY_PATH)
+    parser.add_argument('--compare', action='store_true', help="compare with earlier runs in the history")
+    parser.add_argument('--fail-on-regression', action='store_true', help="exit with status 1 on a regression")
+    parser.add_argument('--no-record', action='store_true', help="do not append to the history")
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    history = load_history(args.history)
+    env = environment()
+    commit = git_commit()
+    regressed = False
+    for n_channels in args.channels:
+        for n_rows in (int(r) for r in args.rows):
+            export_path = os.path.join(args.data_dir, f"synthetic_{n_rows}_{n_channels}.txt")
+            if not os.path.exists(export_path):
+                print(f"Generating {n_rows} rows x {n_channels} channels ...")
+                write_labview_export(export_path + '.tmp', n_rows, n_channels)
+                os.replace(export_path + '.tmp', export_path)
+
+            timer = StageTimer()
+            for _ in range(args.repeat):
+                work_dir = tempfile.mkdtemp(prefix='magtrace_bench_')
+                try:
+                    run_case(export_path, work_dir, timer)
+                finally:
+                    shutil.rmtree(work_dir, ignore_errors=True)
+
+            result = {
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'commit': commit,
+                'rows': n_rows,
+                'channels': n_channels,
+                'file_mb': round(os.path.getsize(export_path) / 2 ** 20, 1),
+                'repeat': args.repeat,
+                'stages': {stage: round(timer.times[stage], 5) for stage in STAGES},
+                'env': env,
+            }
+            print(f"{n_rows} rows x {n_channels} channels ({result['file_mb']} MB):")
+            for stage in STAGES:
+                print(f"    {stage:<14} {1000 * result['stages'][stage]:10.1f} ms")
+            if args.compare and compare(result, history):
+                regressed = True
+            if not args.no_record:
+                with open(args.history, 'a') as f:
+                    f.write(json.dumps(result) + '\n')
+    if regressed and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,6 @@
+"""MagTrace core: loading, cleaning, resistance and live-stream logic without any GUI.
+
+Only numpy is imported up front; pandas and scipy are imported by the functions that need
+them, so `import magtrace.processing` stays cheap for scripts and worker processes.
+"""
+__version__ = '0.1.0'
@@ -0,0 +1,217 @@
+"""Time lag between two channels or two runs from their cross-correlation.
+
+    from magtrace.alignment import estimate_lag, shift_frame
+    lag = estimate_lag(df['Timestamp'], df['CH9'], df['Timestamp'], df['CH1'])
+    lag.lag_s                            # CH1 lags CH9 by this many seconds
+    aligned = shift_frame(other_run, -lag.lag_s)
+
+    python -m magtrace.alignment run_a.csv CH9 run_b.csv CH9
+
+Both signals are resampled onto uniform grids with the same period and correlated with
+FFTs in O(n log n); each lag is normalized over the overlapping parts only. With
+decimate > 1 the lag is first found on a grid `decimate` times coarser and then refined at
+full resolution in a window around it, which only costs a few dot products. For periodic
+signals such as repeated ramps, the coarse search prefers the lag with the most overlap.
+Shifts are applied lazily: the data is not rewritten, only its Timestamp (or the values
+read at a shifted time).
+"""
+import os
+import sys
+
+import numpy as np
+
+from .analysis import sample_interval
+from .resample import resample
+
+
+class Lag:
+    """Estimated lag of b behind a: b(t) is like a(t - lag_s)."""
+
+    def __init__(self, lag_s, correlation, period_s):
+        self.lag_s = lag_s
+        self.correlation = correlation  # normalized cross-correlation at the lag, in [-1, 1]
+        self.period_s = period_s        # resolution before sub-sample interpolation
+
+    def __repr__(self):
+        return f"Lag({self.lag_s:.6g} s, correlation {self.correlation:.3f})"
+
+
+def _prepare(values, differentiate):
+    # Zero-mean, unit-energy signal with NaN (gaps) as zeros, so they do not contribute
+    values = np.asarray(values, dtype=np.float64)
+    if differentiate:
+        values = np.diff(values, prepend=np.nan)
+    values = values - np.nanmean(values) if np.isfinite(values).any() else values
+    values = np.where(np.isfinite(values), values, 0.0)
+    norm = np.sqrt(np.sum(values ** 2))
+    return values / norm if norm > 0 else values
+
+
+def cross_correlation(a, b):
+    """Correlation c[k] = sum_i a[i] * b[i + k] for k = -(len(a) - 1) .. len(b) - 1, via FFT.
+
+    Returns (lags, c), lags in samples.
+    """
+    n = len(a) + len(b) - 1
+    n_fft = 1 << max(n - 1, 1).bit_length()
+    c = np.fft.irfft(np.conj(np.fft.rfft(a, n_fft)) * np.fft.rfft(b, n_fft), n_fft)
+    # Negative lags wrapped around to the end of the circular correlation
+    c = np.concatenate([c[n_fft - len(a) + 1:], c[:len(b)]])
+    return np.arange(-(len(a) - 1), len(b)), c
+
+
+def _direct(a, b, lags):
+    # The same correlation for a few lags only, by dot products of the overlapping parts
+    out = np.empty(len(lags))
+    for j, k in enumerate(lags):
+        if k >= 0:
+            m = min(len(a), len(b) - k)
+            out[j] = np.dot(a[:m], b[k:k + m]) if m > 0 else 0.0
+        else:
+            m = min(len(a) + k, len(b))
+            out[j] = np.dot(a[-k:-k + m], b[:m]) if m > 0 else 0.0
+    return out
+
+
+def _normalize(a, b, lags, c, min_overlap):
+    # Pearson coefficient over the overlapping parts only (their own means removed), so lags
+    # with less overlap are not penalized and drifting signals are not biased; lags overlapping
+    # less than min_overlap of the shorter signal are NaN
+    lags = np.asarray(lags)
+    start_a = np.maximum(-lags, 0)
+    start_b = np.maximum(lags, 0)
+    m = np.maximum(np.minimum(len(a) - start_a, len(b) - start_b), 0)
+
+    def window_sums(x, start):
+        # Sum and sum of squares of x[start:start + m] for every lag
+        sums = np.concatenate([[0.0], np.cumsum(x)])
+        squares = np.concatenate([[0.0], np.cumsum(x ** 2)])
+        lo, hi = np.minimum(start, len(x)), np.minimum(start + m, len(x))
+        return sums[hi] - sums[lo], squares[hi] - squares[lo]
+
+    sa, ea = window_sums(a, start_a)
+    sb, eb = window_sums(b, start_b)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = (c - sa * sb / m) / np.sqrt((ea - sa ** 2 / m) * (eb - sb ** 2 / m))
+    fraction = m / min(len(a), len(b))
+    out[(fraction < min_overlap) | ~np.isfinite(out)] = np.nan
+    return out, fraction
+
+
+def _peak(lags, c, allowed, weight=1.0):
+    # Lag of the largest weight * |c| among the allowed lags, with parabolic sub-sample interpolation
+    candidates = np.flatnonzero(allowed & np.isfinite(c))
+    if len(candidates) == 0:
+        return None, np.nan
+    i = candidates[np.argmax((weight * np.abs(c))[candidates])]
+    # The weight only picks the peak; the lag is at its top, which the weight would pull towards 0
+    magnitude = np.where(allowed & np.isfinite(c), np.abs(c), -np.inf)
+    while i > 0 and magnitude[i - 1] > magnitude[i]:
+        i -= 1
+    while i < len(c) - 1 and magnitude[i + 1] > magnitude[i]:
+        i += 1
+    offset = 0.0
+    if 0 < i < len(c) - 1:
+        y0, y1, y2 = np.abs(c[i - 1:i + 2])
+        denominator = y0 - 2 * y1 + y2
+        if denominator < 0:
+            offset = float(np.clip(0.5 * (y0 - y2) / denominator, -0.5, 0.5))
+    return lags[i] + offset, c[i]
+
+
+def _grid(time_min, values, period_s, differentiate):
+    grid, out = resample(time_min, values, period_s, 'mean')
+    return grid, _prepare(out, differentiate)
+
+
+def estimate_lag(t_a, a, t_b, b, period_s=None, max_lag_s=None, decimate=8, differentiate=False,
+                 min_overlap=0.5):
+    """Lag of channel b (times t_b, minutes) behind channel a (times t_a) as a Lag.
+
+    period_s defaults to the coarser of the two sampling intervals. max_lag_s limits the
+    search to |lag| <= max_lag_s, and only lags where the signals overlap for at least
+    min_overlap of the shorter one are considered. differentiate correlates the first
+    differences, which sharpens the peak of slow ramps with little noise.
+    """
+    t_a = np.asarray(t_a, dtype=np.float64)
+    t_b = np.asarray(t_b, dtype=np.float64)
+    if period_s is None:
+        period_s = max(sample_interval(t_a), sample_interval(t_b))
+    decimate = max(1, int(decimate))
+    limit = np.inf if max_lag_s is None else max_lag_s
+
+    def lag_seconds(grid_a, grid_b, lags, period):
+        # Lags in samples of grids starting at different times -> lags in seconds
+        return (grid_b[0] - grid_a[0]) * 60 + np.asarray(lags, dtype=np.float64) * period
+
+    # Coarse search over all lags on the decimated grid (mean per interval acts as anti-alias filter)
+    coarse = period_s * decimate
+    grid_a, x_a = _grid(t_a, a, coarse, differentiate)
+    grid_b, x_b = _grid(t_b, b, coarse, differentiate)
+    if len(x_a) < 2 or len(x_b) < 2:
+        raise ValueError("Not enough samples to correlate")
+    lags, c = cross_correlation(x_a, x_b)
+    c, overlap = _normalize(x_a, x_b, lags, c, min_overlap)
+    lag, peak = _peak(lags, c, np.abs(lag_seconds(grid_a, grid_b, lags, coarse)) <= limit, overlap)
+    if lag is None:
+        raise ValueError(f"No lag within {max_lag_s} s")
+    lag_s = float(lag_seconds(grid_a, grid_b, [lag], coarse)[0])
+    if decimate == 1:
+        return Lag(lag_s, float(peak), period_s)
+
+    # Refine at full resolution, only around the coarse lag
+    grid_a, x_a = _grid(t_a, a, period_s, differentiate)
+    grid_b, x_b = _grid(t_b, b, period_s, differentiate)
+    centre = int(round((lag_s - (grid_b[0] - grid_a[0]) * 60) / period_s))
+    lags = np.arange(centre - 2 * decimate, centre + 2 * decimate + 1)
+    c, _ = _normalize(x_a, x_b, lags, _direct(x_a, x_b, lags), min_overlap)
+    lag, peak = _peak(lags, c, np.abs(lag_seconds(grid_a, grid_b, lags, period_s)) <= limit)
+    if lag is None:
+        return Lag(lag_s, float(peak), coarse)
+    return Lag(float(lag_seconds(grid_a, grid_b, [lag], period_s)[0]), float(peak), period_s)
+
+
+def shifted_values(time_min, values, lag_s):
+    """values of a channel that lags by lag_s, read at the shifted time so they line up with
+    time_min (linear interpolation; NaN outside the recorded range)."""
+    t = np.asarray(time_min, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    valid = np.isfinite(t) & np.isfinite(values)
+    if valid.sum() < 2:
+        return np.full(len(values), np.nan)
+    tv, yv = t[valid], values[valid]
+    if np.any(np.diff(tv) < 0):
+        order = np.argsort(tv, kind='stable')
+        tv, yv = tv[order], yv[order]
+    return np.interp(t + lag_s / 60, tv, yv, left=np.nan, right=np.nan)
+
+
+def shift_frame(df, shift_s, time_col='Timestamp'):
+    """The run with its Timestamp (minutes) moved by shift_s seconds; the other columns are
+    shared with df, not copied."""
+    shifted = df.copy(deep=False)
+    shifted[time_col] = df[time_col] + shift_s / 60
+    return shifted
+
+
+def main():
+    if len(sys.argv) not in (4, 5):
+        print("usage: python -m magtrace.alignment FILE_A COLUMN_A FILE_B [COLUMN_B]")
+        sys.exit(2)
+    from .catalog import detect_kind
+    from .dataio import load_cleaned, load_run
+
+    def load(file_path):
+        return load_cleaned(file_path) if detect_kind(file_path) == 'cleaned' else load_run(file_path)
+
+    file_a, col_a, file_b = sys.argv[1:4]
+    col_b = sys.argv[4] if len(sys.argv) == 5 else col_a
+    df_a = load(file_a)
+    df_b = df_a if file_b == file_a else load(file_b)
+    lag = estimate_lag(df_a['Timestamp'], df_a[col_a], df_b['Timestamp'], df_b[col_b])
+    print(f"{os.path.basename(file_b)} {col_b} lags {os.path.basename(file_a)} {col_a} by "
+          f"{lag.lag_s:.6g} s (correlation {lag.correlation:.3f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,360 @@
+"""Run analysis: current ramps and plateaus, critical current and n-value.
+
+    from magtrace.analysis import iv_table, plateau_table
+    table = iv_table(df, 'Magna_1_current', ['CH1', 'CH2'], tap_length_cm=1.0)
+    plateaus = plateau_table(df, ['Magna_1_current', 'Magna_2_current'])
+
+    python -m magtrace.analysis run_cleaned.csv Magna_1_current CH1 CH2
+
+Ramps and plateaus are found from the smoothed current. For the IV fit the tap voltages are
+averaged in current bins and E = Ec (I / Ic)^n is fitted in log space for all ramps and taps
+at once.
+"""
+import os
+import sys
+
+import numpy as np
+
+from .processing import VOLTAGE_SCALES
+
+CRITERION_UV_PER_CM = 1.0
+
+
+def moving_average(values, window):
+    # Centred mean over `window` samples in O(n), edges padded with the first/last value
+    if window <= 1 or len(values) == 0:
+        return values
+    padded = np.pad(values, (window // 2, window - 1 - window // 2), mode='edge')
+    sums = np.concatenate([[0.0], np.cumsum(padded)])
+    return (sums[window:] - sums[:-window]) / window
+
+
+def sample_interval(time_min):
+    """Median sampling interval in seconds of a Timestamp column in minutes (1 s if unknown)."""
+    if time_min is None or len(time_min) < 2:
+        return 1.0
+    dt = np.nanmedian(np.diff(np.asarray(time_min, dtype=np.float64))) * 60
+    return float(dt) if dt > 0 else 1.0
+
+
+def current_rate(current, time_min=None, smooth_s=10.0):
+    """dI/dt in A/s of the current smoothed over smooth_s seconds (NaN gaps interpolated)."""
+    current = np.asarray(current, dtype=np.float64)
+    n = len(current)
+    valid = ~np.isnan(current)
+    if not valid.all():
+        if not valid.any():
+            return np.zeros(n)
+        current = np.interp(np.arange(n), np.flatnonzero(valid), current[valid])
+    if n < 2:
+        return np.zeros(n)
+    dt = sample_interval(time_min)
+    smoothed = moving_average(current, max(1, int(round(smooth_s / dt))))
+    return np.gradient(smoothed) / dt
+
+
+def ramp_directions(current, time_min=None, smooth_s=10.0, min_rate=0.05):
+    """Sweep direction of every sample: 1 rising, -1 falling, 0 before the first sweep.
+
+    The current is smoothed over smooth_s seconds. Samples changing slower than min_rate A/s
+    (plateaus, noise) keep the direction of the sweep they are part of.
+    """
+    n = len(current)
+    if n == 0:
+        return np.zeros(0, dtype=np.int8)
+    rate = current_rate(current, time_min, smooth_s)
+    direction = np.where(rate > min_rate, 1, np.where(rate < -min_rate, -1, 0)).astype(np.int8)
+    idx = np.where(direction != 0, np.arange(n), 0)
+    np.maximum.accumulate(idx, out=idx)
+    return direction[idx]
+
+
+def find_ramps(current, time_min=None, min_span=5.0, **kwargs):
+    """(starts, stops, directions) of the sweeps that move the current by at least min_span A.
+
+    Rows starts[k]:stops[k] form sweep k; kwargs are passed to ramp_directions.
+    """
+    current = np.asarray(current, dtype=np.float64)
+    direction = ramp_directions(current, time_min, **kwargs)
+    if len(direction) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0, dtype=np.int8)
+    change = np.flatnonzero(np.diff(direction)) + 1
+    starts = np.concatenate([[0], change])
+    stops = np.concatenate([change, [len(direction)]])
+    with np.errstate(invalid='ignore'):
+        span = np.fmax.reduceat(current, starts) - np.fmin.reduceat(current, starts)
+    keep = (direction[starts] != 0) & (span >= min_span)
+    return starts[keep], stops[keep], direction[starts][keep]
+
+
+class RampIndex:
+    """The sweeps of a run's current, computed once and then sliced.
+
+    Sweep k (numbered from 1) covers rows starts[k - 1]:stops[k - 1] and goes up (1) or
+    down (-1); rows between sweeps belong to none.
+    """
+
+    def __init__(self, starts, stops, directions, n_rows):
+        self.starts = starts
+        self.stops = stops
+        self.directions = directions
+        self.n_rows = n_rows
+
+    @classmethod
+    def from_current(cls, current, time_min=None, **kwargs):
+        starts, stops, directions = find_ramps(current, time_min, **kwargs)
+        return cls(starts, stops, directions, len(current))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def labels(self):
+        """Sweep number (0 between sweeps) and direction of every row."""
+        number = np.zeros(self.n_rows, dtype=np.int32)
+        direction = np.zeros(self.n_rows, dtype=np.int8)
+        rows, sweep = _segment_rows(self.starts, self.stops)
+        number[rows] = sweep + 1
+        direction[rows] = self.directions[sweep]
+        return number, direction
+
+    def select(self, direction=None, numbers=None):
+        """Positions (0-based) of the sweeps going in direction and numbered in numbers."""
+        keep = np.ones(len(self.starts), dtype=bool)
+        if direction is not None:
+            keep &= self.directions == direction
+        if numbers is not None:
+            keep &= np.isin(np.arange(1, len(self.starts) + 1), list(numbers))
+        return np.flatnonzero(keep)
+
+    def mask(self, sweeps):
+        """Boolean mask of the rows in the given sweeps (positions from select)."""
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[_segment_rows(self.starts[sweeps], self.stops[sweeps])[0]] = True
+        return mask
+
+
+def parse_sweep_numbers(text):
+    """'1-3, 7' -> (1, 2, 3, 7); None for an empty text. Raises ValueError if malformed."""
+    numbers = set()
+    for part in text.replace(';', ',').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            first, last = (int(p) for p in part.split('-', 1))
+            numbers.update(range(first, last + 1))
+        else:
+            numbers.add(int(part))
+    return tuple(sorted(numbers)) or None
+
+
+def find_plateaus(currents, time_min=None, max_rate=0.05, smooth_s=10.0, settle_s=2.0, min_duration_s=30.0):
+    """(starts, stops) of the intervals where every current changes slower than max_rate A/s.
+
+    currents is a list of current arrays (e.g. both supplies). settle_s seconds are dropped
+    from both ends of each interval to reject ramp transients; shorter plateaus than
+    min_duration_s (after trimming) are ignored.
+    """
+    n = len(currents[0]) if currents else 0
+    if n == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    steady = np.ones(n, dtype=bool)
+    for current in currents:
+        steady &= np.abs(current_rate(current, time_min, smooth_s)) <= max_rate
+    edges = np.flatnonzero(np.diff(np.concatenate([[False], steady, [False]]).astype(np.int8)))
+    starts, stops = edges[0::2], edges[1::2]
+    dt = sample_interval(time_min)
+    trim = int(round(settle_s / dt))
+    starts, stops = starts + trim, stops - trim
+    keep = (stops - starts) * dt >= max(min_duration_s, dt)
+    return starts[keep], stops[keep]
+
+
+def plateau_table(df, current_cols, time_col='Timestamp', **kwargs):
+    """Mean and standard deviation of every numeric column on each current plateau.
+
+    The means keep the column names (so the table plots like the run itself, Timestamp
+    first), the deviations are named '<column>_std', followed by the plateau number, its
+    start and end (minutes), duration (s) and row count. kwargs go to find_plateaus.
+    """
+    import pandas as pd
+    numeric = df.select_dtypes(include='number')
+    time_min = numeric[time_col].to_numpy(dtype=np.float64) if time_col in numeric.columns else None
+    currents = [numeric[col].to_numpy(dtype=np.float64) for col in current_cols]
+    starts, stops = find_plateaus(currents, time_min, **kwargs)
+    rows, plateau = _segment_rows(starts, stops)
+    n_plateaus = len(starts)
+    means, stds = {}, {}
+    for col in numeric.columns:
+        v = numeric[col].to_numpy(dtype=np.float64)[rows]
+        valid = ~np.isnan(v)
+        count = np.bincount(plateau, valid, minlength=n_plateaus)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.bincount(plateau, np.where(valid, v, 0.0), minlength=n_plateaus) / count
+            d = np.where(valid, v - mean[plateau], 0.0)
+            std = np.sqrt(np.bincount(plateau, d * d, minlength=n_plateaus) / (count - 1))
+        means[col] = mean
+        stds[f"{col}_std"] = std
+    table = pd.DataFrame({**means, **stds})
+    table['plateau'] = np.arange(1, n_plateaus + 1)
+    if time_min is not None:
+        table['t_start'] = time_min[starts]
+        table['t_end'] = time_min[stops - 1]
+    table['duration_s'] = (stops - starts) * sample_interval(time_min)
+    table['rows'] = stops - starts
+    return table
+
+
+def _segment_rows(starts, stops):
+    # Row numbers of all segments back to back, and the segment of each of them
+    lengths = stops - starts
+    segment = np.repeat(np.arange(len(starts)), lengths)
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return np.arange(lengths.sum()) + offsets, segment
+
+
+def fit_power_law(current, field, groups, n_groups, criterion, fit_range):
+    """Batched least-squares fit of log E = n log I + c, one fit per group.
+
+    current, field and groups are flat arrays of binned points; only points with
+    fit_range[0] * criterion <= E <= fit_range[1] * criterion are used. Returns
+    (ic, n_value, n_points) per group, NaN where fewer than three points are in range.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        use = ((field >= fit_range[0] * criterion) & (field <= fit_range[1] * criterion) & (current > 0))
+        x = np.log(current[use])
+        y = np.log(field[use])
+    g = groups[use]
+    count = np.bincount(g, minlength=n_groups).astype(np.float64)
+    sx = np.bincount(g, x, minlength=n_groups)
+    sy = np.bincount(g, y, minlength=n_groups)
+    sxx = np.bincount(g, x * x, minlength=n_groups)
+    sxy = np.bincount(g, x * y, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        denom = count * sxx - sx * sx
+        n_value = (count * sxy - sx * sy) / denom
+        intercept = (sy - n_value * sx) / count
+        ic = np.exp((np.log(criterion) - intercept) / n_value)
+    bad = (count < 3) | ~(denom > 0) | ~(n_value > 0)
+    n_value[bad] = np.nan
+    ic[bad] = np.nan
+    return ic, n_value, count.astype(np.int64)
+
+
+def iv_table(df, current_col, tap_cols, tap_length_cm=1.0, criterion=CRITERION_UV_PER_CM,
+             voltage_scale='mV', fit_range=(0.1, 10.0), bin_width=1.0, baseline_fraction=0.5,
+             direction=1, time_col='Timestamp', min_span=5.0):
+    """Ic (A) at `criterion` µV/cm and n-value for every ramp of the current and every voltage tap.
+
+    Only sweeps in `direction` (1 = ramp up) are analysed; 'ramp' is the sweep's number in the
+    run's RampIndex, so up and down sweeps are both counted. Tap voltages are in `voltage_scale`
+    units (see VOLTAGE_SCALES); the mean field below baseline_fraction of the ramp's peak
+    current is taken as the offset. One row per (ramp, tap) with the ramp's time span (minutes),
+    peak current, ic, n_value, the number of current bins in the fit and whether the field
+    reached the criterion (otherwise ic is extrapolated).
+    """
+    import pandas as pd
+    columns = ['ramp', 'tap', 't_start', 't_end', 'i_peak', 'ic', 'n_value', 'n_points', 'reached']
+    current = df[current_col].to_numpy(dtype=np.float64)
+    time_min = df[time_col].to_numpy(dtype=np.float64) if time_col in df.columns else None
+    index = RampIndex.from_current(current, time_min, min_span=min_span)
+    sweeps = index.select(direction)
+    starts, stops = index.starts[sweeps], index.stops[sweeps]
+    n_ramps = len(starts)
+    if n_ramps == 0 or not tap_cols:
+        return pd.DataFrame(columns=columns)
+
+    rows, ramp = _segment_rows(starts, stops)
+    i = current[rows]
+    lengths = stops - starts
+    with np.errstate(invalid='ignore'):
+        i_peak = np.fmax.reduceat(i, np.cumsum(lengths) - lengths)
+    # Bin by current: (ramp, bin) pairs flattened to one group index
+    bins = np.floor(i / bin_width)
+    ok = ~np.isnan(bins)
+    bin_min = np.nanmin(bins) if ok.any() else 0
+    n_bins = int(np.nanmax(bins) - bin_min) + 1 if ok.any() else 1
+    group = np.where(ok, ramp * n_bins + np.nan_to_num(bins - bin_min).astype(np.int64), 0)
+    low = ok & (np.abs(i) < baseline_fraction * np.abs(i_peak[ramp]))
+
+    to_uv_per_cm = VOLTAGE_SCALES.get(voltage_scale, 1.0e-3) * 1e6 / tap_length_cm
+    n_groups = n_ramps * n_bins
+    bin_ramp = np.repeat(np.arange(n_ramps), n_bins)
+    tables = []
+    for tap in tap_cols:
+        e = df[tap].to_numpy(dtype=np.float64)[rows] * to_uv_per_cm
+        valid = ok & ~np.isnan(e)
+        e0 = np.where(valid, e, 0.0)
+        # Offset of each ramp from its low-current part, then mean field and current per bin
+        n_low = np.bincount(ramp, low & valid, minlength=n_ramps)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            baseline = np.where(n_low > 0, np.bincount(ramp, np.where(low, e0, 0.0), minlength=n_ramps) / n_low, 0.0)
+            count = np.bincount(group, valid, minlength=n_groups)
+            e_bin = np.bincount(group, e0, minlength=n_groups) / count - baseline[bin_ramp]
+            i_bin = np.bincount(group, np.where(valid, i, 0.0), minlength=n_groups) / count
+        # Fit only the transition: bins above the highest-current bin still below the window,
+        # so noise on the low-current part of the ramp cannot enter the fit
+        e_2d = e_bin.reshape(n_ramps, n_bins)
+        with np.errstate(invalid='ignore'):
+            below = e_2d < fit_range[0] * criterion
+        last_below = np.where(below.any(axis=1), n_bins - 1 - np.argmax(below[:, ::-1], axis=1), -1)
+        e_2d[np.arange(n_bins) <= last_below[:, np.newaxis]] = np.nan
+        ic, n_value, n_points = fit_power_law(i_bin, e_bin, bin_ramp, n_ramps, criterion, fit_range)
+        with np.errstate(invalid='ignore'):
+            reached = np.fmax.reduce(e_2d, axis=1) >= criterion
+        tables.append(pd.DataFrame({
+            'ramp': sweeps + 1,
+            'tap': tap,
+            't_start': time_min[starts] if time_min is not None else starts,
+            't_end': time_min[stops - 1] if time_min is not None else stops - 1,
+            'i_peak': i_peak,
+            'ic': ic,
+            'n_value': n_value,
+            'n_points': n_points,
+            'reached': reached,
+        }))
+    table = pd.concat(tables, ignore_index=True)
+    return table.sort_values(['ramp', 'tap'], kind='stable', ignore_index=True)[columns]
+
+
+def iv_tables(runs, current_col, tap_cols, **kwargs):
+    """iv_table of several runs ({name: DataFrame}) in one table with a leading 'run' column."""
+    import pandas as pd
+    tables = []
+    for name, df in runs.items():
+        table = iv_table(df, current_col, tap_cols, **kwargs)
+        table.insert(0, 'run', name)
+        tables.append(table)
+    return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+
+
+def describe_iv(table, max_lines=10):
+    """A few lines of text for the GUI, e.g. 'Ramp 3 CH1: Ic 249.8 A, n 24.6'."""
+    lines = []
+    for row in table.head(max_lines).itertuples():
+        ic = f"{row.ic:.1f} A" if row.ic == row.ic else "—"
+        n_value = f"{row.n_value:.1f}" if row.n_value == row.n_value else "—"
+        suffix = "" if row.reached else " (extrapolated)"
+        lines.append(f"Ramp {row.ramp} {row.tap}: Ic {ic}, n {n_value}{suffix}")
+    if len(table) > max_lines:
+        lines.append(f"... {len(table)} fits in total")
+    return "\n".join(lines) if lines else "No current ramps found"
+
+
+def main():
+    if len(sys.argv) < 4:
+        print("usage: python -m magtrace.analysis FILE CURRENT_COLUMN TAP_COLUMN [TAP_COLUMN ...]")
+        sys.exit(2)
+    from .catalog import detect_kind
+    from .dataio import load_cleaned, load_run
+    file_path, current_col, tap_cols = sys.argv[1], sys.argv[2], sys.argv[3:]
+    df = load_cleaned(file_path) if detect_kind(file_path) == 'cleaned' else load_run(file_path)
+    table = iv_table(df, current_col, tap_cols)
+    print(f"{os.path.basename(file_path)}: {table['ramp'].nunique() if len(table) else 0} ramps")
+    print(table.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""Process-wide cache of loaded datasets, shared by all tabs.
+
+    df = DATASETS.acquire(path, 'cleaned')   # loads on a miss, pins the entry
+    ...
+    DATASETS.release(path, 'cleaned')        # unpinned entries may be evicted
+
+Entries are keyed by path, loader and the file's size and mtime, so an edited file is loaded
+again. Unpinned entries are evicted least-recently-used first whenever the cached
+DataFrames would exceed the memory budget. Cached DataFrames are shared: treat them as
+read-only (copy before modifying).
+"""
+import collections
+import os
+import sys
+import threading
+
+from .dataio import load_cleaned, load_run
+from .processing import map_threads
+
+LOADERS = {
+    'cleaned': load_cleaned,   # cleaned/combined CSV as saved
+    'run': load_run,           # raw export or recording, Timestamp in minutes
+}
+
+
+def total_memory():
+    """Physical memory in bytes, or None if unknown."""
+    if sys.platform == 'win32':
+        import ctypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong),
+                        ('ullTotalPhys', ctypes.c_ulonglong), ('ullAvailPhys', ctypes.c_ulonglong),
+                        ('ullTotalPageFile', ctypes.c_ulonglong), ('ullAvailPageFile', ctypes.c_ulonglong),
+                        ('ullTotalVirtual', ctypes.c_ulonglong), ('ullAvailVirtual', ctypes.c_ulonglong),
+                        ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(status)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullTotalPhys
+        return None
+    try:
+        return os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def default_budget():
+    # $MAGTRACE_CACHE_MB, else a quarter of the RAM capped at 4 GB (4 GB on a 16 GB laptop)
+    if os.environ.get('MAGTRACE_CACHE_MB'):
+        return int(float(os.environ['MAGTRACE_CACHE_MB']) * 2 ** 20)
+    total = total_memory()
+    return min(4 * 2 ** 30, total // 4) if total else 2 * 2 ** 30
+
+
+class _Entry:
+    def __init__(self, df, nbytes):
+        self.df = df
+        self.nbytes = nbytes
+        self.refs = 0
+
+
+class DatasetCache:
+    def __init__(self, budget_bytes=None):
+        self.budget = budget_bytes if budget_bytes is not None else default_budget()
+        self.entries = collections.OrderedDict()  # least recently used first
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.listeners = []
+        self._lock = threading.RLock()
+
+    def key(self, path, kind='cleaned'):
+        """Identity of the current version of a file, also used to key derived results."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        return (path, kind, st.st_size, st.st_mtime)
+
+    def get(self, path, kind='cleaned'):
+        """The DataFrame for path, loaded on a miss, without pinning it."""
+        return self._get(path, kind, pin=False)
+
+    def get_many(self, paths, kind='cleaned', workers=None):
+        """DataFrames for several paths in order, the missing ones loaded in parallel threads."""
+        return map_threads(lambda path: self.get(path, kind), paths, workers)
+
+    def acquire(self, path, kind='cleaned'):
+        """Like get(), but the entry is not evicted until release() is called."""
+        return self._get(path, kind, pin=True)
+
+    def release(self, path, kind='cleaned'):
+        path = os.path.abspath(path)
+        with self._lock:
+            for key, entry in self.entries.items():
+                if key[0] == path and key[1] == kind and entry.refs > 0:
+                    entry.refs -= 1
+                    break
+            self._evict()
+        self._changed()
+
+    def _get(self, path, kind, pin):
+        key = self.key(path, kind)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                if pin:
+                    entry.refs += 1
+                df = entry.df
+        if entry is not None:
+            self._changed()
+            return df
+
+        # Load outside the lock so other tabs/threads are not blocked
+        df = LOADERS[kind](path)
+        nbytes = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            self.misses += 1
+            self._drop_stale(key)
+            if nbytes <= self.budget:
+                entry = self.entries.get(key)
+                if entry is None:
+                    entry = self.entries[key] = _Entry(df, nbytes)
+                    self.nbytes += nbytes
+                else:
+                    df = entry.df  # loaded concurrently by someone else
+                if pin:
+                    entry.refs += 1
+                self.entries.move_to_end(key)
+                self._evict()
+        self._changed()
+        return df
+
+    def _drop_stale(self, key):
+        # Older versions of the same file (changed size or mtime) are never used again
+        for old in [k for k in self.entries if k[:2] == key[:2] and k != key]:
+            entry = self.entries[old]
+            if entry.refs == 0:
+                self.nbytes -= entry.nbytes
+                del self.entries[old]
+
+    def _evict(self):
+        for key in list(self.entries):
+            if self.nbytes <= self.budget:
+                break
+            entry = self.entries[key]
+            if entry.refs == 0:
+                self.nbytes -= entry.nbytes
+                del self.entries[key]
+                self.evictions += 1
+
+    def set_budget(self, budget_bytes):
+        with self._lock:
+            self.budget = budget_bytes
+            self._evict()
+        self._changed()
+
+    def clear(self):
+        with self._lock:
+            for key in [k for k, e in self.entries.items() if e.refs == 0]:
+                self.nbytes -= self.entries[key].nbytes
+                del self.entries[key]
+        self._changed()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'pinned': sum(1 for e in self.entries.values() if e.refs > 0),
+                'bytes': self.nbytes,
+                'budget': self.budget,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else None,
+            }
+
+    def describe(self):
+        s = self.stats()
+        text = f"Cache: {s['entries']} runs, {s['bytes'] / 2 ** 20:.0f}/{s['budget'] / 2 ** 20:.0f} MB"
+        if s['hit_rate'] is not None:
+            text += f", {100 * s['hit_rate']:.0f}% hits"
+        return text
+
+    def _changed(self):
+        for listener in self.listeners:
+            listener(self)
+
+
+DATASETS = DatasetCache()
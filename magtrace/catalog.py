@@ -0,0 +1,274 @@
+"""Persistent catalog of datasets: per-run metadata and per-channel statistics in SQLite.
+
+Datasets are registered when they are loaded, saved or combined; the plotter and combiner
+lists, run summaries and channel queries ("runs where CH9(Hall sensor 1) > 5") are then
+answered from the catalog without opening any data file.
+
+    python -m magtrace.catalog                               # list registered runs
+    python -m magtrace.catalog "CH9(Hall sensor 1) > 5"      # runs whose channel exceeded 5
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.expanduser('~'), '.magtrace', 'catalog.sqlite')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    kind TEXT,
+    size INTEGER,
+    mtime REAL,
+    content_hash TEXT,
+    rows INTEGER,
+    t_start REAL,
+    t_end REAL,
+    sample_rate REAL,
+    cache_path TEXT,
+    added REAL
+);
+CREATE TABLE IF NOT EXISTS channels (
+    dataset_id INTEGER NOT NULL REFERENCES datasets(id) ON DELETE CASCADE,
+    position INTEGER,
+    name TEXT NOT NULL,
+    min REAL,
+    max REAL,
+    mean REAL,
+    n_valid INTEGER,
+    PRIMARY KEY (dataset_id, name)
+);
+CREATE INDEX IF NOT EXISTS channels_by_name ON channels(name, max, min);
+CREATE TABLE IF NOT EXISTS roots (
+    path TEXT PRIMARY KEY,
+    last_scan REAL
+);
+CREATE TABLE IF NOT EXISTS folders (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    root TEXT,
+    mtime REAL
+);
+CREATE TABLE IF NOT EXISTS archive_files (
+    path TEXT PRIMARY KEY,
+    folder TEXT,
+    root TEXT,
+    size INTEGER,
+    mtime REAL,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS archive_files_by_root ON archive_files(root);
+CREATE INDEX IF NOT EXISTS folders_by_root ON folders(root);
+"""
+
+
+def file_hash(file_path, chunk_size=1 << 20):
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def detect_kind(file_path):
+    # 'recording' (a .magrec store), 'raw' (LabVIEW export) or 'cleaned' (comma CSV)
+    if os.path.basename(file_path) == 'meta.json' or file_path.endswith('.magrec'):
+        return 'recording'
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        head = [f.readline() for _ in range(3)]
+    return 'raw' if ';' in head[2] else 'cleaned'
+
+
+def dataset_stats(df, time_column='Timestamp'):
+    """Row count, time span (minutes), sample rate (Hz) and [(name, min, max, mean, n_valid)] per channel."""
+    numeric = df.select_dtypes(include='number')
+    values = numeric.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    n_valid = valid.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Columns without any valid value get NaN statistics (stored as NULL)
+        mins = np.where(n_valid > 0, np.min(np.where(valid, values, np.inf), axis=0, initial=np.inf), np.nan)
+        maxs = np.where(n_valid > 0, np.max(np.where(valid, values, -np.inf), axis=0, initial=-np.inf), np.nan)
+        means = np.where(valid, values, 0.0).sum(axis=0) / n_valid
+    channels = [(str(name), mins[i], maxs[i], means[i], int(n_valid[i])) for i, name in enumerate(numeric.columns)]
+
+    t_start = t_end = sample_rate = None
+    if time_column in numeric.columns:
+        t = numeric[time_column].to_numpy(dtype=np.float64)
+        t = t[~np.isnan(t)]
+        if len(t):
+            t_start, t_end = float(t.min()), float(t.max())
+        if len(t) > 1:
+            dt = np.median(np.diff(t)) * 60  # minutes -> s
+            sample_rate = float(1 / dt) if dt > 0 else None
+    return len(df), t_start, t_end, sample_rate, channels
+
+
+def _none_if_nan(value):
+    return None if value is None or value != value else float(value)
+
+
+def summary(dataset):
+    """One line for file lists, e.g. '4501 rows · 122.7 min · 0.61 Hz · 68 ch'."""
+    parts = []
+    if dataset['rows'] is not None:
+        parts.append(f"{dataset['rows']} rows")
+    if dataset['t_start'] is not None and dataset['t_end'] is not None:
+        parts.append(f"{dataset['t_end'] - dataset['t_start']:.1f} min")
+    if dataset['sample_rate']:
+        parts.append(f"{dataset['sample_rate']:.3g} Hz")
+    if dataset['n_channels'] is not None:
+        parts.append(f"{dataset['n_channels']} ch")
+    if dataset['kind']:
+        parts.append(dataset['kind'])
+    return " · ".join(parts)
+
+
+QUERY_PATTERN = re.compile(r'^\s*(?P<channel>.+?)\s*(?P<op>>=|<=|>|<)\s*(?P<value>[-+0-9.eE]+)\s*$')
+
+
+def parse_query(text):
+    """'CH9(Hall sensor 1) > 5' -> ('CH9(Hall sensor 1)', '>', 5.0); None if it is not a query."""
+    match = QUERY_PATTERN.match(text)
+    if not match:
+        return None
+    try:
+        return match.group('channel'), match.group('op'), float(match.group('value'))
+    except ValueError:
+        return None
+
+
+class Catalog:
+    """SQLite catalog at `path` (default ~/.magtrace/catalog.sqlite, or $MAGTRACE_CATALOG).
+
+    Each thread gets its own connection, so background indexers can write while the GUI reads.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get('MAGTRACE_CATALOG') or DEFAULT_CATALOG_PATH
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._local = threading.local()
+        with self.connection() as db:
+            db.executescript(SCHEMA)
+
+    def connection(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.row_factory = sqlite3.Row
+            db.execute('PRAGMA foreign_keys = ON')
+            if self.path != ':memory:':
+                db.execute('PRAGMA journal_mode = WAL')
+            self._local.db = db
+        return db
+
+    def get(self, path):
+        return self.connection().execute(
+            "SELECT d.*, (SELECT COUNT(*) FROM channels c WHERE c.dataset_id = d.id) AS n_channels "
+            "FROM datasets d WHERE d.path = ?", (os.path.abspath(path),)).fetchone()
+
+    def is_current(self, path):
+        # Registered and unchanged on disk since (same size and mtime)
+        row = self.get(path)
+        if row is None:
+            return False
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        return row['size'] == st.st_size and row['mtime'] == st.st_mtime
+
+    def register(self, path, df=None, kind=None, cache_path=None, force=False):
+        """Record (or refresh) a dataset. Pass the already loaded DataFrame to avoid reparsing.
+
+        Files already registered and unchanged (same size and mtime) are skipped unless
+        force is set. Returns the dataset's row.
+        """
+        path = os.path.abspath(path)
+        if not force and self.is_current(path):
+            return self.get(path)
+        kind = kind or detect_kind(path)
+        if df is None:
+            from .dataio import load_cleaned, load_run
+            df = load_cleaned(path) if kind in ('cleaned', 'combined') else load_run(path)
+        if cache_path is None and kind == 'raw':
+            from .store import find_recording
+            cache_path = find_recording(path)
+        n_rows, t_start, t_end, sample_rate, channels = dataset_stats(df)
+        st = os.stat(path)
+        content_hash = file_hash(path) if os.path.isfile(path) else None
+        with self.connection() as db:
+            old = db.execute("SELECT id, added FROM datasets WHERE path = ?", (path,)).fetchone()
+            if old is not None:
+                db.execute("DELETE FROM datasets WHERE id = ?", (old['id'],))
+            cur = db.execute(
+                "INSERT INTO datasets (path, kind, size, mtime, content_hash, rows, t_start, t_end, "
+                "sample_rate, cache_path, added) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, kind, st.st_size, st.st_mtime, content_hash, n_rows, t_start, t_end, sample_rate,
+                 cache_path, old['added'] if old is not None else time.time()))
+            dataset_id = cur.lastrowid
+            db.executemany(
+                "INSERT OR REPLACE INTO channels (dataset_id, position, name, min, max, mean, n_valid) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(dataset_id, i, name, _none_if_nan(lo), _none_if_nan(hi), _none_if_nan(mean), n)
+                 for i, (name, lo, hi, mean, n) in enumerate(channels)])
+        return self.get(path)
+
+    def remove(self, path):
+        with self.connection() as db:
+            db.execute("DELETE FROM datasets WHERE path = ?", (os.path.abspath(path),))
+
+    def datasets(self, kinds=None, existing_only=True):
+        """Registered datasets in the order they were added, each with n_channels."""
+        sql = ("SELECT d.*, (SELECT COUNT(*) FROM channels c WHERE c.dataset_id = d.id) AS n_channels "
+               "FROM datasets d")
+        args = []
+        if kinds:
+            sql += " WHERE d.kind IN (%s)" % ",".join("?" * len(kinds))
+            args = list(kinds)
+        rows = self.connection().execute(sql + " ORDER BY d.added, d.id", args).fetchall()
+        if existing_only:
+            rows = [r for r in rows if os.path.exists(r['path'])]
+        return rows
+
+    def channels(self, path):
+        return self.connection().execute(
+            "SELECT c.* FROM channels c JOIN datasets d ON d.id = c.dataset_id WHERE d.path = ? "
+            "ORDER BY c.position", (os.path.abspath(path),)).fetchall()
+
+    def find_runs(self, channel, op, value):
+        """Datasets where the channel's max (for > / >=) or min (for < / <=) passes the value."""
+        column = {'>': 'c.max >', '>=': 'c.max >=', '<': 'c.min <', '<=': 'c.min <='}[op]
+        return self.connection().execute(
+            "SELECT d.*, c.min AS channel_min, c.max AS channel_max, "
+            "(SELECT COUNT(*) FROM channels cc WHERE cc.dataset_id = d.id) AS n_channels "
+            f"FROM datasets d JOIN channels c ON c.dataset_id = d.id WHERE c.name = ? AND {column} ? "
+            "ORDER BY d.added, d.id", (channel, value)).fetchall()
+
+    def query(self, text, kinds=None):
+        """Runs matching a query like 'CH9(Hall sensor 1) > 5'; otherwise runs whose path contains text.
+        kinds limits the result to those dataset kinds, as in datasets()."""
+        parsed = parse_query(text)
+        if parsed is not None:
+            return [r for r in self.find_runs(*parsed)
+                    if os.path.exists(r['path']) and (not kinds or r['kind'] in kinds)]
+        needle = text.strip().lower()
+        return [r for r in self.datasets(kinds) if needle in r['path'].lower()]
+
+
+def main():
+    catalog = Catalog()
+    rows = catalog.query(' '.join(sys.argv[1:])) if len(sys.argv) > 1 else catalog.datasets()
+    for row in rows:
+        print(f"{row['path']}\n    {summary(row)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""Reading LabVIEW exports, cleaned CSVs and live recordings."""
+import io
+import os
+
+import numpy as np
+
+
+def combine_labview_headers(header_1, header_2):
+    headers = []
+    for h1, h2 in zip(header_1, header_2):
+        h1 = h1.strip()
+        h2 = h2.strip()
+        if h1 and h2 and h1 != h2:
+            headers.append(f"{h1}({h2})")
+        else:
+            headers.append(h1 or h2)
+    return headers
+
+
+def read_labview_export(file_path):
+    """Raw LabVIEW export as a numeric DataFrame, Timestamp still in ms."""
+    import pandas as pd
+    # Read the header rows manually to handle inconsistent header rows
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        lines = [f.readline() for _ in range(4)]
+
+    # Skip the first two lines, then take the next two as headers
+    header_1 = lines[2].strip().split(';')
+    header_2 = lines[3].strip().split(';')
+    headers = combine_labview_headers(header_1, header_2)
+
+    # Now load the DataFrame with no header, skipping 4 lines
+    df = pd.read_csv(file_path, delimiter=';', skiprows=4, header=None)
+    df.columns = headers[:df.shape[1]]
+    return df.apply(pd.to_numeric, errors='coerce')
+
+
+def load_run(file_path):
+    """A raw run for the cleaner, Timestamp converted to minutes.
+
+    A complete live recording of the file (see store.find_recording) is read from its binary
+    columns instead of parsing the text.
+    """
+    from .store import ColumnStore, find_recording
+    recording = find_recording(file_path)
+    if recording:
+        df = ColumnStore.open(recording).to_dataframe()
+    else:
+        df = read_labview_export(file_path)
+    if 'Timestamp' in df.columns:
+        df['Timestamp'] = df['Timestamp'] / 1000 / 60
+    return df
+
+
+def load_cleaned(file_path):
+    import pandas as pd
+    return pd.read_csv(file_path)
+
+
+def iter_run_chunks(file_path, chunk_rows=500000):
+    """A raw export or cleaned CSV as numeric DataFrames of up to chunk_rows rows, Timestamp in
+    minutes (like load_run / load_cleaned), so long runs can be processed in bounded memory."""
+    import pandas as pd
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        head = [f.readline() for _ in range(4)]
+    raw = ';' in head[2]
+    if raw:
+        headers = combine_labview_headers(head[2].strip().split(';'), head[3].strip().split(';'))
+        reader = pd.read_csv(file_path, delimiter=';', skiprows=4, header=None, chunksize=chunk_rows)
+    else:
+        reader = pd.read_csv(file_path, chunksize=chunk_rows)
+    for chunk in reader:
+        if raw:
+            chunk.columns = headers[:chunk.shape[1]]
+        chunk = chunk.apply(pd.to_numeric, errors='coerce')
+        if raw and 'Timestamp' in chunk.columns:
+            chunk['Timestamp'] = chunk['Timestamp'] / 1000 / 60
+        yield chunk
+
+
+def load_export(file_path):
+    """Raw export or cleaned CSV, with Timestamp in ms like the logger writes it."""
+    import pandas as pd
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        head = [f.readline() for _ in range(4)]
+    if ';' in head[2]:
+        # LabVIEW export: two preamble lines and two header rows, Timestamp already in ms
+        return read_labview_export(file_path)
+    df = pd.read_csv(file_path)
+    df = df.apply(pd.to_numeric, errors='coerce')
+    if 'Timestamp' in df.columns:
+        df['Timestamp'] = df['Timestamp'] * 60 * 1000
+    return df
+
+
+class LiveFileTail:
+    """Incrementally reads rows appended to a LabVIEW export (2 preamble lines + 2 header rows)."""
+
+    def __init__(self, file_path, delimiter=';'):
+        self.file_path = file_path
+        self.delimiter = delimiter
+        self.columns = []
+        self.offset = 0
+        self._partial = b''
+
+    def read_header(self):
+        with open(self.file_path, 'rb') as f:
+            lines = [f.readline() for _ in range(4)]
+            self.offset = f.tell()
+        self._partial = b''
+        header_1 = lines[2].decode('utf-8', errors='replace').strip().split(self.delimiter)
+        header_2 = lines[3].decode('utf-8', errors='replace').strip().split(self.delimiter)
+        self.columns = combine_labview_headers(header_1, header_2)
+        return self.columns
+
+    def consumed_bytes(self):
+        # File position up to the last complete row that has been parsed
+        return self.offset - len(self._partial)
+
+    def read_new_rows(self):
+        # Only the bytes written since the last call are read; an incomplete last line is kept for next time
+        size = os.path.getsize(self.file_path)
+        if size < self.offset:
+            # File was truncated or replaced, start over
+            self.read_header()
+        if size == self.offset:
+            return np.empty((0, len(self.columns)))
+        with open(self.file_path, 'rb') as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+        self.offset += len(chunk)
+        return self.parse_chunk(chunk)
+
+    def parse_chunk(self, chunk):
+        data = self._partial + chunk
+        end = data.rfind(b'\n')
+        if end < 0:
+            self._partial = data
+            return np.empty((0, len(self.columns)))
+        self._partial = data[end + 1:]
+        return parse_delimited_rows(data[:end + 1], len(self.columns), self.delimiter)
+
+
+def parse_delimited_rows(data, n_columns, delimiter=';'):
+    # Parse complete text rows into a float array with exactly n_columns columns (NaN for bad cells)
+    if not data.strip():
+        return np.empty((0, n_columns))
+    import pandas as pd
+    df = pd.read_csv(io.BytesIO(data), delimiter=delimiter, header=None,
+                     names=range(n_columns), usecols=range(n_columns),
+                     skip_blank_lines=True, engine='c')
+    return df.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+
@@ -0,0 +1,94 @@
+"""Derivatives dy/dx of one or many channels at once, robust to irregular and repeated x.
+
+    from magtrace.derivatives import derivative
+    d = derivative(df['Timestamp'], df[['CH1', 'CH2']].to_numpy(), method='savgol', window=21)
+
+'gradient' and 'savgol' differentiate y and x along the sample order and divide (chain
+rule), so x does not have to increase (dV/dI over up and down sweeps works) and repeated
+x values give NaN instead of inf. 'resampled' interpolates onto a uniform grid in x first,
+which needs x increasing (e.g. time).
+"""
+import numpy as np
+
+# Method -> label for the plotter
+METHODS = {
+    'gradient': 'Central Difference',
+    'savgol': 'Savitzky-Golay',
+    'resampled': 'Resampled (uniform x)',
+    'difference': 'Forward Difference (y.diff / x.diff)',
+}
+
+
+def _as_columns(ys):
+    ys = np.asarray(ys, dtype=np.float64)
+    return (ys[:, np.newaxis], True) if ys.ndim == 1 else (ys, False)
+
+
+def _savgol_window(window, polyorder, n):
+    # Odd, longer than polyorder and no longer than the data; None if no such window exists
+    window = min(int(window), n if n % 2 else n - 1)
+    if window % 2 == 0:
+        window -= 1
+    return window if window > polyorder else None
+
+
+def _ratio(dy, dx):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d = dy / dx[:, np.newaxis]
+    d[~np.isfinite(d)] = np.nan
+    return d
+
+
+def uniform_grid(x):
+    """Uniform grid over the range of increasing x with the median positive step."""
+    steps = np.diff(x)
+    steps = steps[steps > 0]
+    if len(steps) == 0:
+        return x[:1].copy()
+    step = np.median(steps)
+    return x[0] + step * np.arange(int(np.floor((x[-1] - x[0]) / step)) + 1)
+
+
+def interp_columns(x_new, x, ys):
+    """np.interp of every column of ys (n, k) at x_new, sharing one searchsorted for all columns."""
+    i = np.clip(np.searchsorted(x, x_new, side='right'), 1, len(x) - 1)
+    x0, x1 = x[i - 1], x[i]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        w = np.where(x1 > x0, (x_new - x0) / (x1 - x0), 0.0)
+    w = np.clip(w, 0.0, 1.0)[:, np.newaxis]
+    return ys[i - 1] * (1 - w) + ys[i] * w
+
+
+def derivative(x, ys, method='gradient', window=11, polyorder=2):
+    """dy/dx of y (n,) or of every column of ys (n, k); same shape as ys, NaN where undefined."""
+    x = np.asarray(x, dtype=np.float64)
+    ys, single = _as_columns(ys)
+    n = len(x)
+    out = np.full(ys.shape, np.nan)
+    if n < 2:
+        return out[:, 0] if single else out
+
+    if method == 'difference':
+        out[1:] = _ratio(np.diff(ys, axis=0), np.diff(x))
+    elif method == 'gradient':
+        out = _ratio(np.gradient(ys, axis=0), np.gradient(x))
+    elif method == 'savgol':
+        from scipy.signal import savgol_filter
+        w = _savgol_window(window, polyorder, n)
+        if w is None:
+            out = _ratio(np.gradient(ys, axis=0), np.gradient(x))
+        else:
+            out = _ratio(savgol_filter(ys, w, polyorder, deriv=1, axis=0),
+                         savgol_filter(x, w, polyorder, deriv=1))
+    elif method == 'resampled':
+        valid = ~np.isnan(x)
+        xv = x[valid]
+        if np.any(np.diff(xv) < 0):
+            raise ValueError("Resampled derivative needs an increasing x (e.g. time)")
+        grid = uniform_grid(xv)
+        if len(grid) >= 2:
+            d = derivative(grid, interp_columns(grid, xv, ys[valid]), 'savgol', window, polyorder)
+            out[valid] = interp_columns(xv, grid, d)
+    else:
+        raise ValueError(f"Unknown derivative method: {method}")
+    return out[:, 0] if single else out
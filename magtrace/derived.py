@@ -0,0 +1,67 @@
+"""Cache of derived series (unit-converted x, masks, transformed and computed y columns).
+
+Keys are tuples that start with the dataset's identity (see DatasetCache.key) followed by
+everything the value depends on, e.g. (dataset, 'y', 'CH1', ('abs',), x_spec, x_min, x_max).
+Replotting with the same inputs therefore reuses the arrays instead of recomputing them.
+"""
+import collections
+import threading
+
+
+def _nbytes(value):
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values())
+    return int(getattr(value, 'nbytes', 0))
+
+
+class DerivedCache:
+    """LRU of computed arrays within a byte budget."""
+
+    def __init__(self, budget_bytes=512 * 2 ** 20):
+        self.budget = budget_bytes
+        self.entries = collections.OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        return self.get_many([key], lambda missing: [compute()])[0]
+
+    def get_many(self, keys, compute):
+        """Values for several keys. compute(missing_keys) returns the values of the keys not
+        cached yet, in order, so related series can be computed in one vectorized call."""
+        values = {}
+        with self._lock:
+            for key in keys:
+                if key in self.entries:
+                    self.hits += 1
+                    self.entries.move_to_end(key)
+                    values[key] = self.entries[key][0]
+        missing = [key for key in dict.fromkeys(keys) if key not in values]
+        if missing:
+            for key, value in zip(missing, compute(missing)):
+                values[key] = value
+                self._store(key, value)
+        return [values[key] for key in keys]
+
+    def _store(self, key, value):
+        size = _nbytes(value)
+        with self._lock:
+            self.misses += 1
+            if size <= self.budget and key not in self.entries:
+                self.entries[key] = (value, size)
+                self.nbytes += size
+                while self.nbytes > self.budget:
+                    _, (_, old_size) = self.entries.popitem(last=False)
+                    self.nbytes -= old_size
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+
+DERIVED = DerivedCache()
@@ -0,0 +1,164 @@
+"""Field maps over the two coil currents, e.g. |B| against Magna_1_current and Magna_2_current.
+
+    from magtrace.heatmap import field_heatmap
+    heatmap = field_heatmap({'Mgn_012': df_a, 'Mgn_013': df_b}, 'CH9(Hall sensor 1)',
+                            step=1.0, swapped=['Mgn_012'])
+    heatmap.mean, heatmap.max, heatmap.count         # (nx, ny) over heatmap.x_edges, y_edges
+
+Replaces the row loop of Old_Scripts/field heatmap.py: every sample is assigned to a cell of
+a grid with `step` wide bins in both currents and the cells are reduced with bincount, so a
+multi-million-row run takes well under a second. Cells sit at multiples of step, so maps of
+separate runs (binned in parallel threads) merge by adding their sums and counts. A run
+without Magna_2_current is mapped at Magna_2_current = 0, as the old script did.
+"""
+import numpy as np
+
+from .processing import map_threads
+
+CURRENT_COLUMNS = ('Magna_1_current', 'Magna_2_current')
+
+
+class Heatmap:
+    """Sum, count and max of a value per cell; cell (i, j) holds currents
+    [(x0 + i) * step, (x0 + i + 1) * step) x [(y0 + j) * step, (y0 + j + 1) * step)."""
+
+    def __init__(self, step, x0, y0, total, count, peak):
+        self.step = step
+        self.x0, self.y0 = x0, y0
+        self.total = total
+        self.count = count
+        self.max = peak
+
+    @classmethod
+    def empty(cls, step):
+        return cls(step, 0, 0, np.zeros((0, 0)), np.zeros((0, 0), dtype=np.int64), np.zeros((0, 0)))
+
+    @property
+    def x_edges(self):
+        return (self.x0 + np.arange(self.count.shape[0] + 1)) * self.step
+
+    @property
+    def y_edges(self):
+        return (self.y0 + np.arange(self.count.shape[1] + 1)) * self.step
+
+    @property
+    def mean(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 0, self.total / self.count, np.nan)
+
+    @property
+    def nbytes(self):
+        return self.total.nbytes + self.count.nbytes + self.max.nbytes
+
+    def merge(self, other):
+        """The map of both runs together, on a grid covering both."""
+        if not self.count.size:
+            return other
+        if not other.count.size:
+            return self
+        x0, y0 = min(self.x0, other.x0), min(self.y0, other.y0)
+        nx = max(self.x0 + self.count.shape[0], other.x0 + other.count.shape[0]) - x0
+        ny = max(self.y0 + self.count.shape[1], other.y0 + other.count.shape[1]) - y0
+        total = np.zeros((nx, ny))
+        count = np.zeros((nx, ny), dtype=np.int64)
+        peak = np.full((nx, ny), np.nan)
+        for part in (self, other):
+            cells = (slice(part.x0 - x0, part.x0 - x0 + part.count.shape[0]),
+                     slice(part.y0 - y0, part.y0 - y0 + part.count.shape[1]))
+            total[cells] += part.total
+            count[cells] += part.count
+            peak[cells] = np.fmax(peak[cells], part.max)
+        return Heatmap(self.step, x0, y0, total, count, peak)
+
+    def values(self, statistic='mean'):
+        """(nx, ny) 'mean', 'max' or 'count' per cell; NaN (count: 0) where there are no samples."""
+        if statistic == 'count':
+            return self.count
+        if statistic == 'max':
+            return self.max
+        if statistic == 'mean':
+            return self.mean
+        raise ValueError(f"Unknown statistic: {statistic}")
+
+    def interpolated(self, statistic='mean'):
+        """values() with the empty cells inside the measured area filled by linear interpolation
+        between the measured cells (scipy griddata); cells outside stay NaN."""
+        values = self.values(statistic).astype(np.float64)
+        filled = np.isfinite(values) & (self.count > 0)
+        if filled.sum() < 3:
+            return values
+        from scipy.interpolate import griddata
+        try:
+            from scipy.spatial import QhullError
+        except ImportError:  # scipy < 1.8
+            from scipy.spatial.qhull import QhullError
+        ix, iy = np.nonzero(filled)
+        ex, ey = np.nonzero(~filled)
+        try:
+            values[ex, ey] = griddata((ix, iy), values[ix, iy], (ex, ey), method='linear')
+        except (QhullError, ValueError):
+            # All measured cells on one line (e.g. a single coil ramped): nothing to interpolate
+            pass
+        return values
+
+    def frame(self):
+        """Table of the measured cells: both cell centres, mean, max and count."""
+        import pandas as pd
+        ix, iy = np.nonzero(self.count > 0)
+        return pd.DataFrame({
+            'current_1': (self.x0 + ix + 0.5) * self.step,
+            'current_2': (self.y0 + iy + 0.5) * self.step,
+            'mean': self.mean[ix, iy],
+            'max': self.max[ix, iy],
+            'count': self.count[ix, iy],
+        })
+
+
+def bin_field(current_1, current_2, values, step=1.0):
+    """Heatmap of values (n,) over the two currents, in one vectorized pass."""
+    current_1 = np.asarray(current_1, dtype=np.float64)
+    current_2 = np.asarray(current_2, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    valid = np.isfinite(current_1) & np.isfinite(current_2) & np.isfinite(values)
+    if not valid.any():
+        return Heatmap.empty(step)
+    bx = np.floor(current_1[valid] / step).astype(np.int64)
+    by = np.floor(current_2[valid] / step).astype(np.int64)
+    values = values[valid]
+    x0, y0 = int(bx.min()), int(by.min())
+    nx, ny = int(bx.max()) - x0 + 1, int(by.max()) - y0 + 1
+    cells = (bx - x0) * ny + (by - y0)
+    count = np.bincount(cells, minlength=nx * ny)
+    total = np.bincount(cells, values, minlength=nx * ny)
+    # Max per cell: sort by cell once, then reduce each cell's contiguous block
+    order = np.argsort(cells, kind='stable')
+    sorted_cells = cells[order]
+    starts = np.flatnonzero(np.diff(np.concatenate([[-1], sorted_cells])))
+    peak = np.full(nx * ny, np.nan)
+    peak[sorted_cells[starts]] = np.maximum.reduceat(values[order], starts)
+    return Heatmap(step, x0, y0, total.reshape(nx, ny), count.reshape(nx, ny), peak.reshape(nx, ny))
+
+
+def run_heatmap(df, field_col, step=1.0, current_cols=CURRENT_COLUMNS, swapped=False, abs_values=True):
+    """bin_field of one run; swapped exchanges the two current columns (coils wired the other way)."""
+    currents = [df[col].to_numpy(dtype=np.float64) if col in df.columns else np.zeros(len(df))
+                for col in current_cols]
+    if swapped:
+        currents.reverse()
+    values = df[field_col].to_numpy(dtype=np.float64)
+    return bin_field(currents[0], currents[1], np.abs(values) if abs_values else values, step)
+
+
+def field_heatmap(runs, field_col, step=1.0, swapped=(), workers=None, **kw):
+    """Heatmap of every run in runs ({name: DataFrame}) together, binned in parallel threads.
+
+    swapped lists the names of the runs whose current columns are exchanged. Keyword
+    arguments go to run_heatmap (current_cols, abs_values).
+    """
+    swapped = set(swapped)
+    maps = map_threads(lambda item: run_heatmap(item[1], field_col, step, swapped=item[0] in swapped, **kw),
+                       runs.items(), workers)
+    heatmap = Heatmap.empty(step)
+    for part in maps:
+        heatmap = heatmap.merge(part)
+    return heatmap
@@ -0,0 +1,239 @@
+"""Incremental indexer for run archives (e.g. one folder per magnet on a cloud-synced drive).
+
+The first scan of a root walks every folder and registers each LabVIEW export and cleaned
+CSV in the catalog. Later scans compare folder and file mtimes/sizes with what was recorded:
+folders whose mtime has not changed are not listed again (their known files are only
+stat'ed), and only new or changed files are opened.
+
+    python -m magtrace.indexer "/path/to/Magnets"
+"""
+import os
+import sys
+import time
+
+from .catalog import Catalog
+
+EXPORT_EXTENSIONS = ('.csv', '.txt', '.lvm', '.dat')
+
+
+def skip_folder(name):
+    # Hidden folders, live recordings and detector event folders hold no exports to index
+    return name.startswith('.') or name.endswith('.magrec') or name.endswith('_events')
+
+
+def export_kind(file_path):
+    """'raw' for a LabVIEW export, 'cleaned' for a cleaned/combined CSV, None for anything else."""
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+            head = [f.readline() for _ in range(3)]
+    except OSError:
+        return None
+    if ';' in head[2]:
+        return 'raw'
+    if head[0].startswith('Timestamp,') or ',Timestamp' in head[0]:
+        return 'cleaned'
+    return None
+
+
+def _inside(path, folder):
+    # True if path lies below folder (both absolute)
+    return path.startswith(folder.rstrip(os.sep) + os.sep)
+
+
+class ArchiveIndexer:
+    def __init__(self, catalog=None):
+        self.catalog = catalog or Catalog()
+
+    def add_root(self, root):
+        """Index root from now on and return it. A folder inside an indexed root is already
+        covered, so that root is returned instead; indexed roots inside root are merged into it."""
+        root = os.path.abspath(root)
+        containing = self.root_of(root)
+        if containing is not None:
+            return containing
+        nested = [r for r in self.roots() if _inside(r, root)]
+        with self.catalog.connection() as db:
+            for old in nested:
+                db.execute("UPDATE folders SET root = ? WHERE root = ?", (root, old))
+                db.execute("UPDATE archive_files SET root = ? WHERE root = ?", (root, old))
+                db.execute("DELETE FROM roots WHERE path = ?", (old,))
+            db.execute("INSERT INTO roots (path, last_scan) VALUES (?, NULL)", (root,))
+        return root
+
+    def root_of(self, path):
+        """The indexed root that path is or lies in, None if there is none."""
+        path = os.path.abspath(path)
+        for root in self.roots():
+            if path == root or _inside(path, root):
+                return root
+        return None
+
+    def roots(self):
+        return [r['path'] for r in self.catalog.connection().execute("SELECT path FROM roots ORDER BY path")]
+
+    def remove_root(self, root):
+        root = os.path.abspath(root)
+        db = self.catalog.connection()
+        paths = [r['path'] for r in db.execute(
+            "SELECT path FROM archive_files WHERE root = ? AND status = 'dataset'", (root,))]
+        for path in paths:
+            self.catalog.remove(path)
+        with db:
+            db.execute("DELETE FROM archive_files WHERE root = ?", (root,))
+            db.execute("DELETE FROM folders WHERE root = ?", (root,))
+            db.execute("DELETE FROM roots WHERE path = ?", (root,))
+
+    def scan(self, root, quick=True, progress=None, should_stop=None):
+        """Bring the catalog up to date with the files under root.
+
+        With quick=False every folder is listed again (e.g. after files were added to a folder
+        on a drive that does not update folder mtimes). progress(message) is called as files
+        are registered; should_stop() is polled to abort early. A folder inside an indexed root
+        scans that root. Returns counts per outcome.
+        """
+        root = self.add_root(root)
+        db = self.catalog.connection()
+        known_folders = {r['path']: r['mtime'] for r in db.execute(
+            "SELECT path, mtime FROM folders WHERE root = ?", (root,))}
+        subfolders = {}
+        for r in db.execute("SELECT path, parent FROM folders WHERE root = ?", (root,)):
+            subfolders.setdefault(r['parent'], []).append(r['path'])
+        known_files = {}
+        files_in = {}
+        for r in db.execute("SELECT path, folder, size, mtime, status FROM archive_files WHERE root = ?", (root,)):
+            known_files[r['path']] = (r['size'], r['mtime'], r['status'])
+            files_in.setdefault(r['folder'], []).append(r['path'])
+
+        counts = {'new': 0, 'changed': 0, 'unchanged': 0, 'removed': 0, 'ignored': 0, 'failed': 0, 'folders_listed': 0}
+        seen_folders = {}
+        seen_files = set()
+        updates = []
+        stack = [(root, None)]
+        while stack:
+            if should_stop is not None and should_stop():
+                break
+            folder, parent = stack.pop()
+            try:
+                folder_mtime = os.stat(folder).st_mtime
+            except OSError:
+                continue
+            seen_folders[folder] = (parent, folder_mtime)
+            if quick and known_folders.get(folder) == folder_mtime:
+                # Nothing was added, removed or renamed here: reuse the recorded listing
+                stack.extend((sub, folder) for sub in subfolders.get(folder, []))
+                candidates = files_in.get(folder, [])
+            else:
+                counts['folders_listed'] += 1
+                candidates = []
+                try:
+                    with os.scandir(folder) as entries:
+                        for entry in entries:
+                            if entry.is_dir(follow_symlinks=False):
+                                if not skip_folder(entry.name):
+                                    stack.append((entry.path, folder))
+                            elif entry.name.lower().endswith(EXPORT_EXTENSIONS):
+                                candidates.append(entry.path)
+                except OSError as e:
+                    print(f"Cannot list {folder}: {e}")
+
+            for path in candidates:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                seen_files.add(path)
+                known = known_files.get(path)
+                if known is not None and known[0] == st.st_size and known[1] == st.st_mtime:
+                    counts['unchanged'] += 1
+                    continue
+                status = self._index_file(path, progress)
+                counts[status if status != 'dataset' else ('new' if known is None else 'changed')] += 1
+                updates.append((path, folder, root, st.st_size, st.st_mtime, status))
+
+        stopped = should_stop is not None and should_stop()
+        with db:
+            db.executemany("INSERT OR REPLACE INTO archive_files (path, folder, root, size, mtime, status) "
+                           "VALUES (?, ?, ?, ?, ?, ?)", updates)
+            db.executemany("INSERT OR REPLACE INTO folders (path, parent, root, mtime) VALUES (?, ?, ?, ?)",
+                           [(path, parent, root, mtime) for path, (parent, mtime) in seen_folders.items()])
+            if not stopped:
+                # Files and folders that disappeared since the last complete scan
+                gone = [path for path in known_files if path not in seen_files]
+                for path in gone:
+                    if known_files[path][2] == 'dataset':
+                        self.catalog.remove(path)
+                counts['removed'] = len(gone)
+                db.executemany("DELETE FROM archive_files WHERE path = ?", [(p,) for p in gone])
+                db.executemany("DELETE FROM folders WHERE path = ?",
+                               [(p,) for p in known_folders if p not in seen_folders])
+                db.execute("UPDATE roots SET last_scan = ? WHERE path = ?", (time.time(), root))
+        return counts
+
+    def _index_file(self, path, progress):
+        kind = export_kind(path)
+        if kind is None:
+            return 'ignored'
+        if progress is not None:
+            progress(f"Indexing {os.path.basename(path)}")
+        try:
+            self.catalog.register(path, kind=kind, force=True)
+        except Exception as e:
+            print(f"Failed to index {path}: {e}")
+            return 'failed'
+        return 'dataset'
+
+    def index_folder(self, folder_path, progress=None):
+        """Register the exports directly in folder_path (not its subfolders) without making it
+        a root; a later scan of a root containing it takes its files over."""
+        folder_path = os.path.abspath(folder_path)
+        db = self.catalog.connection()
+        known = {r['path']: (r['size'], r['mtime']) for r in db.execute(
+            "SELECT path, size, mtime FROM archive_files WHERE folder = ?", (folder_path,))}
+        try:
+            folder_mtime = os.stat(folder_path).st_mtime
+            with os.scandir(folder_path) as entries:
+                paths = [entry.path for entry in entries if not entry.is_dir(follow_symlinks=False)
+                         and entry.name.lower().endswith(EXPORT_EXTENSIONS)]
+        except OSError as e:
+            print(f"Cannot list {folder_path}: {e}")
+            return
+        updates = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if known.get(path) != (st.st_size, st.st_mtime):
+                status = self._index_file(path, progress)
+                updates.append((path, folder_path, None, st.st_size, st.st_mtime, status))
+        with db:
+            db.executemany("INSERT OR REPLACE INTO archive_files (path, folder, root, size, mtime, status) "
+                           "VALUES (?, ?, ?, ?, ?, ?)", updates)
+            db.execute("INSERT OR IGNORE INTO folders (path, parent, root, mtime) VALUES (?, NULL, NULL, ?)",
+                       (folder_path, folder_mtime))
+
+    def find_cleaned_csv(self, folder_path):
+        """Indexed replacement for the old scripts' find_cleaned_csv: first file in the folder
+        with 'clean' in its name, looked up in the catalog (the folder is indexed if needed)."""
+        folder_path = os.path.abspath(folder_path)
+        db = self.catalog.connection()
+        if db.execute("SELECT 1 FROM folders WHERE path = ?", (folder_path,)).fetchone() is None:
+            self.index_folder(folder_path)
+        for r in db.execute("SELECT path FROM archive_files WHERE folder = ? AND status = 'dataset' "
+                            "ORDER BY path", (folder_path,)):
+            if 'clean' in os.path.basename(r['path']):
+                return r['path']
+        return None
+
+
+def main():
+    indexer = ArchiveIndexer()
+    roots = sys.argv[1:] or indexer.roots()
+    for root in roots:
+        start = time.perf_counter()
+        counts = indexer.scan(root, progress=print)
+        print(f"{root}: {counts} in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
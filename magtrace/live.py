@@ -0,0 +1,441 @@
+"""Live-stream core: ring buffer, streaming detectors, per-source panels and replay metrics."""
+import json
+import os
+import time
+
+import numpy as np
+
+from .store import ColumnStore
+
+# Where the live viewer listens for rows and replay_publisher.py sends them
+LIVE_SOCKET_PORT = 5757
+LIVE_SOCKET_NAME = 'magtrace-live'
+
+
+class LiveRingBuffer:
+    """Fixed-capacity NumPy ring buffer holding the most recent rows of all live channels.
+
+    Every row is written twice (at i and i + capacity) so the latest rows are always one
+    contiguous slice and can be handed to matplotlib without copying. Rows pushed out of
+    the buffer are appended to a binary history file instead of being kept in memory.
+    """
+
+    def __init__(self, columns, capacity=200000, time_column=None, history_path=None):
+        self.columns = list(columns)
+        self.capacity = int(capacity)
+        self.time_index = self.columns.index(time_column) if time_column in self.columns else None
+        self._data = np.full((2 * self.capacity, len(self.columns)), np.nan)
+        self._head = 0
+        self._count = 0
+        self.total_rows = 0
+        self.history_path = history_path
+        self.history_rows = 0
+        self._history_file = None
+        if history_path:
+            with open(history_path + '.json', 'w') as f:
+                json.dump({'columns': self.columns, 'dtype': 'float64'}, f)
+            self._history_file = open(history_path, 'wb')
+
+    def __len__(self):
+        return self._count
+
+    def append(self, rows):
+        rows = np.asarray(rows, dtype=np.float64)
+        if rows.ndim == 1:
+            rows = rows.reshape(1, -1)
+        n = len(rows)
+        if n == 0:
+            return
+        self.total_rows += n
+        if n >= self.capacity:
+            # Everything currently buffered plus the head of this batch spills to disk
+            self._spill(self.view())
+            self._spill(rows[:n - self.capacity])
+            rows = rows[n - self.capacity:]
+            self._head = 0
+            self._count = 0
+            n = len(rows)
+        overflow = self._count + n - self.capacity
+        if overflow > 0:
+            self._spill(self.view()[:overflow])
+            self._count -= overflow
+        positions = (self._head + np.arange(n)) % self.capacity
+        self._data[positions] = rows
+        self._data[positions + self.capacity] = rows
+        self._head = (self._head + n) % self.capacity
+        self._count += n
+
+    def view(self):
+        start = (self._head - self._count) % self.capacity
+        return self._data[start:start + self._count]
+
+    def rows_between(self, start, stop):
+        # Rows by absolute row number (0 = first row ever appended), clipped to what is still buffered
+        first = self.total_rows - self._count
+        start = max(start, first)
+        stop = min(stop, self.total_rows)
+        return self.view()[start - first:max(start, stop) - first]
+
+    def column(self, name, rows=None):
+        data = self.view() if rows is None else rows
+        return data[:, self.columns.index(name)]
+
+    def window(self, span):
+        # Rows whose time lies within `span` of the newest sample (time column must be increasing)
+        data = self.view()
+        if span is None or self.time_index is None or len(data) == 0:
+            return data
+        t = data[:, self.time_index]
+        start = np.searchsorted(t, t[-1] - span, side='left')
+        return data[start:]
+
+    def _spill(self, rows):
+        if self._history_file is not None and len(rows):
+            self._history_file.write(np.ascontiguousarray(rows).tobytes())
+            self.history_rows += len(rows)
+
+    def flush(self):
+        if self._history_file is not None:
+            self._history_file.flush()
+
+    def close(self):
+        if self._history_file is not None:
+            self._history_file.close()
+            self._history_file = None
+
+
+def load_live_history(history_path):
+    # Memory-map a history file written by LiveRingBuffer as a DataFrame
+    import pandas as pd
+    with open(history_path + '.json') as f:
+        meta = json.load(f)
+    if os.path.getsize(history_path) == 0:
+        return pd.DataFrame(columns=meta['columns'])
+    data = np.memmap(history_path, dtype=meta['dtype'], mode='r').reshape(-1, len(meta['columns']))
+    return pd.DataFrame(data, columns=meta['columns'])
+
+
+def forward_fill(values):
+    # Replace NaNs by the last valid value above them in the same column (leading NaNs stay)
+    valid = ~np.isnan(values)
+    idx = np.where(valid, np.arange(len(values))[:, np.newaxis], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return values[idx, np.arange(values.shape[1])]
+
+
+VOLTAGE_TAP_CHANNELS = ['CH1', 'CH2', 'CH3', 'CH4', 'CH5', 'CH6']
+
+
+HALL_SENSOR_CHANNELS = ['CH7', 'CH8', 'CH9']
+
+
+class DetectorRule:
+    """One alarm condition on one channel.
+
+    kind is 'abs' (|x| > limit), 'deviation' (|x - rolling mean| > limit * rolling std) or
+    'rate' (|smoothed dx/dt| > limit, per second). The condition must hold for `hold`
+    consecutive samples before it triggers.
+    """
+
+    def __init__(self, channel, kind, limit, hold=1):
+        if kind not in ('abs', 'deviation', 'rate'):
+            raise ValueError(f"Unknown detector kind: {kind}")
+        self.channel = channel
+        self.kind = kind
+        self.limit = float(limit)
+        self.hold = max(1, int(hold))
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['channel'], d['kind'], d['limit'], d.get('hold', 1))
+
+    def describe(self):
+        symbol = {'abs': '|x|', 'deviation': 'σ-dev', 'rate': '|dx/dt|'}[self.kind]
+        return f"{self.channel} {symbol} > {self.limit:g}"
+
+
+def default_detector_rules(columns):
+    # Deviation alarms on the voltage taps, rate alarms on the Hall sensors and supply currents
+    rules = []
+    for col in columns:
+        name = col.split('(')[0].strip()
+        if name in VOLTAGE_TAP_CHANNELS:
+            rules.append(DetectorRule(col, 'deviation', 8.0, hold=3))
+        elif name in HALL_SENSOR_CHANNELS:
+            rules.append(DetectorRule(col, 'rate', 1.0, hold=3))
+        elif name.startswith('Magna_') and name.endswith('_current'):
+            rules.append(DetectorRule(col, 'rate', 100.0, hold=3))
+    return rules
+
+
+def load_detector_rules(file_path):
+    # JSON list of {"channel": ..., "kind": ..., "limit": ..., "hold": ...}
+    with open(file_path) as f:
+        return [DetectorRule.from_dict(d) for d in json.load(f)]
+
+
+class LiveDetector:
+    """Streaming threshold and quench detection on the rows fed to the live ring buffer.
+
+    Rolling mean/std and the smoothed derivative are exponentially weighted and carried as
+    filter state between batches, so every sample costs O(1) and a batch is processed in a
+    few vectorized calls regardless of the logger rate. Each trigger is appended to
+    events.jsonl immediately; the pre/post-trigger window is written to its own CSV once
+    `post_rows` further rows have arrived.
+    """
+
+    def __init__(self, columns, rules, time_column=None, time_scale=1e-3, alpha=0.01,
+                 pre_rows=2000, post_rows=2000, event_dir=None):
+        self.columns = list(columns)
+        self.rules = [r for r in rules if r.channel in self.columns]
+        self.time_index = self.columns.index(time_column) if time_column in self.columns else None
+        self.time_scale = time_scale  # converts the time column to seconds
+        self.alpha = alpha
+        self.warmup = int(1 / alpha)
+        self.pre_rows = pre_rows
+        self.post_rows = post_rows
+        self.event_dir = event_dir
+        self.events = []
+        self.pending = []
+        self.samples_seen = 0
+        self.channels = sorted({self.columns.index(r.channel) for r in self.rules})
+        self._slot = {c: i for i, c in enumerate(self.channels)}
+        self._last = None
+        self._last_time = None
+        self._zi = None  # filter state for mean, mean of squares and derivative
+        self._run = [0] * len(self.rules)
+        self._active = [False] * len(self.rules)
+        self._last_trigger = [None] * len(self.rules)
+        if event_dir:
+            os.makedirs(event_dir, exist_ok=True)
+
+    def _ewm(self, x, zi):
+        from scipy.signal import lfilter
+        b, a = [self.alpha], [1.0, self.alpha - 1.0]
+        y, zf = lfilter(b, a, x, axis=0, zi=zi[np.newaxis, :])
+        return y, zf[0]
+
+    def process(self, rows, first_row, record=True):
+        # rows: new samples (already appended to the buffer); first_row: absolute row number of rows[0].
+        # With record=False the statistics are updated (e.g. on the backlog at start) but nothing triggers.
+        n = len(rows)
+        if n == 0 or not self.rules:
+            return []
+        x = forward_fill(rows[:, self.channels])
+        if self._last is not None:
+            x = np.where(np.isnan(x), self._last, x)
+        else:
+            x = np.where(np.isnan(x), 0.0, x)
+        if self.time_index is not None:
+            t = rows[:, self.time_index] * self.time_scale
+        else:
+            t = np.arange(first_row, first_row + n, dtype=np.float64)
+
+        if self._zi is None:
+            keep = 1.0 - self.alpha
+            self._zi = [keep * x[0], keep * x[0] ** 2, np.zeros(x.shape[1])]
+            self._last = x[0]
+            self._last_time = t[0]
+        prev_x = np.vstack([self._last, x[:-1]])
+        prev_t = np.concatenate([[self._last_time], t[:-1]])
+        dt = t - prev_t
+        with np.errstate(divide='ignore', invalid='ignore'):
+            deriv = np.where(dt[:, np.newaxis] > 0, (x - prev_x) / dt[:, np.newaxis], 0.0)
+
+        # Statistics *before* each sample, so a spike does not raise its own threshold
+        keep = 1.0 - self.alpha
+        mean_before, sq_before = self._zi[0] / keep, self._zi[1] / keep
+        mean, self._zi[0] = self._ewm(x, self._zi[0])
+        sq, self._zi[1] = self._ewm(x ** 2, self._zi[1])
+        rate, self._zi[2] = self._ewm(deriv, self._zi[2])
+        prev_mean = np.vstack([mean_before, mean[:-1]])
+        prev_sq = np.vstack([sq_before, sq[:-1]])
+        std = np.sqrt(np.maximum(prev_sq - prev_mean ** 2, 0.0))
+        self._last = x[-1]
+        self._last_time = t[-1]
+        warm = np.arange(self.samples_seen, self.samples_seen + n) >= self.warmup
+        self.samples_seen += n
+
+        new_events = []
+        for i, rule in enumerate(self.rules):
+            c = self._slot[self.columns.index(rule.channel)]
+            if rule.kind == 'abs':
+                exceed = np.abs(x[:, c]) > rule.limit
+            elif rule.kind == 'deviation':
+                exceed = warm & (np.abs(x[:, c] - prev_mean[:, c]) > rule.limit * std[:, c]) & (std[:, c] > 0)
+            else:
+                exceed = np.abs(rate[:, c]) > rule.limit
+            # Consecutive-run length, continuing the run carried over from the previous batch
+            idx = np.arange(n)
+            last_clear = np.maximum.accumulate(np.where(exceed, -1, idx))
+            run = idx - last_clear
+            run[last_clear < 0] += self._run[i]
+            triggered = run >= rule.hold
+            rising = triggered & ~np.concatenate([[self._active[i]], triggered[:-1]])
+            self._run[i] = int(run[-1])
+            self._active[i] = bool(triggered[-1])
+            if not record:
+                continue
+            for j in np.flatnonzero(rising):
+                # A rule that keeps re-triggering is reported once per post-trigger window
+                last = self._last_trigger[i]
+                if last is not None and first_row + j < last + self.post_rows:
+                    continue
+                self._last_trigger[i] = first_row + j
+                event = {
+                    'rule': rule.describe(),
+                    'channel': rule.channel,
+                    'kind': rule.kind,
+                    'row': int(first_row + j),
+                    'time': float(rows[j, self.time_index]) if self.time_index is not None else None,
+                    'value': float(x[j, c]),
+                    'detected_at': time.time(),
+                }
+                new_events.append(event)
+        for event in new_events:
+            self._record(event)
+        return new_events
+
+    def _record(self, event):
+        self.events.append(event)
+        self.pending.append(event)
+        if self.event_dir:
+            with open(os.path.join(self.event_dir, 'events.jsonl'), 'a') as f:
+                f.write(json.dumps(event) + '\n')
+
+    def flush_windows(self, buffer, force=False):
+        # Write pre/post-trigger windows of events whose post window is complete (or all, on force)
+        still_pending = []
+        for event in self.pending:
+            if not force and buffer.total_rows < event['row'] + self.post_rows:
+                still_pending.append(event)
+                continue
+            rows = buffer.rows_between(event['row'] - self.pre_rows, event['row'] + self.post_rows)
+            if self.event_dir:
+                name = f"event_{event['row']}_{event['channel'].split('(')[0]}.csv"
+                import pandas as pd
+                pd.DataFrame(rows, columns=buffer.columns).to_csv(os.path.join(self.event_dir, name), index=False)
+        self.pending = still_pending
+
+
+class LivePanel:
+    """One followed source in the live viewer: its reader, buffer, detector and plotted columns."""
+
+    def __init__(self, name, columns, tail=None):
+        self.name = name
+        self.columns = list(columns)
+        self.tail = tail
+        self.buffer = None
+        self.detector = None
+        self.recording = None
+        self.time_column = 'Timestamp' if 'Timestamp' in self.columns else None
+        self.x_col = 'Timestamp' if 'Timestamp' in self.columns else (self.columns[0] if self.columns else '')
+        self.y1_col = self.columns[0] if self.columns else ''
+        self.y2_col = self.columns[0] if self.columns else ''
+
+    def y_cols(self):
+        # Plot Y2 if selected and different from Y1 and present in columns
+        cols = [self.y1_col] if self.y1_col in self.columns else []
+        if self.y2_col and self.y2_col != self.y1_col and self.y2_col in self.columns:
+            cols.append(self.y2_col)
+        return cols
+
+    def begin_session(self, base_path, capacity, rules=None, record=True):
+        # Fresh buffer per run. With recording on, every row also goes to a ColumnStore
+        # (<base>.magrec), which then doubles as the history; otherwise rows older than the
+        # buffer capacity are kept in the raw history file.
+        self.close()
+        self.recording = None
+        if record:
+            self.recording = ColumnStore.create(base_path + '.magrec', self.columns,
+                                                source=self.tail.file_path if self.tail else None)
+        self.buffer = LiveRingBuffer(self.columns, capacity=capacity, time_column=self.time_column,
+                                     history_path=None if record else base_path + '.history.bin')
+        self.detector = None
+        if rules is not None:
+            self.detector = LiveDetector(self.columns, rules, time_column=self.time_column,
+                                         event_dir=os.path.splitext(base_path)[0] + '_events')
+
+    def ingest(self, rows, record=True):
+        # Returns the detector events raised by these rows
+        self.buffer.append(rows)
+        if self.recording is not None:
+            self.recording.append(rows)
+        if self.detector is None:
+            return []
+        events = self.detector.process(rows, self.buffer.total_rows - len(rows), record=record)
+        self.detector.flush_windows(self.buffer)
+        return events
+
+    def close(self):
+        if self.detector is not None and self.buffer is not None:
+            self.detector.flush_windows(self.buffer, force=True)
+        if self.buffer is not None:
+            self.buffer.close()
+        if self.recording is not None and self.recording.is_open():
+            # The consumed file size lets the cleaner tell whether the recording covers the whole file
+            self.recording.close(source_size=self.tail.consumed_bytes() if self.tail is not None else None)
+
+    def session_range(self):
+        # (first, last) time of the whole recorded session
+        if self.recording is None or not len(self.recording) or self.time_column is None:
+            return None
+        t = self.recording.read(self.time_column, 0, 1)
+        return float(t[0]), float(self.buffer.column(self.time_column)[-1])
+
+
+class ReplayMetrics:
+    """Ingest throughput, end-to-end latency (row due -> frame on screen) and dropped frames."""
+
+    def __init__(self, target_fps):
+        self.target_fps = target_fps
+        self.rows = 0
+        self.batches = 0
+        self.frames = 0
+        self.dropped_frames = 0
+        self.latencies = []
+        self._waiting = []
+        self._start = None
+        self._last_frame = None
+        self._end = None
+
+    def on_ingest(self, n_rows, due):
+        if self._start is None:
+            self._start = time.perf_counter()
+        self.rows += n_rows
+        self.batches += 1
+        self._waiting.append(due)
+
+    def on_frame(self):
+        now = time.perf_counter()
+        if self._waiting:
+            # Frame slots that passed without a frame while data was waiting to be drawn
+            waiting_since = min(self._waiting)
+            if self._last_frame is not None:
+                waiting_since = max(self._last_frame, waiting_since)
+            self.dropped_frames += max(0, int((now - waiting_since) * self.target_fps))
+        self.latencies.extend(now - due for due in self._waiting)
+        self._waiting = []
+        self.frames += 1
+        self._last_frame = now
+
+    def finish(self):
+        self._end = time.perf_counter()
+
+    def summary(self):
+        end = self._end or time.perf_counter()
+        duration = end - self._start if self._start is not None else 0.0
+        lat = np.array(self.latencies) * 1000
+        pct = np.percentile(lat, [50, 95, 99]) if len(lat) else [np.nan] * 3
+        return {
+            'rows': self.rows,
+            'batches': self.batches,
+            'duration_s': round(duration, 3),
+            'rows_per_s': round(self.rows / duration, 1) if duration > 0 else None,
+            'frames': self.frames,
+            'fps': round(self.frames / duration, 2) if duration > 0 else None,
+            'dropped_frames': self.dropped_frames,
+            'latency_ms_p50': round(float(pct[0]), 2),
+            'latency_ms_p95': round(float(pct[1]), 2),
+            'latency_ms_p99': round(float(pct[2]), 2),
+        }
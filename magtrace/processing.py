@@ -0,0 +1,142 @@
+"""Masking, scaling, resistance and combining of runs, shared by the GUI tools and scripts."""
+import numpy as np
+
+from .derivatives import derivative
+
+# Cleaner "Scale" choices
+SCALE_FACTORS = {'1x': 1.0, '÷10': 0.1, '÷100': 0.01, '÷1000': 0.001}
+
+# Plotter "Voltage Scale" choices: factor from the stored column to volts
+VOLTAGE_SCALES = {'mV': 1.0e-3, 'mV×100': 1.0e-3 / 100, 'mV×1000': 1.0e-3 / 1000}
+
+# Timestamp units, expressed in minutes
+UNIT_TO_MIN = {"ms": 1 / 60000, "s": 1 / 60, "min": 1, "h": 60, "day": 1440}
+
+
+def apply_scale_offset(values, scale='1x', offset=0.0):
+    # Offset first, then scaling
+    return (values + offset) * SCALE_FACTORS.get(scale, 1.0)
+
+
+def time_mask(timestamps, time_range=None, exclude_regions=()):
+    """Boolean mask of the samples inside time_range and outside every exclude region (bounds inclusive)."""
+    t = np.asarray(timestamps)
+    mask = np.ones(len(t), dtype=bool)
+    if time_range is not None:
+        mask &= (t >= time_range[0]) & (t <= time_range[1])
+    for start, end in exclude_regions:
+        mask &= ~((t >= start) & (t <= end))
+    return mask
+
+
+def filter_time(df, time_range=None, exclude_regions=()):
+    if 'Timestamp' not in df.columns:
+        return df
+    return df[time_mask(df['Timestamp'].to_numpy(), time_range, exclude_regions)]
+
+
+def clean_dataframe(df, time_range=None, exclude_regions=(), column_scales=None, column_offsets=None):
+    """The cleaner's saved output: time filtered, scaled and offset, scaled columns renamed."""
+    column_scales = column_scales or {}
+    column_offsets = column_offsets or {}
+    df_filtered = filter_time(df, time_range, exclude_regions).copy()
+    renames = {}
+    for column, scale in column_scales.items():
+        if column in df_filtered.columns:
+            df_filtered[column] = apply_scale_offset(df_filtered[column], scale, column_offsets.get(column, 0.0))
+            # Update column name to reflect scaling
+            if scale != '1x':
+                renames[column] = f"{column}_{scale[1:]}"  # Remove the '÷' symbol
+    return df_filtered.rename(columns=renames)
+
+
+def convert_time(values, base_unit='min', plot_unit='min'):
+    return np.asarray(values) * UNIT_TO_MIN[base_unit] / UNIT_TO_MIN[plot_unit]
+
+
+def range_mask(x, x_min=None, x_max=None):
+    x = np.asarray(x)
+    mask = np.ones(len(x), dtype=bool)
+    if x_min is not None:
+        mask &= x >= x_min
+    if x_max is not None:
+        mask &= x <= x_max
+    return mask
+
+
+def resistance(voltage, current, voltage_scale='mV'):
+    # Resistance in µΩ from a voltage column in the given scale and a current column in A
+    return (voltage * VOLTAGE_SCALES.get(voltage_scale, 1.0e-3) / current) * 1e6
+
+
+def value_at(x, y, target):
+    """y at the sample whose x is closest to target (e.g. the resistance at 100 A), None if empty."""
+    x = np.asarray(x, dtype=np.float64)
+    if not len(x) or np.isnan(x).all():
+        return None
+    return np.asarray(y)[np.nanargmin(np.abs(x - target))]
+
+
+def combine_runs(dfs):
+    """Concatenate runs in order, shifting each Timestamp to start just after the previous run."""
+    import pandas as pd
+    shifted = []
+    offset = 0
+    for df in dfs:
+        if 'Timestamp' in df.columns:
+            df = df.copy()
+            df['Timestamp'] = df['Timestamp'] + offset
+            offset = df['Timestamp'].iloc[-1] + 0.01  # ensure next starts slightly after
+        shifted.append(df)
+    return pd.concat(shifted, ignore_index=True)
+
+
+def map_threads(func, items, workers=None):
+    """[func(item) for item in items], run in a thread pool when there is more than one item.
+    Parsing and most numpy reductions release the GIL, so runs are processed side by side."""
+    items = list(items)
+    if len(items) <= 1 or workers == 1:
+        return [func(item) for item in items]
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers or min(8, len(items))) as pool:
+        return list(pool.map(func, items))
+
+
+def minmax_decimate(x, y, n_buckets):
+    # Keep the min and max of y in each of n_buckets equal-count slices so spikes survive decimation
+    n = len(x)
+    if n_buckets <= 0 or n <= 2 * n_buckets:
+        return x, y
+    size = n // n_buckets
+    m = size * n_buckets
+    blocks = y[:m].reshape(n_buckets, size)
+    nan = np.isnan(blocks)
+    base = np.arange(n_buckets) * size
+    i_min = base + np.argmin(np.where(nan, np.inf, blocks), axis=1)
+    i_max = base + np.argmax(np.where(nan, -np.inf, blocks), axis=1)
+    idx = np.concatenate([np.sort(np.concatenate([i_min, i_max])), np.arange(m, n)])
+    return x[idx], y[idx]
+
+
+def apply_transforms(y, x, transforms):
+    """Apply the plotter's per-series transforms in order: 'abs', and 'deriv' (y.diff() / x.diff())
+    or ('deriv', method, window) for dy/dx by a magtrace.derivatives method. y may be 2-D
+    with one column per channel."""
+    y = np.asarray(y)
+    for transform in transforms:
+        if transform == 'abs':
+            y = np.abs(y.astype(np.float64))
+        elif transform == 'deriv' or (isinstance(transform, tuple) and transform[0] == 'deriv'):
+            method, window = ('difference', None) if transform == 'deriv' else transform[1:]
+            y = derivative(x, y, method, window)
+        else:
+            raise ValueError(f"Unknown transform: {transform}")
+    return y
+
+
+def take_rows(values, rows, breaks=()):
+    """values[rows] with a NaN inserted before each position in breaks (to break a plotted line)."""
+    values = np.asarray(values)[rows]
+    if len(breaks):
+        values = np.insert(values.astype(np.float64), breaks, np.nan)
+    return values
@@ -0,0 +1,169 @@
+"""Resampling of channels onto a uniform time grid.
+
+    from magtrace.resample import resample_frame, resample_file
+    uniform = resample_frame(df, period_s=1.0, how='mean')           # a loaded run
+    uniform = resample_file('long_run.txt', period_s=1.0, how='max')  # streamed in chunks
+
+Grid points are start + k * period (Timestamp in minutes, like the cleaned files). 'mean',
+'min', 'max' and 'last' aggregate the samples in [t_k, t_k + period) and are labelled with
+t_k; 'linear' interpolates at t_k. Intervals without samples are NaN ('linear': no sample
+within one period).
+"""
+import numpy as np
+
+from .derivatives import interp_columns
+
+AGGREGATIONS = ('mean', 'min', 'max', 'last', 'linear')
+
+
+def _aggregate(t, values, bins, first, last, how, grid, period_min):
+    # Rows of `values` (sorted by t, with interval numbers `bins`) reduced to intervals first..last
+    n_out = last - first + 1
+    out = np.full((n_out, values.shape[1]), np.nan)
+    if n_out <= 0 or len(t) == 0:
+        return out[:max(n_out, 0)]
+    if how == 'linear':
+        out = interp_columns(grid, t, values)
+        # No sample within one period of a grid point (e.g. an excluded region): leave a gap
+        i = np.searchsorted(t, grid)
+        after = np.where(i < len(t), t[np.minimum(i, len(t) - 1)] - grid, np.inf)
+        before = np.where(i > 0, grid - t[np.maximum(i - 1, 0)], np.inf)
+        out[np.minimum(after, before) > period_min] = np.nan
+        return out
+    sel = (bins >= first) & (bins <= last)
+    b = bins[sel] - first
+    v = values[sel]
+    if len(b) == 0:
+        return out
+    starts = np.flatnonzero(np.diff(np.concatenate([[-1], b])) != 0)
+    valid = ~np.isnan(v)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if how == 'mean':
+            agg = np.add.reduceat(np.where(valid, v, 0.0), starts, axis=0) / np.add.reduceat(valid, starts, axis=0)
+        elif how == 'min':
+            agg = np.fmin.reduceat(v, starts, axis=0)
+        elif how == 'max':
+            agg = np.fmax.reduceat(v, starts, axis=0)
+        elif how == 'last':
+            position = np.where(valid, np.arange(len(v))[:, np.newaxis], -1)
+            last_valid = np.maximum.reduceat(position, starts, axis=0)
+            agg = np.where(last_valid >= 0, v[np.maximum(last_valid, 0), np.arange(v.shape[1])], np.nan)
+        else:
+            raise ValueError(f"Unknown aggregation: {how}")
+    out[b[starts]] = agg
+    return out
+
+
+class Resampler:
+    """Resamples rows fed chunk by chunk in time order; gives the same result as one pass.
+
+    feed() returns (grid, values) of the intervals completed so far, flush() the rest. Rows
+    of the last, possibly unfinished interval are carried over to the next chunk.
+    """
+
+    def __init__(self, period_s, how='mean', start=None):
+        if how not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation: {how}")
+        if not period_s > 0:
+            raise ValueError("The resampling period must be positive")
+        self.period_min = period_s / 60
+        self.how = how
+        self.start = start
+        self.next_bin = 0
+        self._t = None
+        self._values = None
+
+    def feed(self, time_min, values):
+        return self._process(time_min, values, final=False)
+
+    def flush(self):
+        return self._process(np.zeros(0), None, final=True)
+
+    def _process(self, time_min, values, final):
+        t = np.asarray(time_min, dtype=np.float64)
+        if values is not None:
+            values = np.asarray(values, dtype=np.float64)
+            values = values[:, np.newaxis] if values.ndim == 1 else values
+            keep = ~np.isnan(t)
+            t, values = t[keep], values[keep]
+        if self._t is not None:
+            t = np.concatenate([self._t, t])
+            values = self._values if values is None else np.concatenate([self._values, values])
+        if values is None or len(t) == 0:
+            return np.zeros(0), np.zeros((0, 0 if values is None else values.shape[1]))
+        if np.any(np.diff(t) < 0):
+            order = np.argsort(t, kind='stable')
+            t, values = t[order], values[order]
+        if self.start is None:
+            self.start = t[0]
+        bins = np.floor((t - self.start) / self.period_min).astype(np.int64)
+        last = bins[-1] if final else bins[-1] - 1
+        first = self.next_bin
+        grid = self.start + np.arange(first, max(last + 1, first)) * self.period_min
+        out = _aggregate(t, values, bins, first, last, self.how, grid, self.period_min)
+        if final:
+            self._t = self._values = None
+        else:
+            # Keep the unfinished interval, and for interpolation the sample before it
+            carry = np.flatnonzero(bins == bins[-1])[0]
+            if self.how == 'linear':
+                carry = max(carry - 1, 0)
+            self._t, self._values = t[carry:], values[carry:]
+            self.next_bin = max(last + 1, first)
+        return grid, out
+
+
+def resample(time_min, values, period_s, how='mean', start=None):
+    """(grid, values) of values (n,) or (n, k) resampled to period_s seconds in one pass."""
+    resampler = Resampler(period_s, how, start)
+    grid, out = resampler.feed(time_min, values)
+    grid_end, out_end = resampler.flush()
+    grid = np.concatenate([grid, grid_end])
+    out = np.concatenate([out, out_end]) if len(out) else out_end
+    return grid, (out[:, 0] if np.ndim(values) == 1 else out)
+
+
+def _frame(grid, out, columns, time_col, drop_empty):
+    import pandas as pd
+    df = pd.DataFrame(out, columns=columns)
+    df.insert(0, time_col, grid)
+    if drop_empty and len(columns):
+        df = df[~np.isnan(out).all(axis=1)].reset_index(drop=True)
+    return df
+
+
+def _value_columns(df, columns, time_col):
+    numeric = df.select_dtypes(include='number').columns
+    return [c for c in (columns or numeric) if c != time_col and c in numeric]
+
+
+def resample_frame(df, period_s, how='mean', columns=None, time_col='Timestamp', drop_empty=True):
+    """A run (Timestamp in minutes) resampled onto a uniform grid, Timestamp first.
+
+    columns defaults to every numeric column. With drop_empty, intervals without any sample
+    (gaps, excluded regions) are left out instead of written as rows of NaN.
+    """
+    columns = _value_columns(df, columns, time_col)
+    grid, out = resample(df[time_col].to_numpy(dtype=np.float64), df[columns].to_numpy(dtype=np.float64),
+                         period_s, how)
+    return _frame(grid, out, columns, time_col, drop_empty)
+
+
+def resample_file(file_path, period_s, how='mean', columns=None, time_col='Timestamp', drop_empty=True,
+                  chunk_rows=500000):
+    """Like resample_frame, but reads the export or cleaned CSV in chunks of chunk_rows rows."""
+    from .dataio import iter_run_chunks
+    resampler = Resampler(period_s, how)
+    grids, outs = [], []
+    for i, chunk in enumerate(iter_run_chunks(file_path, chunk_rows)):
+        if i == 0:
+            columns = _value_columns(chunk, columns, time_col)
+        grid, out = resampler.feed(chunk[time_col].to_numpy(dtype=np.float64),
+                                   chunk[columns].to_numpy(dtype=np.float64))
+        grids.append(grid)
+        outs.append(out.reshape(len(grid), len(columns)))
+    columns = columns or []
+    grid, out = resampler.flush()
+    grids.append(grid)
+    outs.append(out.reshape(len(grid), len(columns)))
+    return _frame(np.concatenate(grids), np.concatenate(outs), columns, time_col, drop_empty)
@@ -0,0 +1,251 @@
+"""Noise spectra of channels: Welch power spectral density and spectrogram.
+
+    from magtrace.spectrum import welch_frame, welch_file
+    spectrum = welch_frame(df, ['CH1', 'CH2'], nperseg=4096)                  # a loaded run
+    spectrum = welch_file('long_run.txt', ['CH1', 'CH2'], spectrogram=True)  # streamed from disk
+    spectrum.freqs, spectrum.psd                                             # Hz, units^2/Hz
+
+Segments of nperseg samples overlap by `overlap`, have their mean removed and are windowed
+(Hann by default), like scipy.signal.welch with its defaults. All channels of a batch of
+segments go through one FFT call. Rows are fed in blocks and only the unfinished last
+segment is kept between blocks, so hours-long recordings are processed in bounded memory.
+Segments containing NaN are skipped for that channel, and a gap in the Timestamp (e.g. an
+excluded region) starts a new segment instead of joining the data on both sides.
+"""
+import os
+import sys
+
+import numpy as np
+
+from .analysis import sample_interval
+from .processing import UNIT_TO_MIN
+
+BATCH_BYTES = 64 * 2 ** 20  # Size of the windowed segments sent to one FFT call
+
+
+def _window(name, nperseg):
+    if name == 'hann':
+        # Periodic Hann, as scipy.signal.get_window('hann', n) returns it
+        return 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(nperseg) / nperseg)
+    from scipy.signal import get_window
+    return get_window(name, nperseg)
+
+
+class Spectrum:
+    """Result of a Welch pass; spec and times are None unless a spectrogram was requested."""
+
+    def __init__(self, columns, fs, freqs, psd, counts, spec=None, times=None):
+        self.columns = list(columns)
+        self.fs = fs
+        self.freqs = freqs          # (nfreq,) Hz
+        self.psd = psd              # (nfreq, k) units^2/Hz, mean over the segments
+        self.counts = counts        # (k,) segments averaged per channel
+        self.spec = spec            # (ntimes, nfreq, k) units^2/Hz
+        self.times = times          # (ntimes,) Timestamp in minutes at the centre of each column
+
+    @property
+    def nbytes(self):
+        return self.psd.nbytes + (self.spec.nbytes if self.spec is not None else 0)
+
+    def frame(self):
+        """PSD as a DataFrame: Frequency (Hz) and one column per channel."""
+        import pandas as pd
+        df = pd.DataFrame(self.psd, columns=self.columns)
+        df.insert(0, 'Frequency', self.freqs)
+        return df
+
+    def peaks(self, column, count=5, min_freq=0.0):
+        """(frequency, PSD) of the strongest lines of a channel, e.g. 50 Hz pickup or supply ripple."""
+        psd = self.psd[:, self.columns.index(column)]
+        keep = np.flatnonzero((self.freqs > min_freq) & np.isfinite(psd))
+        if len(keep) < 3:
+            return []
+        inner = keep[1:-1]
+        local = inner[(psd[inner] >= psd[inner - 1]) & (psd[inner] >= psd[inner + 1])]
+        local = local[np.argsort(psd[local])[::-1][:count]]
+        return [(float(self.freqs[i]), float(psd[i])) for i in local]
+
+
+class WelchAccumulator:
+    """Welch PSD of channels fed block by block in time order; same result as one pass.
+
+    fs is the sample rate in Hz, or None to take it from the Timestamp of the first block.
+    With spectrogram=True the per-segment spectra are kept as well; once there are more than
+    max_columns of them, neighbouring columns are averaged so the memory stays bounded.
+    """
+
+    def __init__(self, fs=None, nperseg=4096, overlap=0.5, window='hann', spectrogram=False,
+                 max_columns=1000):
+        if nperseg < 2:
+            raise ValueError("A segment needs at least 2 samples")
+        if not 0 <= overlap < 1:
+            raise ValueError("The overlap must be in [0, 1)")
+        self.fs = fs
+        self.nperseg = int(nperseg)
+        self.step = max(1, int(round(self.nperseg * (1 - overlap))))
+        self.window = _window(window, self.nperseg)
+        self.spectrogram = spectrogram
+        self.max_columns = max_columns
+        self.freqs = None
+        self._sum = None
+        self._counts = None
+        self._values = None
+        self._t = None
+        # Spectrogram: finished columns, and segments not yet making up a whole column
+        self._group = 1
+        self._columns, self._column_times = [], []
+        self._pending, self._pending_times = [], []
+
+    def feed(self, values, time_min=None):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[:, np.newaxis] if values.ndim == 1 else values
+        t = np.full(len(values), np.nan) if time_min is None else np.asarray(time_min, dtype=np.float64)
+        if self.fs is None:
+            self.fs = 1.0 / sample_interval(t) if time_min is not None else 1.0
+        if self._sum is None:
+            self.freqs = np.fft.rfftfreq(self.nperseg, 1.0 / self.fs)
+            self._sum = np.zeros((len(self.freqs), values.shape[1]))
+            self._counts = np.zeros(values.shape[1], dtype=np.int64)
+        if self._values is not None:
+            values = np.concatenate([self._values, values])
+            t = np.concatenate([self._t, t])
+        # Contiguous pieces: a step of more than 2.5 sample intervals is a gap
+        gaps = np.flatnonzero(np.diff(t) * 60 * self.fs > 2.5) + 1
+        bounds = np.concatenate([[0], gaps, [len(values)]])
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            used = self._segments(values[a:b], t[a:b])
+        # Only the tail of the last piece can continue into the next block
+        self._values, self._t = values[a + used:], t[a + used:]
+
+    def _segments(self, values, t):
+        # Adds every complete segment of one contiguous piece; returns the rows consumed
+        n = len(values)
+        if n < self.nperseg:
+            return 0
+        count = (n - self.nperseg) // self.step + 1
+        k = values.shape[1]
+        scale = 1.0 / (self.fs * np.sum(self.window ** 2))
+        batch = max(1, BATCH_BYTES // (8 * self.nperseg * k))
+        windows = np.lib.stride_tricks.sliding_window_view(values, self.nperseg, axis=0)[::self.step]
+        for start in range(0, count, batch):
+            segs = windows[start:start + batch]                       # (b, k, nperseg) view
+            valid = np.isfinite(segs).all(axis=2)
+            segs = np.where(valid[:, :, np.newaxis], segs, 0.0)
+            segs = (segs - segs.mean(axis=2, keepdims=True)) * self.window
+            power = np.abs(np.fft.rfft(segs, axis=2)) ** 2 * scale
+            power[:, :, 1:(self.nperseg + 1) // 2] *= 2               # one-sided: not DC/Nyquist
+            power = np.where(valid[:, :, np.newaxis], power, 0.0).transpose(0, 2, 1)  # (b, nfreq, k)
+            self._sum += power.sum(axis=0)
+            self._counts += valid.sum(axis=0)
+            if self.spectrogram:
+                power[~np.broadcast_to(valid[:, np.newaxis, :], power.shape)] = np.nan
+                first = start * self.step
+                centres = t[first + self.nperseg // 2:first + self.nperseg // 2 + len(power) * self.step:self.step]
+                self._add_columns(power.astype(np.float32), centres)
+        return count * self.step
+
+    def _add_columns(self, power, centres):
+        pending = np.concatenate(self._pending + [power])
+        times = np.concatenate(self._pending_times + [centres])
+        whole = len(pending) // self._group * self._group
+        if whole:
+            self._columns.append(_nanmean(pending[:whole].reshape((-1, self._group) + pending.shape[1:]), 1))
+            self._column_times.append(times[:whole].reshape(-1, self._group).mean(axis=1))
+        self._pending, self._pending_times = [pending[whole:]], [times[whole:]]
+        while sum(len(c) for c in self._columns) > self.max_columns:
+            # Halve the time resolution: average neighbouring columns
+            columns = np.concatenate(self._columns)
+            times = np.concatenate(self._column_times)
+            even = len(columns) // 2 * 2
+            self._columns = [_nanmean(columns[:even].reshape((-1, 2) + columns.shape[1:]), 1)]
+            self._column_times = [times[:even].reshape(-1, 2).mean(axis=1)]
+            if even < len(columns):
+                # The odd column out goes back to the pending segments it stands for
+                self._pending.insert(0, np.repeat(columns[even:], self._group, axis=0))
+                self._pending_times.insert(0, np.repeat(times[even:], self._group))
+            self._group *= 2
+
+    def result(self, columns=()):
+        """The Spectrum of everything fed so far (the unfinished last segment is left out)."""
+        if self._sum is None:
+            raise ValueError("No samples were fed")
+        with np.errstate(invalid='ignore', divide='ignore'):
+            psd = self._sum / self._counts
+        columns = list(columns) or [f'CH{i + 1}' for i in range(psd.shape[1])]
+        spec = times = None
+        if self.spectrogram:
+            parts, time_parts = list(self._columns), list(self._column_times)
+            pending = np.concatenate(self._pending) if self._pending else np.zeros(0)
+            if len(pending):
+                # The segments of the last, incomplete column
+                parts.append(_nanmean(pending, 0)[np.newaxis])
+                time_parts.append(np.concatenate(self._pending_times).mean(keepdims=True))
+            spec = np.concatenate(parts) if parts else np.zeros((0,) + self._sum.shape, np.float32)
+            times = np.concatenate(time_parts) if time_parts else np.zeros(0)
+        return Spectrum(columns, self.fs, self.freqs, psd, self._counts.copy(), spec, times)
+
+
+def _nanmean(values, axis):
+    # Spectra of segments skipped for NaN stay NaN without "mean of empty slice" warnings
+    import warnings
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanmean(values, axis=axis)
+
+
+def _time_rows(t, t_range):
+    if t_range is None:
+        return slice(None)
+    t_min, t_max = t_range
+    keep = np.ones(len(t), dtype=bool)
+    if t_min is not None:
+        keep &= t >= t_min
+    if t_max is not None:
+        keep &= t <= t_max
+    return keep
+
+
+def welch_frame(df, columns, t_range=None, time_col='Timestamp', time_unit='min', block_rows=1000000, **kw):
+    """Spectrum of columns of a loaded run, optionally only in t_range (minutes).
+
+    time_unit is the unit of the Timestamp column. Keyword arguments go to WelchAccumulator
+    (fs, nperseg, overlap, window, spectrogram).
+    """
+    accumulator = WelchAccumulator(**kw)
+    t = df[time_col].to_numpy(dtype=np.float64) * UNIT_TO_MIN[time_unit] if time_col in df.columns else None
+    rows = _time_rows(t, t_range) if t is not None else slice(None)
+    values = df[list(columns)].to_numpy(dtype=np.float64)[rows]
+    t = t[rows] if t is not None else None
+    for start in range(0, max(len(values), 1), block_rows):
+        accumulator.feed(values[start:start + block_rows],
+                         t[start:start + block_rows] if t is not None else None)
+    return accumulator.result(columns)
+
+
+def welch_file(file_path, columns, t_range=None, time_col='Timestamp', chunk_rows=500000, **kw):
+    """Like welch_frame, but reads the export or cleaned CSV from disk in chunks of chunk_rows rows."""
+    from .dataio import iter_run_chunks
+    accumulator = WelchAccumulator(**kw)
+    for chunk in iter_run_chunks(file_path, chunk_rows):
+        t = chunk[time_col].to_numpy(dtype=np.float64)
+        rows = _time_rows(t, t_range)
+        if t_range is not None and t_range[1] is not None and len(t) and t[0] > t_range[1]:
+            break
+        accumulator.feed(chunk[list(columns)].to_numpy(dtype=np.float64)[rows], t[rows])
+    return accumulator.result(columns)
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("usage: python -m magtrace.spectrum FILE COLUMN [COLUMN ...]")
+        sys.exit(2)
+    file_path, columns = sys.argv[1], sys.argv[2:]
+    spectrum = welch_file(file_path, columns)
+    print(f"{os.path.basename(file_path)}: {spectrum.fs:.1f} Hz sampling, {spectrum.counts.max()} segments")
+    for column in columns:
+        lines = ', '.join(f"{f:.2f} Hz ({p:.3g})" for f, p in spectrum.peaks(column))
+        print(f"{column}: {lines}")
+
+
+if __name__ == '__main__':
+    main()
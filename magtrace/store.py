@@ -0,0 +1,222 @@
+"""Binary column store for live recordings, with a min/max pyramid for fast overviews."""
+import json
+import os
+import time
+
+import numpy as np
+
+
+class MinMaxPyramid:
+    """Per-column min/max of every `block` rows, every block² rows, ... stored next to a ColumnStore.
+
+    Only complete blocks are written; the incomplete tail of each level is kept in memory, so
+    appending stays O(rows) and the files are always consistent.
+    """
+
+    def __init__(self, path, n_columns, block=64, levels=4):
+        self.path = path
+        self.n_columns = n_columns
+        self.block = block
+        self.levels = levels
+        self._pending = [None] * levels  # (mins, maxs) not yet filling a block
+        self._files = None
+
+    def level_paths(self, level):
+        return (os.path.join(self.path, f"pyramid_{level}_min.f64"),
+                os.path.join(self.path, f"pyramid_{level}_max.f64"))
+
+    def open_for_append(self):
+        self._files = [tuple(open(p, 'ab') for p in self.level_paths(k)) for k in range(self.levels)]
+
+    def append(self, rows):
+        mins, maxs = rows, rows
+        for level in range(self.levels):
+            pending = self._pending[level]
+            if pending is not None:
+                mins = np.vstack([pending[0], mins])
+                maxs = np.vstack([pending[1], maxs])
+            n_full = len(mins) // self.block
+            m = n_full * self.block
+            self._pending[level] = (mins[m:], maxs[m:])
+            if n_full == 0:
+                return
+            shape = (n_full, self.block, self.n_columns)
+            mins = np.fmin.reduce(mins[:m].reshape(shape), axis=1)
+            maxs = np.fmax.reduce(maxs[:m].reshape(shape), axis=1)
+            self._files[level][0].write(mins.tobytes())
+            self._files[level][1].write(maxs.tobytes())
+
+    def read(self, level, start_block, stop_block):
+        out = []
+        for p in self.level_paths(level):
+            count = max(0, stop_block - start_block) * self.n_columns
+            data = np.fromfile(p, dtype=np.float64, count=count, offset=start_block * self.n_columns * 8)
+            out.append(data.reshape(-1, self.n_columns))
+        return out
+
+    def blocks(self, level):
+        return os.path.getsize(self.level_paths(level)[0]) // (8 * self.n_columns)
+
+    def flush(self):
+        for pair in self._files or []:
+            for f in pair:
+                f.flush()
+
+    def close(self):
+        for pair in self._files or []:
+            for f in pair:
+                f.close()
+        self._files = None
+
+
+class ColumnStore:
+    """Append-only binary recording of a run: one raw float64 file per column plus meta.json.
+
+    The live viewer writes the rows it parses anyway, so a session can be scrubbed back at full
+    resolution and reopened by the cleaner without parsing the LabVIEW text again. A
+    MinMaxPyramid in the same folder gives fast overviews of long runs.
+    """
+
+    def __init__(self, path, columns, source=None):
+        self.path = path
+        self.columns = list(columns)
+        self.source = source
+        self.n_rows = 0
+        self.complete = False
+        self.source_size = None
+        self.pyramid = MinMaxPyramid(path, len(self.columns))
+        self._files = None
+        self._last_meta = 0.0
+
+    @classmethod
+    def create(cls, path, columns, source=None):
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            if name.endswith('.f64'):
+                os.remove(os.path.join(path, name))
+        store = cls(path, columns, source)
+        store._files = [open(store.column_path(i), 'ab') for i in range(len(store.columns))]
+        store.pyramid.open_for_append()
+        store.write_meta()
+        return store
+
+    @classmethod
+    def open(cls, path):
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        store = cls(path, meta['columns'], meta.get('source'))
+        store.n_rows = meta['rows']
+        store.complete = meta.get('complete', False)
+        store.source_size = meta.get('source_size')
+        store.pyramid.block = meta.get('block', store.pyramid.block)
+        store.pyramid.levels = meta.get('levels', store.pyramid.levels)
+        return store
+
+    def __len__(self):
+        return self.n_rows
+
+    def is_open(self):
+        return self._files is not None
+
+    def column_path(self, index):
+        return os.path.join(self.path, f"col_{index:03d}.f64")
+
+    def append(self, rows):
+        rows = np.asarray(rows, dtype=np.float64)
+        if not len(rows):
+            return
+        for j, f in enumerate(self._files):
+            f.write(np.ascontiguousarray(rows[:, j]).tobytes())
+        self.pyramid.append(rows)
+        self.n_rows += len(rows)
+        # Keep meta.json roughly current without rewriting it on every batch
+        if time.time() - self._last_meta > 1.0:
+            self.flush()
+
+    def write_meta(self):
+        meta = {'columns': self.columns, 'dtype': 'float64', 'rows': self.n_rows, 'source': self.source,
+                'source_size': self.source_size, 'complete': self.complete,
+                'block': self.pyramid.block, 'levels': self.pyramid.levels}
+        tmp = os.path.join(self.path, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.path, 'meta.json'))
+        self._last_meta = time.time()
+
+    def flush_files(self):
+        # Make the rows written so far readable from the column files, without touching meta.json
+        if self._files is not None:
+            for f in self._files:
+                f.flush()
+            self.pyramid.flush()
+
+    def flush(self, source_size=None, complete=False):
+        self.flush_files()
+        if source_size is not None:
+            self.source_size = source_size
+        self.complete = complete
+        self.write_meta()
+
+    def close(self, source_size=None):
+        self.flush(source_size=source_size, complete=True)
+        for f in self._files or []:
+            f.close()
+        self._files = None
+        self.pyramid.close()
+
+    def read(self, name, start=0, stop=None):
+        stop = self.n_rows if stop is None else min(stop, self.n_rows)
+        start = max(0, start)
+        return np.fromfile(self.column_path(self.columns.index(name)), dtype=np.float64,
+                           count=max(0, stop - start), offset=start * 8)
+
+    def read_window(self, columns, time_column, t_end, span, max_points):
+        # Rows with t_end - span <= time <= t_end: full resolution if they fit in max_points,
+        # otherwise min/max pairs from the coarsest pyramid level that still has enough detail
+        t = np.memmap(self.column_path(self.columns.index(time_column)), dtype=np.float64,
+                      mode='r', shape=(self.n_rows,))
+        start = 0 if span is None else int(np.searchsorted(t, t_end - span, side='left'))
+        stop = int(np.searchsorted(t, t_end, side='right'))
+        n = stop - start
+        level, size = -1, 1
+        while level + 1 < self.pyramid.levels and n / (size * self.pyramid.block) > max_points / 4:
+            level += 1
+            size *= self.pyramid.block
+        if level < 0 or n <= max_points:
+            return [self.read(c, start, stop) for c in columns]
+        # Whole blocks from the pyramid, the partial blocks at either end from the raw columns
+        first_block = -(-start // size)
+        last_block = min(stop // size, self.pyramid.blocks(level))
+        mins, maxs = self.pyramid.read(level, first_block, last_block)
+        head = [self.read(c, start, first_block * size) for c in columns]
+        tail = [self.read(c, last_block * size, stop) for c in columns]
+        out = []
+        for k, c in enumerate(columns):
+            j = self.columns.index(c)
+            if c == time_column:
+                middle = np.repeat(mins[:, j], 2)
+            else:
+                middle = np.column_stack([mins[:, j], maxs[:, j]]).ravel()
+            out.append(np.concatenate([head[k], middle, tail[k]]))
+        return out
+
+    def to_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame({c: self.read(c) for c in self.columns})
+
+
+def find_recording(file_path):
+    # A finished live recording of file_path that covers the whole file, or the .magrec folder itself
+    if os.path.basename(file_path) == 'meta.json' and os.path.dirname(file_path).endswith('.magrec'):
+        return os.path.dirname(file_path)
+    path = file_path + '.magrec'
+    if not os.path.isfile(os.path.join(path, 'meta.json')):
+        return None
+    try:
+        store = ColumnStore.open(path)
+        if store.complete and store.source_size == os.path.getsize(file_path):
+            return path
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
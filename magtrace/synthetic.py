@@ -0,0 +1,75 @@
+"""Synthetic LabVIEW exports for benchmarks and scripted checks.
+
+The files look like the logger's: two preamble lines, a row of channel names and a row of
+channel descriptions, then `;`-separated rows with Timestamp in ms. The supply currents
+ramp up and down through plateaus, the voltage taps follow a power-law transition on the
+ramp, the Hall sensors follow the current and everything carries noise.
+"""
+import numpy as np
+
+# Descriptions LabVIEW puts in the second header row
+CHANNEL_DESCRIPTIONS = {
+    7: 'Hall sensor 2', 8: 'Hall sensor 3', 9: 'Hall sensor 1',
+    10: 'OutAmp1', 11: 'OutAmp2', 12: 'OutAmp3', 13: 'OutAmp4', 14: '--',
+    15: 'InAmp1', 16: 'InAmp2', 17: 'InAmp3', 18: 'InAmp4',
+    21: 'PT100 Left', 22: 'PT100 Right',
+}
+
+BASE_COLUMNS = ['Timestamp', 'Time', 'Magna_1_current', 'Magna_2_current', 'Cernox 1', 'Cernox 2', 'Cernox 3']
+
+# One ramp cycle: (seconds into the cycle, current in A)
+RAMP_PROFILE = [(0, 0), (60, 100), (120, 100), (180, 200), (240, 200), (300, 300), (360, 300), (480, 0), (540, 0)]
+
+
+def export_headers(n_channels):
+    names = BASE_COLUMNS + [f"CH{i}" for i in range(1, n_channels + 1)]
+    descriptions = [''] * len(BASE_COLUMNS) + \
+        [CHANNEL_DESCRIPTIONS.get(i, '') for i in range(1, n_channels + 1)]
+    return names, descriptions
+
+
+def ramp_current(t_s, peak=300.0):
+    knots_t, knots_i = zip(*RAMP_PROFILE)
+    return np.interp(t_s % knots_t[-1], knots_t, knots_i) * peak / 300.0
+
+
+def synthetic_rows(first_row, n_rows, n_channels, dt_ms=100.0, ic=250.0, n_value=25.0, seed=0):
+    """Rows first_row .. first_row + n_rows of a synthetic run, float array with NaN in 'Time'.
+
+    The noise depends on seed and first_row only, so a file written in chunks is the same
+    whatever the chunk size.
+    """
+    rng = np.random.default_rng([seed, first_row])
+    t_ms = (first_row + np.arange(n_rows)) * dt_ms
+    current = ramp_current(t_ms / 1000.0)
+    rows = np.empty((n_rows, len(BASE_COLUMNS) + n_channels))
+    rows[:, 0] = t_ms
+    rows[:, 1] = np.nan
+    rows[:, 2] = current + rng.normal(0, 0.05, n_rows)
+    rows[:, 3] = current + rng.normal(0, 0.05, n_rows)
+    rows[:, 4:7] = 20.0 + rng.normal(0, 0.01, (n_rows, 3))
+    channels = rows[:, 7:]
+    channels[:] = rng.normal(0, 1e-4, (n_rows, n_channels))
+    # Voltage taps CH1-CH6 in mV: 1 µV at Ic (1 µV/cm over a 1 cm tap), E ~ (I/Ic)^n
+    taps = min(6, n_channels)
+    transition = 1e-3 * (np.clip(current, 0, None) / ic) ** n_value
+    channels[:, :taps] += transition[:, np.newaxis] * (1 + 0.1 * np.arange(taps))
+    # Hall sensors CH7-CH9 follow the current
+    for i, gain in ((6, 0.0021), (7, 0.0019), (8, 0.0023)):
+        if i < n_channels:
+            channels[:, i] += gain * current
+    return rows
+
+
+def write_labview_export(file_path, n_rows, n_channels=40, dt_ms=100.0, seed=0, chunk_rows=100000):
+    """Write a synthetic LabVIEW export of n_rows rows in chunks (memory stays flat for 10^8 rows)."""
+    names, descriptions = export_headers(n_channels)
+    with open(file_path, 'w', newline='\n') as f:
+        f.write("LabVIEW Measurement\n")
+        f.write(f"Synthetic run;rows={n_rows};channels={n_channels};seed={seed}\n")
+        f.write(';'.join(names) + '\n')
+        f.write(';'.join(descriptions) + '\n')
+        for start in range(0, n_rows, chunk_rows):
+            rows = synthetic_rows(start, min(chunk_rows, n_rows - start), n_channels, dt_ms=dt_ms, seed=seed)
+            np.savetxt(f, rows, fmt='%.7g', delimiter=';')
+    return file_path
@@ -1,19 +1,77 @@
+import time
+_STARTUP_T0 = time.perf_counter()
+
 import sys
-import pandas as pd
-import matplotlib.pyplot as plt
+import os
+import json
+import threading
+import tempfile
+import numpy as np
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QPushButton, QFileDialog, QListWidget,
                              QLabel, QComboBox, QStackedWidget, QRadioButton,
                              QButtonGroup, QGridLayout, QLineEdit, QSlider,
-                             QCheckBox)
-from PyQt5.QtCore import Qt, pyqtSignal
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
-from matplotlib.figure import Figure
-from scipy.signal import savgol_filter
-from PyQt5.QtWidgets import QLabel
-from PyQt5.QtGui import QMovie
-
+                             QCheckBox, QSizePolicy, QListWidgetItem)
+from PyQt5.QtCore import Qt, pyqtSignal, QTimer, QObject, QFileSystemWatcher, QThread
+from PyQt5.QtGui import QMovie, QResizeEvent
+from PyQt5.QtNetwork import QTcpServer, QLocalServer, QHostAddress
+from magtrace.dataio import LiveFileTail, load_export, parse_delimited_rows
+from magtrace.processing import (UNIT_TO_MIN, apply_scale_offset, apply_transforms, clean_dataframe,
+                                 combine_runs, convert_time, filter_time, map_threads, minmax_decimate,
+                                 range_mask, resistance, take_rows, value_at)
+from magtrace.cache import DATASETS
+from magtrace.derived import DERIVED
+from magtrace.resample import AGGREGATIONS, resample_frame
+from magtrace.spectrum import welch_frame
+from magtrace.derivatives import METHODS as DERIVATIVE_METHODS
+from magtrace.heatmap import CURRENT_COLUMNS, Heatmap, run_heatmap
+from magtrace.overlay import Overlay, run_curves
+from magtrace.alignment import estimate_lag, shifted_values
+from magtrace.analysis import RampIndex, describe_iv, iv_table, parse_sweep_numbers, plateau_table
+from magtrace.catalog import Catalog, summary
+from magtrace.indexer import ArchiveIndexer
+from magtrace.profiling import PROFILER
+from magtrace.live import (LIVE_SOCKET_NAME, LIVE_SOCKET_PORT, LivePanel, ReplayMetrics,
+                           default_detector_rules, load_detector_rules)
+
+
+# Supply currents whose plateaus the plotter averages over (when present in the file)
+PLATEAU_CURRENTS = ('Magna_1_current', 'Magna_2_current')
+# Kinds of catalog datasets the plotter and combiner load (as cleaned CSV): not raw exports
+PLOT_KINDS = ('cleaned', 'combined')
+
+
+class StartupTimer:
+    """Wall-clock marks from interpreter start of main.py to the first usable tab."""
+
+    def __init__(self, t0):
+        self.t0 = t0
+        self.marks = []
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter()))
+
+    def report(self):
+        lines = ["Startup:"]
+        last = self.t0
+        for name, t in self.marks:
+            lines.append(f"  {name:<28} {1000 * (t - last):7.0f} ms   (at {1000 * (t - self.t0):6.0f} ms)")
+            last = t
+        return "\n".join(lines)
+
+
+STARTUP = StartupTimer(_STARTUP_T0)
+STARTUP.mark("imports")
+
+
+def create_figure_canvas(parent, figsize, dpi=None):
+    # matplotlib and its Qt backend take ~0.5 s to import, so they are loaded with the first plot tab
+    from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+    from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+    from matplotlib.figure import Figure
+    figure = Figure(figsize=figsize, dpi=dpi)
+    canvas = FigureCanvas(figure)
+    return figure, canvas, NavigationToolbar(canvas, parent)
 
 
 class QRangeSlider(QWidget):
@@ -50,27 +108,42 @@ class QRangeSlider(QWidget):
         self.valueChanged.emit(self.value())
 
 
-class SharedDataManager:
-    def __init__(self):
-        self.cleaned_files = []
+def register_dataset(catalog, file_path, df, kind=None):
+    # A failing catalog must not stop loading or saving
+    try:
+        catalog.register(file_path, df, kind=kind)
+    except Exception as e:
+        print(f"Failed to register {file_path} in the catalog: {e}")
+
 
-    def add_cleaned_file(self, file_path):
-        if file_path not in self.cleaned_files:
-            self.cleaned_files.append(file_path)
+def acquire_dataset(tab, file_path, kind):
+    # Pin the file in the shared dataset cache for this tab and release what it held before.
+    # The DataFrame may be shared with other tabs, so it is never modified in place.
+    df = DATASETS.acquire(file_path, kind)
+    if tab.df_source is not None:
+        DATASETS.release(*tab.df_source)
+    tab.df_source = (file_path, kind)
+    return df
 
-    def get_cleaned_files(self):
-        return self.cleaned_files
+
+def add_dataset_items(list_widget, datasets):
+    # Item text is the path (the tabs read it back), the run summary is the tooltip
+    for dataset in datasets:
+        item = QListWidgetItem(dataset['path'])
+        item.setToolTip(summary(dataset))
+        list_widget.addItem(item)
 
 
 class DataCleanerUI(QMainWindow):
-    def __init__(self, shared_data_manager):
+    def __init__(self, catalog):
         super().__init__()
-        self.shared_data_manager = shared_data_manager
+        self.catalog = catalog
         self.setWindowTitle("Data Cleaner")
         self.setGeometry(100, 100, 1400, 800)
 
         # Initialize data storage
         self.df = None
+        self.df_source = None  # (path, loader) pinned in the dataset cache
         self.selected_columns = []
         self.exclude_regions = []
         self.column_scales = {}
@@ -192,6 +265,17 @@ class DataCleanerUI(QMainWindow):
         remove_region_button.clicked.connect(self.remove_exclude_region)
         left_layout.addWidget(remove_region_button)
 
+        # Optional resampling of the saved file onto a uniform time grid
+        self.save_resample_input = QLineEdit()
+        self.save_resample_input.setPlaceholderText("Period (s), empty: keep every sample")
+        self.save_resample_how_combo = QComboBox()
+        self.save_resample_how_combo.addItems(AGGREGATIONS)
+        save_resample_layout = QHBoxLayout()
+        save_resample_layout.addWidget(QLabel("Resample on Save:"))
+        save_resample_layout.addWidget(self.save_resample_input)
+        save_resample_layout.addWidget(self.save_resample_how_combo)
+        left_layout.addLayout(save_resample_layout)
+
         # Save button
         save_button = QPushButton("Save Cleaned Data")
         save_button.clicked.connect(self.save_data)
@@ -200,9 +284,7 @@ class DataCleanerUI(QMainWindow):
         # Right panel setup
         right_panel = QWidget()
         right_layout = QVBoxLayout(right_panel)
-        self.figure = Figure(figsize=(8, 6))
-        self.canvas = FigureCanvas(self.figure)
-        self.toolbar = NavigationToolbar(self.canvas, self)
+        self.figure, self.canvas, self.toolbar = create_figure_canvas(self, (8, 6))
         right_layout.addWidget(self.toolbar)
         right_layout.addWidget(self.canvas)
 
@@ -260,34 +342,16 @@ class DataCleanerUI(QMainWindow):
         self.max_time_input.returnPressed.connect(self.update_time_from_input)
         self.time_slider.valueChanged.connect(self.update_time_display)
 
+    @PROFILER.method('cleaner.load_file')
     def load_file(self):
         file_path, _ = QFileDialog.getOpenFileName(
             self, "Load Data File", "", "CSV Files (*.csv);;All Files (*)"
         )
         if file_path:
             try:
-                # Read the file manually to handle inconsistent header rows
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-
-                # Skip the first two lines, then take the next two as headers
-                header_1 = lines[2].strip().split(';')
-                header_2 = lines[3].strip().split(';')
-                headers = []
-                for h1, h2 in zip(header_1, header_2):
-                    h1 = h1.strip()
-                    h2 = h2.strip()
-                    if h1 and h2 and h1 != h2:
-                        headers.append(f"{h1}({h2})")
-                    else:
-                        headers.append(h1 or h2)
-
-                # Now load the DataFrame with no header, skipping 4 lines
-                self.df = pd.read_csv(file_path, delimiter=';', skiprows=4, header=None)
-                self.df.columns = headers[:self.df.shape[1]]
-                self.df = self.df.apply(pd.to_numeric, errors='coerce')
-                if 'Timestamp' in self.df.columns:
-                    self.df['Timestamp'] = self.df['Timestamp'] / 1000 / 60
+                # Timestamp in minutes; a complete live recording of the file is read from binary columns
+                with PROFILER.span('parse'):
+                    self.df = acquire_dataset(self, file_path, 'run')
                 # Update the column list
                 self.column_list.clear()
                 self.column_list.addItems(self.df.columns)
@@ -300,12 +364,14 @@ class DataCleanerUI(QMainWindow):
                     self.max_time_input.setText(f"{max_time:.1f}")
                 # Update the plot
                 self.update_plot()
-                # Add the file to shared data manager
-                self.shared_data_manager.add_cleaned_file(file_path)
+                # Record the run in the catalog (stats come from the loaded DataFrame)
+                with PROFILER.span('catalog'):
+                    register_dataset(self.catalog, file_path, self.df)
             except Exception as e:
                 print(f"Error loading file: {str(e)}")
 
     def _flatten_col(self, col):
+        import pandas as pd
         if isinstance(col, tuple):
             first = str(col[0]).strip() if pd.notna(col[0]) else ""
             second = str(col[1]).strip() if pd.notna(col[1]) else ""
@@ -314,6 +380,7 @@ class DataCleanerUI(QMainWindow):
             return first
         return str(col).strip()
 
+    @PROFILER.method('cleaner.update_plot')
     def update_plot(self):
         if self.df is None:
             return
@@ -326,31 +393,17 @@ class DataCleanerUI(QMainWindow):
         selected_columns = [item.text() for item in selected_items]
 
         # Filter by time range if possible
-        df_filtered = self.df
-        if 'Timestamp' in self.df.columns:
-            try:
-                time_range = self.time_slider.value()
-                mask = (self.df['Timestamp'] >= time_range[0]) & (self.df['Timestamp'] <= time_range[1])
-                df_filtered = self.df[mask]
-            except Exception:
-                pass
-            # Apply exclude regions
-            for region in self.exclude_regions:
-                mask = ~((df_filtered['Timestamp'] >= region[0]) & (df_filtered['Timestamp'] <= region[1]))
-                df_filtered = df_filtered[mask]
+        with PROFILER.span('filter'):
+            df_filtered = filter_time(self.df, self.time_slider.value(), self.exclude_regions)
 
         # Plot selected columns
         for col in selected_columns:
             if col in df_filtered.columns:
                 # Get scale text and factor
                 scale_text = self.column_scales.get(col, '1x')
-                scale_factor = {
-                    '÷10': 0.1,
-                    '÷100': 0.01,
-                    '÷1000': 0.001
-                }.get(scale_text, 1.0)
                 offset = self.column_offsets.get(col, 0.0)
-                y_data = (df_filtered[col] + offset) * scale_factor  # offset first, then scaling
+                with PROFILER.span('scale'):
+                    y_data = apply_scale_offset(df_filtered[col], scale_text, offset)
                 if 'Timestamp' in df_filtered.columns:
                     ax.plot(df_filtered['Timestamp'], y_data, label=f"{col} ({scale_text})")
                 else:
@@ -367,7 +420,8 @@ class DataCleanerUI(QMainWindow):
         ax.tick_params(axis='both', labelsize=12)
         ax.xaxis.label.set_size(14)
         ax.yaxis.label.set_size(14)
-        self.canvas.draw()
+        with PROFILER.span('draw'):
+            self.canvas.draw()
 
     def update_time_from_input(self):
         try:
@@ -396,6 +450,7 @@ class DataCleanerUI(QMainWindow):
         self.max_time_input.setText(f"{values[1]:.1f}")
         self.update_plot()
 
+    @PROFILER.method('cleaner.save_data')
     def save_data(self):
         if self.df is None:
             return
@@ -404,51 +459,48 @@ class DataCleanerUI(QMainWindow):
             self, "Save Cleaned Data", "", "CSV Files (*.csv);;All Files (*)"
         )
         if file_path:
-            # Apply time range filter
-            time_range = self.time_slider.value()
-            mask = (self.df['Timestamp'] >= time_range[0]) & \
-                   (self.df['Timestamp'] <= time_range[1])
-            df_filtered = self.df[mask].copy()
-
-            # Apply exclude regions
-            for region in self.exclude_regions:
-                mask = ~((df_filtered['Timestamp'] >= region[0]) & (df_filtered['Timestamp'] <= region[1]))
-                df_filtered = df_filtered[mask]
-
-            # Apply scaling and offset
-            for column, scale in self.column_scales.items():
-                if column in df_filtered.columns:
-                    scale_factor = {
-                        '÷10': 0.1,
-                        '÷100': 0.01,
-                        '÷1000': 0.001
-                    }.get(scale, 1.0)
-                    offset = self.column_offsets.get(column, 0.0)
-                    # Apply offset first, then scaling
-                    df_filtered[column] = (df_filtered[column] + offset) * scale_factor
-                    # Update column name to reflect scaling
-                    if scale != '1x':
-                        new_column = f"{column}_{scale[1:]}"  # Remove the '÷' symbol
-                        df_filtered.rename(columns={column: new_column}, inplace=True)
+            # Time range, exclude regions, then offset and scaling (scaled columns are renamed)
+            with PROFILER.span('clean'):
+                df_filtered = clean_dataframe(self.df, self.time_slider.value(), self.exclude_regions,
+                                              self.column_scales, self.column_offsets)
+
+            # Uniform time grid (Timestamp in minutes); excluded regions stay gaps, not NaN rows
+            period_text = self.save_resample_input.text().strip()
+            if period_text:
+                try:
+                    period_s = float(period_text)
+                    with PROFILER.span('resample'):
+                        df_filtered = resample_frame(df_filtered, period_s,
+                                                     self.save_resample_how_combo.currentText())
+                except ValueError as e:
+                    print(f"Failed to resample: {e}")
+                    return
 
             # Save the filtered and scaled data
-            df_filtered.to_csv(file_path, index=False)
+            with PROFILER.span('write_csv'):
+                df_filtered.to_csv(file_path, index=False)
 
-            # Add the saved file to shared data manager
-            self.shared_data_manager.add_cleaned_file(file_path)
+            # Record the saved file in the catalog
+            register_dataset(self.catalog, file_path, df_filtered, kind='cleaned')
 
     # Add the rest of the DataCleanerUI methods here...
     # (update_plot, etc.)
 
 
 class PlotterUI(QMainWindow):
-    def __init__(self, shared_data_manager):
+    archive_added = pyqtSignal(str)
+
+    def __init__(self, catalog):
         super().__init__()
-        self.shared_data_manager = shared_data_manager
+        self.catalog = catalog
         self.setWindowTitle("IV Plotter")
         self.setGeometry(100, 100, 1400, 800)
 
         self.df = None
+        self.df_source = None  # (path, loader) pinned in the dataset cache
+        self.plot_state = None  # key of the plotted series and their artists, see plot_selected
+        self.time_shifts = {}  # column -> lag in seconds, applied lazily when the column is plotted
+        self.swapped_runs = set()  # paths of runs with Magna_1/Magna_2 exchanged, for the field heatmap
         # Base and plot timestamp unit combo boxes
         self.base_unit_combo = QComboBox()
         self.base_unit_combo.addItems(["ms", "s", "min", "h", "day"])
@@ -501,9 +553,24 @@ class PlotterUI(QMainWindow):
         self.open_file_button = QPushButton("Open CSV (Any File)")
         self.open_file_button.clicked.connect(self.open_external_file)
         layout.addWidget(self.open_file_button)
+        # Index a whole run archive (e.g. one folder per magnet) into the catalog
+        self.archive_button = QPushButton("Add Archive Folder")
+        self.archive_button.clicked.connect(self.add_archive_folder)
+        layout.addWidget(self.archive_button)
         self.file_list = QListWidget()
+        # Ctrl/Shift-click selects several runs for "Overlay Selected Runs"
+        self.file_list.setSelectionMode(QListWidget.SelectionMode.ExtendedSelection)
+        self.file_list.currentItemChanged.connect(self.show_run_info)
         layout.addWidget(QLabel("Available Files:"))
+        # Answered from the catalog, e.g. "CH9(Hall sensor 1) > 5" or part of a file name
+        self.run_filter_input = QLineEdit()
+        self.run_filter_input.setPlaceholderText("Filter runs, e.g. CH9(Hall sensor 1) > 5")
+        self.run_filter_input.returnPressed.connect(self.update_file_list)
+        layout.addWidget(self.run_filter_input)
         layout.addWidget(self.file_list)
+        self.run_info_label = QLabel("")
+        self.run_info_label.setWordWrap(True)
+        layout.addWidget(self.run_info_label)
 
     def setup_axis_controls(self, layout):
         self.x_axis_combo = QComboBox()
@@ -571,6 +638,19 @@ class PlotterUI(QMainWindow):
         self.resistance_layout.addWidget(self.current_combo)
         self.resistance_layout.addWidget(QLabel("Voltage Scale:"))
         self.resistance_layout.addWidget(self.voltage_scale_combo)
+        # Critical current and n-value of every ramp, voltage column as the tap
+        self.tap_length_input = QLineEdit("1")
+        self.criterion_input = QLineEdit("1")
+        self.resistance_layout.addWidget(QLabel("Tap Length (cm):"))
+        self.resistance_layout.addWidget(self.tap_length_input)
+        self.resistance_layout.addWidget(QLabel("Ic Criterion (µV/cm):"))
+        self.resistance_layout.addWidget(self.criterion_input)
+        self.iv_button = QPushButton("Analyze IV Ramps (Ic, n)")
+        self.iv_button.clicked.connect(self.analyze_iv)
+        self.resistance_layout.addWidget(self.iv_button)
+        self.iv_label = QLabel("")
+        self.iv_label.setWordWrap(True)
+        self.resistance_layout.addWidget(self.iv_label)
 
         layout.addWidget(self.resistance_widget)
         self.resistance_widget.setVisible(False)
@@ -752,27 +832,123 @@ class PlotterUI(QMainWindow):
         layout.addWidget(self.base_unit_combo)
         layout.addWidget(QLabel("Plot Timestamp Unit:"))
         layout.addWidget(self.plot_unit_combo)
+        # How the "Use d/dx" options differentiate (see magtrace.derivatives)
+        self.deriv_method_combo = QComboBox()
+        for method, label in DERIVATIVE_METHODS.items():
+            self.deriv_method_combo.addItem(label, method)
+        self.deriv_window_input = QLineEdit("11")
+        self.deriv_window_input.setPlaceholderText("Smoothing window (samples)")
+        layout.addWidget(QLabel("d/dx Method:"))
+        layout.addWidget(self.deriv_method_combo)
+        layout.addWidget(self.deriv_window_input)
+        # Plot the mean of every channel on each current plateau instead of every sample
+        self.plateau_checkbox = QCheckBox("Plateau Averages")
+        layout.addWidget(self.plateau_checkbox)
+        # Resample every channel onto a uniform time grid before plotting (empty: every sample)
+        self.resample_input = QLineEdit()
+        self.resample_input.setPlaceholderText("Resample period (s)")
+        self.resample_how_combo = QComboBox()
+        self.resample_how_combo.addItems(AGGREGATIONS)
+        layout.addWidget(QLabel("Resample:"))
+        layout.addWidget(self.resample_input)
+        layout.addWidget(self.resample_how_combo)
+        # Ramp-up and ramp-down sweeps of the supply current, e.g. to show hysteresis
+        self.sweep_combo = QComboBox()
+        self.sweep_combo.addItem("All Samples", None)
+        self.sweep_combo.addItem("Ramp Up Sweeps", 1)
+        self.sweep_combo.addItem("Ramp Down Sweeps", -1)
+        self.sweep_numbers_input = QLineEdit()
+        self.sweep_numbers_input.setPlaceholderText("Sweep numbers, e.g. 1-3, 7")
+        layout.addWidget(QLabel("Sweeps:"))
+        layout.addWidget(self.sweep_combo)
+        layout.addWidget(self.sweep_numbers_input)
+        self.sweep_info_label = QLabel("")
+        layout.addWidget(self.sweep_info_label)
+        # Channels from different amplifiers are offset in time: estimate and remove the lag
+        align_button = QPushButton("Align Y2-Y4 to Y1 (Time Lag)")
+        align_button.clicked.connect(self.align_channels)
+        clear_align_button = QPushButton("Clear Time Shifts")
+        clear_align_button.clicked.connect(self.clear_time_shifts)
+        self.align_label = QLabel("")
+        layout.addWidget(align_button)
+        layout.addWidget(clear_align_button)
+        layout.addWidget(self.align_label)
         plot_button = QPushButton("Plot")
         plot_button.clicked.connect(self.plot_selected)
         layout.addWidget(plot_button)
+        # Y1 of the selected runs against X (the current), averaged in bins of a common grid
+        self.overlay_step_input = QLineEdit("1")
+        self.overlay_step_input.setPlaceholderText("Current bin width (A)")
+        self.overlay_spread_checkbox = QCheckBox("Spread Bands (±1σ)")
+        self.overlay_difference_checkbox = QCheckBox("Difference to First Run")
+        overlay_button = QPushButton("Overlay Selected Runs")
+        overlay_button.clicked.connect(self.overlay_selected)
+        layout.addWidget(QLabel("Run Overlay (X bin width):"))
+        layout.addWidget(self.overlay_step_input)
+        layout.addWidget(self.overlay_spread_checkbox)
+        layout.addWidget(self.overlay_difference_checkbox)
+        layout.addWidget(overlay_button)
+        # Y1 of the selected runs over the two coil currents
+        self.heatmap_statistic_combo = QComboBox()
+        self.heatmap_statistic_combo.addItem("Mean Y1", 'mean')
+        self.heatmap_statistic_combo.addItem("Max Y1", 'max')
+        self.heatmap_statistic_combo.addItem("Sample Count", 'count')
+        self.heatmap_step_input = QLineEdit("1")
+        self.heatmap_step_input.setPlaceholderText("Current bin width (A)")
+        self.heatmap_interpolate_checkbox = QCheckBox("Interpolate Gaps")
+        swap_button = QPushButton("Mark Selected Runs as Swapped")
+        swap_button.clicked.connect(self.toggle_swapped_runs)
+        heatmap_button = QPushButton("Plot Field Heatmap")
+        heatmap_button.clicked.connect(self.plot_heatmap)
+        layout.addWidget(QLabel("Field Heatmap (Magna_1 vs Magna_2 current):"))
+        layout.addWidget(self.heatmap_statistic_combo)
+        layout.addWidget(self.heatmap_step_input)
+        layout.addWidget(self.heatmap_interpolate_checkbox)
+        layout.addWidget(swap_button)
+        layout.addWidget(heatmap_button)
+        # Noise spectrum of the Y columns over the X range (when X is the timestamp)
+        self.spectrum_mode_combo = QComboBox()
+        self.spectrum_mode_combo.addItem("Welch PSD", False)
+        self.spectrum_mode_combo.addItem("Spectrogram (Y1)", True)
+        self.spectrum_segment_input = QLineEdit("4096")
+        self.spectrum_segment_input.setPlaceholderText("Segment length (samples)")
+        spectrum_button = QPushButton("Plot Noise Spectrum")
+        spectrum_button.clicked.connect(self.plot_spectrum)
+        self.spectrum_label = QLabel("")
+        self.spectrum_label.setWordWrap(True)
+        layout.addWidget(QLabel("Noise Spectrum:"))
+        layout.addWidget(self.spectrum_mode_combo)
+        layout.addWidget(self.spectrum_segment_input)
+        layout.addWidget(spectrum_button)
+        layout.addWidget(self.spectrum_label)
 
     def setup_plot_area(self, layout):
-        self.figure = Figure(figsize=(8, 6), dpi=100)  # 800x600 pixels, 4:3 aspect ratio
-        self.canvas = FigureCanvas(self.figure)
-        self.toolbar = NavigationToolbar(self.canvas, self)
+        self.figure, self.canvas, self.toolbar = create_figure_canvas(self, (8, 6), dpi=100)  # 800x600 pixels, 4:3 aspect ratio
         layout.addWidget(self.toolbar)
         layout.addWidget(self.canvas)
 
     def update_file_list(self):
         self.file_list.clear()
-        for f in self.shared_data_manager.get_cleaned_files():
-            self.file_list.addItem(f)
+        query = self.run_filter_input.text().strip()
+        datasets = self.catalog.query(query, PLOT_KINDS) if query else self.catalog.datasets(PLOT_KINDS)
+        add_dataset_items(self.file_list, datasets)
+        self.mark_swapped_items()
+
+    def add_archive_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Add Archive Folder")
+        if folder:
+            self.archive_added.emit(folder)
+
+    def show_run_info(self, item, previous=None):
+        self.run_info_label.setText(item.toolTip() if item is not None else "")
 
     def load_file(self):
         if self.file_list.currentItem():
             file_path = self.file_list.currentItem().text()
             try:
-                self.df = pd.read_csv(file_path)
+                self.df = acquire_dataset(self, file_path, 'cleaned')
+                self.time_shifts = {}
+                self.align_label.setText("")
                 self.x_axis_combo.clear()
                 self.y1_axis_combo.clear()
                 self.y2_axis_combo.clear()
@@ -791,6 +967,7 @@ class PlotterUI(QMainWindow):
             except Exception as e:
                 print(f"Failed to load file: {e}")
 
+    @PROFILER.method('plotter.plot_selected')
     def plot_selected(self):
         if self.df is not None:
             if self.enable_resistance_checkbox.isChecked():
@@ -827,6 +1004,87 @@ class PlotterUI(QMainWindow):
             y4_col = self.y4_axis_combo.currentText() if self.y4_axis_combo.isEnabled() else None
             x_min = float(self.x_min_input.text()) if self.x_min_input.text() else None
             x_max = float(self.x_max_input.text()) if self.x_max_input.text() else None
+            y1_transforms = self.series_transforms(self.y1_abs_checkbox, self.y1_deriv_checkbox)
+            y2_transforms = self.series_transforms(self.y2_abs_checkbox, self.y2_deriv_checkbox)
+            y3_transforms = self.series_transforms(self.y3_abs_checkbox, self.y3_deriv_checkbox)
+            y4_transforms = self.series_transforms(self.y4_abs_checkbox, self.y4_deriv_checkbox)
+
+            # Everything the plotted data depends on (labels, legend texts and Y limits are not)
+            df, dataset = self.plot_source()
+            if x_col == df.columns[0]:
+                # Timestamp scaling logic for X axis if first column is timestamp
+                x_spec = (x_col, self.base_unit_combo.currentText(), self.plot_unit_combo.currentText())
+            else:
+                x_spec = (x_col,)
+            x_key = x_spec + (x_min, x_max, self.sweep_spec())
+            if self.enable_resistance_checkbox.isChecked():
+                resistance_spec = (self.voltage_combo.currentText(), self.current_combo.currentText(),
+                                   self.voltage_scale_combo.currentText())
+            else:
+                resistance_spec = None
+            data_key = (dataset, x_key, (y1_col, y1_transforms), (y2_col, y2_transforms),
+                        (y3_col, y3_transforms), (y4_col, y4_transforms), resistance_spec,
+                        tuple(sorted(self.time_shifts.items())))
+            if self.plot_state is not None and self.plot_state['key'] == data_key:
+                # Same series as on screen: restyle the existing artists instead of replotting
+                self.restyle_plot()
+                return
+
+            try:
+                with PROFILER.span('series'):
+                    x_full = DERIVED.get((dataset, 'x') + x_spec, lambda: self.x_values(df, x_spec))
+                    with PROFILER.span('mask'):
+                        rows, breaks, x_data = DERIVED.get((dataset, 'range') + x_key,
+                                                           lambda: self.x_range(df, dataset, x_full, x_key))
+
+                    def series_key(col, transforms):
+                        return (dataset, 'y', col, transforms, self.time_shifts.get(col)) + x_key
+
+                    def compute_series(keys):
+                        # Columns with the same transforms go through them together (one derivative call)
+                        values = {}
+                        for transforms in dict.fromkeys(key[3] for key in keys):
+                            group = [key for key in keys if key[3] == transforms]
+                            stacked = np.column_stack([
+                                take_rows(self.column_values(df, dataset, key[2], key[4]), rows, breaks)
+                                for key in group])
+                            result = apply_transforms(stacked, x_data, transforms)
+                            for i, key in enumerate(group):
+                                values[key] = result[:, i]
+                        return [values[key] for key in keys]
+
+                    def y_series(col, transforms):
+                        return DERIVED.get_many([series_key(col, transforms)], compute_series)[0]
+
+                    if resistance_spec is not None:
+                        wanted = [(y1_col, y1_transforms), (resistance_spec[0], ()), (resistance_spec[1], ())]
+                    else:
+                        wanted = [(y1_col, y1_transforms), (y2_col, y2_transforms), (y3_col, y3_transforms),
+                                  (y4_col, y4_transforms)]
+                    DERIVED.get_many([series_key(col, t) for col, t in wanted if col], compute_series)
+
+                    y1_data = y_series(y1_col, y1_transforms) if y1_col else None
+                    if resistance_spec is not None:
+                        v_col, i_col, voltage_scale = resistance_spec
+                        current = y_series(i_col, ())
+                        # The voltage and current are read with their time shifts (see align_channels)
+                        shifts = (self.time_shifts.get(v_col), self.time_shifts.get(i_col))
+                        r_series = DERIVED.get((dataset, 'resistance') + resistance_spec + shifts + x_key, lambda: (
+                            self.resistance_series(y_series(v_col, ()), current, voltage_scale)))
+                    else:
+                        y2_data = y_series(y2_col, y2_transforms) if y2_col else None
+                        y3_data = y_series(y3_col, y3_transforms) if y3_col else None
+                        y4_data = y_series(y4_col, y4_transforms) if y4_col else None
+            except ValueError as e:
+                print(f"Failed to plot: {e}")
+                return
+
+            if x_key[-1] is not None:
+                index = self.ramp_index(df, dataset)
+                n_up = int((index.directions == 1).sum())
+                self.sweep_info_label.setText(f"{len(index)} sweeps: {n_up} up, {len(index) - n_up} down")
+            else:
+                self.sweep_info_label.setText("")
 
             # --- Determine how many extra Y axes are in use (Y2, Y3, Y4) ---
             y_axes_used = sum(bool(c) for c in [y2_col, y3_col, y4_col])
@@ -836,6 +1094,7 @@ class PlotterUI(QMainWindow):
             self.figure.set_size_inches(8, 6)
 
             self.figure.clear()
+            self.plot_state = None
             self.figure.set_facecolor('white')
             base_fontsize = max(int(self.figure.get_size_inches()[0] * self.figure.dpi / 100), 10)
             ax1 = self.figure.add_subplot(111)
@@ -843,39 +1102,16 @@ class PlotterUI(QMainWindow):
             ax3 = None
             ax4 = None
             ax1.set_facecolor('#f9f9f9')
+            # (axis, line, column, legend input, label input, min input, max input) for restyling
+            slots = []
 
-            # Timestamp scaling logic for X axis if first column is timestamp
-            df = self.df
-            if x_col == df.columns[0]:
-                # Use base/plot unit scaling
-                base_unit = self.base_unit_combo.currentText()
-                plot_unit = self.plot_unit_combo.currentText()
-                unit_to_min = {"ms": 1/60000, "s": 1/60, "min": 1, "h": 60, "day": 1440}
-                timestamps = df.iloc[:, 0].values
-                x_data = timestamps * unit_to_min[base_unit] / unit_to_min[plot_unit]
-                x_data = pd.Series(x_data, index=df.index)
-            else:
-                x_data = df[x_col]
-            n_points = len(x_data)
+            n_points = len(x_full)
             marker_size = min(max(3, 300 / n_points), 10)
             line_width = 2.0 if n_points < 200 else 1.5
 
-            mask = pd.Series(True, index=df.index)
-            if x_min is not None:
-                mask &= x_data >= x_min
-            if x_max is not None:
-                mask &= x_data <= x_max
-
-            x_data = x_data[mask]
-
             # Plot Y1
             if y1_col:
-                y1_data = self.df[y1_col][mask]
-                if self.y1_abs_checkbox.isChecked():
-                    y1_data = y1_data.abs()
-                if self.y1_deriv_checkbox.isChecked():
-                    y1_data = y1_data.diff() / x_data.diff()
-                ax1.plot(
+                line1, = ax1.plot(
                     x_data,
                     y1_data,
                     label=self.y1_legend_input.text() or y1_col,
@@ -894,33 +1130,17 @@ class PlotterUI(QMainWindow):
                 ax1.tick_params(axis='x', labelsize=base_fontsize)
                 ax1.xaxis.label.set_size(base_fontsize + 2)
                 # Apply Y1 min/max if set
-                try:
-                    y1_min = float(self.y1_min_input.text())
-                    y1_max = float(self.y1_max_input.text())
-                    ax1.set_ylim(y1_min, y1_max)
-                except ValueError:
-                    pass
+                self.apply_y_limits(ax1, self.y1_min_input, self.y1_max_input)
+                slots.append((ax1, line1, y1_col, self.y1_legend_input, self.y1_label_input,
+                              self.y1_min_input, self.y1_max_input))
 
             legend_axes = [ax1]
-            axes_labels = [ax1.get_ylabel()]
-            if self.enable_resistance_checkbox.isChecked():
-                v_col = self.voltage_combo.currentText()
-                i_col = self.current_combo.currentText()
-                scale_text = self.voltage_scale_combo.currentText()
-                scale_factor = {
-                    'mV': 1.0e-3,
-                    'mV×100': 1.0e-3 / 100,
-                    'mV×1000': 1.0e-3 / 1000
-                }.get(scale_text, 1.0e-3)
-
-                voltage = self.df[v_col][mask] * scale_factor
-                current = self.df[i_col][mask]
-                resistance = (voltage / current) * 1e6  # Convert to microohms
+            if resistance_spec is not None:
                 ax2 = ax1.twinx()
                 ax2.set_facecolor('#f9f9f9')
-                ax2.plot(
+                line2, = ax2.plot(
                     x_data,
-                    resistance,
+                    r_series,
                     label="Resistance",
                     color='tab:red',
                     linewidth=line_width,
@@ -942,18 +1162,12 @@ class PlotterUI(QMainWindow):
                 ax2.tick_params(axis='x', labelsize=base_fontsize)
                 ax2.xaxis.label.set_size(base_fontsize + 2)
                 # Apply Y2 min/max if set
-                try:
-                    y2_min = float(self.y2_min_input.text())
-                    y2_max = float(self.y2_max_input.text())
-                    ax2.set_ylim(y2_min, y2_max)
-                except ValueError:
-                    pass
+                self.apply_y_limits(ax2, self.y2_min_input, self.y2_max_input)
+                slots.append((ax2, line2, None, None, None, self.y2_min_input, self.y2_max_input))
                 legend_axes.append(ax2)
-                axes_labels.append(ax2.get_ylabel())
                 # Display resistance at 100 A in UI
-                if not current.empty:
-                    closest = current.sub(100).abs().idxmin()
-                    r_at_100a = resistance.loc[closest]
+                r_at_100a = value_at(current, r_series, 100)
+                if r_at_100a is not None:
                     self.r100a_label.setText(f"Resistance at 100A: {r_at_100a:.2f} µΩ")
                 else:
                     self.r100a_label.setText("")
@@ -963,12 +1177,7 @@ class PlotterUI(QMainWindow):
                 if y2_col:
                     ax2 = ax1.twinx()
                     ax2.set_facecolor('#f9f9f9')
-                    y2_data = self.df[y2_col][mask]
-                    if self.y2_abs_checkbox.isChecked():
-                        y2_data = y2_data.abs()
-                    if self.y2_deriv_checkbox.isChecked():
-                        y2_data = y2_data.diff() / x_data.diff()
-                    ax2.plot(
+                    line2, = ax2.plot(
                         x_data,
                         y2_data,
                         label=self.y2_legend_input.text() or y2_col,
@@ -998,26 +1207,17 @@ class PlotterUI(QMainWindow):
                     ax2.tick_params(axis='x', labelsize=base_fontsize)
                     ax2.xaxis.label.set_size(base_fontsize + 2)
                     # Apply Y2 min/max if set
-                    try:
-                        y2_min = float(self.y2_min_input.text())
-                        y2_max = float(self.y2_max_input.text())
-                        ax2.set_ylim(y2_min, y2_max)
-                    except ValueError:
-                        pass
+                    self.apply_y_limits(ax2, self.y2_min_input, self.y2_max_input)
+                    slots.append((ax2, line2, y2_col, self.y2_legend_input, self.y2_label_input,
+                                  self.y2_min_input, self.y2_max_input))
                     legend_axes.append(ax2)
-                    axes_labels.append(ax2.get_ylabel())
                 # Plot Y3 if enabled
                 if y3_col:
                     # Y3 always uses twinx and positions outward
                     ax3 = ax1.twinx()
                     ax3.set_facecolor('#f9f9f9')
                     ax3.spines["right"].set_position(("outward", 60))
-                    y3_data = self.df[y3_col][mask]
-                    if self.y3_abs_checkbox.isChecked():
-                        y3_data = y3_data.abs()
-                    if self.y3_deriv_checkbox.isChecked():
-                        y3_data = y3_data.diff() / x_data.diff()
-                    ax3.plot(
+                    line3, = ax3.plot(
                         x_data,
                         y3_data,
                         label=self.y3_legend_input.text() or y3_col,
@@ -1049,26 +1249,17 @@ class PlotterUI(QMainWindow):
                         ax3.yaxis.label.set_horizontalalignment('left')
                         ax3.yaxis.label.set_position((1.22, 1.05))
                     # Apply Y3 min/max if set
-                    try:
-                        y3_min = float(self.y3_min_input.text())
-                        y3_max = float(self.y3_max_input.text())
-                        ax3.set_ylim(y3_min, y3_max)
-                    except ValueError:
-                        pass
+                    self.apply_y_limits(ax3, self.y3_min_input, self.y3_max_input)
+                    slots.append((ax3, line3, y3_col, self.y3_legend_input, self.y3_label_input,
+                                  self.y3_min_input, self.y3_max_input))
                     legend_axes.append(ax3)
-                    axes_labels.append(ax3.get_ylabel())
                 # Plot Y4 if enabled
                 if y4_col:
                     # Y4 always uses twinx and positions further outward
                     ax4 = ax1.twinx()
                     ax4.set_facecolor('#f9f9f9')
                     ax4.spines["right"].set_position(("outward", 120))
-                    y4_data = self.df[y4_col][mask]
-                    if self.y4_abs_checkbox.isChecked():
-                        y4_data = y4_data.abs()
-                    if self.y4_deriv_checkbox.isChecked():
-                        y4_data = y4_data.diff() / x_data.diff()
-                    ax4.plot(
+                    line4, = ax4.plot(
                         x_data,
                         y4_data,
                         label=self.y4_legend_input.text() or y4_col,
@@ -1100,14 +1291,10 @@ class PlotterUI(QMainWindow):
                         ax4.yaxis.label.set_horizontalalignment('left')
                         ax4.yaxis.label.set_position((1.33, -0.1))
                     # Apply Y4 min/max if set
-                    try:
-                        y4_min = float(self.y4_min_input.text())
-                        y4_max = float(self.y4_max_input.text())
-                        ax4.set_ylim(y4_min, y4_max)
-                    except ValueError:
-                        pass
+                    self.apply_y_limits(ax4, self.y4_min_input, self.y4_max_input)
+                    slots.append((ax4, line4, y4_col, self.y4_legend_input, self.y4_label_input,
+                                  self.y4_min_input, self.y4_max_input))
                     legend_axes.append(ax4)
-                    axes_labels.append(ax4.get_ylabel())
 
             # Set X-axis label using input
             ax1.set_xlabel(self.x_label_input.text() or x_col)
@@ -1117,24 +1304,418 @@ class PlotterUI(QMainWindow):
             # Adjust subplot for multiple y-axes
             self.figure.subplots_adjust(left=0.15, right=0.75, bottom=0.15, top=0.9)
 
+            self.plot_state = {'key': data_key, 'ax1': ax1, 'x_col': x_col, 'fontsize': base_fontsize,
+                               'legend_axes': legend_axes, 'slots': slots}
             # Add combined legend at best location if enabled
-            if self.show_legend_checkbox.isChecked():
-                lines, labels = [], []
-                for ax in legend_axes:
-                    l, lb = ax.get_legend_handles_labels()
-                    lines += l
-                    labels += lb
-                ax1.legend(lines, labels, loc='best', fontsize=base_fontsize)
+            self.update_legend()
 
             # Enforce tight layout for clean export
+            with PROFILER.span('tight_layout'):
+                self.figure.tight_layout()
+            with PROFILER.span('draw'):
+                self.canvas.draw()
+
+    @PROFILER.method('plotter.overlay_selected')
+    def overlay_selected(self):
+        paths = [item.text() for item in self.file_list.selectedItems()]
+        x_col, y_col = self.x_axis_combo.currentText(), self.y1_axis_combo.currentText()
+        if not paths or not x_col or not y_col:
+            return
+        try:
+            step = float(self.overlay_step_input.text())
+        except ValueError:
+            step = 1.0
+        direction = self.sweep_combo.currentData()
+        abs_values = self.y1_abs_checkbox.isChecked()
+        try:
+            with PROFILER.span('load'):
+                dfs = DATASETS.get_many(paths, 'cleaned')
+        except Exception as e:
+            print(f"Failed to load runs: {e}")
+            return
+        runs = {}
+        for path, df in zip(paths, dfs):
+            if x_col in df.columns and y_col in df.columns:
+                runs[path] = df
+            else:
+                print(f"{path} has no {x_col} or {y_col} column, left out")
+        if not runs:
+            return
+
+        # Binned curves are cached per run, so adding a run to the overlay only bins that run
+        spec = ('overlay', x_col, y_col, step, direction, abs_values)
+        keys = [(DATASETS.key(path, 'cleaned'),) + spec for path in runs]
+        by_key = dict(zip(keys, runs.values()))
+        with PROFILER.span('bin'):
+            curves = DERIVED.get_many(keys, lambda missing: run_curves(
+                [by_key[key] for key in missing], x_col, [y_col], step, direction=direction,
+                abs_values=abs_values))
+        overlay = Overlay(runs, [y_col], step, curves)
+        labels = [os.path.basename(path) for path in runs]
+        if len(set(labels)) < len(labels):
+            labels = [os.path.join(os.path.basename(os.path.dirname(path)), os.path.basename(path))
+                      for path in runs]
+
+        self.plot_state = None  # The next Plot draws the loaded run again
+        self.figure.clear()
+        difference = self.overlay_difference_checkbox.isChecked() and len(runs) > 1
+        ax = self.figure.add_subplot(211 if difference else 111)
+        from matplotlib import colormaps
+        cmap = colormaps['tab10' if len(labels) <= 10 else 'tab20']
+        colors = [cmap(i % cmap.N) for i in range(len(labels))]
+        for name, label, color in zip(runs, labels, colors):
+            centres, mean, std = overlay.curve(name)
+            ax.plot(centres, mean, color=color, label=label, linewidth=1.2)
+            if self.overlay_spread_checkbox.isChecked():
+                ax.fill_between(centres, mean - std, mean + std, color=color, alpha=0.2, linewidth=0)
+        ax.set_ylabel(self.y1_label_input.text() or y_col)
+        ax.legend(fontsize='x-small' if len(labels) > 6 else 'small', ncol=(len(labels) + 5) // 6)
+        if difference:
+            ax_diff = self.figure.add_subplot(212, sharex=ax)
+            reference = next(iter(runs))
+            for name, label, color in list(zip(runs, labels, colors))[1:]:
+                delta, spread = overlay.difference(reference, name)
+                ax_diff.plot(overlay.centres, delta, color=color, label=f"{label} - {labels[0]}", linewidth=1.2)
+                if self.overlay_spread_checkbox.isChecked():
+                    ax_diff.fill_between(overlay.centres, delta - spread, delta + spread, color=color,
+                                         alpha=0.2, linewidth=0)
+            ax_diff.axhline(0, color='gray', linewidth=0.8)
+            ax_diff.set_ylabel(f"Δ {self.y1_label_input.text() or y_col}")
+            ax_diff.set_xlabel(self.x_label_input.text() or x_col)
+        else:
+            ax.set_xlabel(self.x_label_input.text() or x_col)
+        with PROFILER.span('draw'):
+            self.figure.tight_layout()
+            self.canvas.draw()
+
+    def toggle_swapped_runs(self):
+        # Runs where the coils were wired the other way round; shown in italics
+        for item in self.file_list.selectedItems():
+            self.swapped_runs ^= {item.text()}
+        self.mark_swapped_items()
+
+    def mark_swapped_items(self):
+        for i in range(self.file_list.count()):
+            item = self.file_list.item(i)
+            font = item.font()
+            font.setItalic(item.text() in self.swapped_runs)
+            item.setFont(font)
+
+    @PROFILER.method('plotter.plot_heatmap')
+    def plot_heatmap(self):
+        paths = [item.text() for item in self.file_list.selectedItems()]
+        field_col = self.y1_axis_combo.currentText()
+        if not paths or not field_col:
+            return
+        try:
+            step = float(self.heatmap_step_input.text())
+        except ValueError:
+            step = 1.0
+        statistic = self.heatmap_statistic_combo.currentData()
+        abs_values = self.y1_abs_checkbox.isChecked()
+        try:
+            with PROFILER.span('load'):
+                dfs = DATASETS.get_many(paths, 'cleaned')
+        except Exception as e:
+            print(f"Failed to load runs: {e}")
+            return
+        runs = {path: df for path, df in zip(paths, dfs)
+                if field_col in df.columns and CURRENT_COLUMNS[0] in df.columns}
+        for path in set(paths) - set(runs):
+            print(f"{path} has no {field_col} or {CURRENT_COLUMNS[0]} column, left out")
+        if not runs:
+            return
+
+        # Each run's map is cached, the selected runs are merged
+        keys = [(DATASETS.key(path, 'cleaned'), 'heatmap', field_col, step, path in self.swapped_runs,
+                 abs_values) for path in runs]
+        by_key = dict(zip(keys, runs.values()))
+        with PROFILER.span('bin'):
+            maps = DERIVED.get_many(keys, lambda missing: map_threads(
+                lambda key: run_heatmap(by_key[key], field_col, step, swapped=key[4], abs_values=abs_values),
+                missing))
+            heatmap = Heatmap.empty(step)
+            for part in maps:
+                heatmap = heatmap.merge(part)
+        if not heatmap.count.any():
+            print("No samples to map")
+            return
+        if self.heatmap_interpolate_checkbox.isChecked():
+            values = heatmap.interpolated(statistic)
+        else:
+            values = heatmap.values(statistic).astype(np.float64)
+            if statistic == 'count':
+                values[values == 0] = np.nan
+
+        self.plot_state = None  # The next Plot draws the loaded run again
+        self.figure.clear()
+        ax = self.figure.add_subplot(111)
+        mesh = ax.pcolormesh(heatmap.x_edges, heatmap.y_edges, values.T, cmap='viridis')
+        label = self.y1_label_input.text() or field_col
+        if statistic != 'count':
+            label = f"{statistic.capitalize()} {'|' + label + '|' if abs_values else label}"
+        self.figure.colorbar(mesh, ax=ax, label="Samples" if statistic == 'count' else label)
+        ax.set_xlabel(f"{CURRENT_COLUMNS[0]} (A)")
+        ax.set_ylabel(f"{CURRENT_COLUMNS[1]} (A)")
+        ax.set_title(f"{len(runs)} run{'s' if len(runs) > 1 else ''}, {int(heatmap.count.sum())} samples")
+        with PROFILER.span('draw'):
+            self.figure.tight_layout()
+            self.canvas.draw()
+
+    @PROFILER.method('plotter.plot_spectrum')
+    def plot_spectrum(self):
+        if self.df is None or 'Timestamp' not in self.df.columns:
+            return
+        combos = [self.y1_axis_combo, self.y2_axis_combo, self.y3_axis_combo, self.y4_axis_combo]
+        columns = list(dict.fromkeys(c.currentText() for c in combos if c.isEnabled() and c.currentText()))
+        spectrogram = self.spectrum_mode_combo.currentData()
+        if spectrogram:
+            columns = columns[:1]
+        try:
+            nperseg = int(self.spectrum_segment_input.text())
+        except ValueError:
+            nperseg = 4096
+        base_unit, plot_unit = self.base_unit_combo.currentText(), self.plot_unit_combo.currentText()
+        # The X range limits the time range if X is the timestamp
+        t_range = None
+        if self.x_axis_combo.currentText() == 'Timestamp':
+            t_range = tuple(float(i.text()) * UNIT_TO_MIN[plot_unit] if i.text() else None
+                            for i in (self.x_min_input, self.x_max_input))
+        key = (self.dataset_key(), 'spectrum', tuple(columns), t_range, nperseg, spectrogram, base_unit)
+        try:
+            with PROFILER.span('welch'):
+                spectrum = DERIVED.get(key, lambda: welch_frame(self.df, columns, t_range, time_unit=base_unit,
+                                                                nperseg=nperseg, spectrogram=spectrogram))
+        except Exception as e:
+            print(f"Failed to compute the spectrum: {e}")
+            return
+        if not spectrum.counts.any():
+            print(f"Not enough samples for segments of {nperseg}")
+            return
+
+        self.plot_state = None  # The next Plot draws the time series again
+        self.figure.clear()
+        ax = self.figure.add_subplot(111)
+        if spectrogram:
+            with np.errstate(divide='ignore'):
+                level = 10 * np.log10(spectrum.spec[:, 1:, 0].T)
+            mesh = ax.pcolormesh(convert_time(spectrum.times, 'min', plot_unit), spectrum.freqs[1:], level,
+                                 shading='nearest')
+            ax.set_yscale('log')
+            ax.set_xlabel(f"Time ({plot_unit})")
+            ax.set_ylabel("Frequency (Hz)")
+            self.figure.colorbar(mesh, ax=ax, label=f"{columns[0]} PSD (dB/Hz)")
+        else:
+            for i, column in enumerate(spectrum.columns):
+                ax.loglog(spectrum.freqs[1:], spectrum.psd[1:, i], label=column, linewidth=0.8)
+            ax.set_xlabel("Frequency (Hz)")
+            ax.set_ylabel("PSD (units²/Hz)")
+            ax.legend()
+        ax.set_title(f"Noise spectrum, {spectrum.fs:.4g} Hz sampling")
+        self.spectrum_label.setText('\n'.join(
+            f"{column}: " + ', '.join(f"{f:.4g} Hz" for f, _ in spectrum.peaks(column, 3, min_freq=0.5))
+            for column in spectrum.columns))
+        with PROFILER.span('draw'):
+            self.figure.tight_layout()
+            self.canvas.draw()
+
+    @PROFILER.method('plotter.analyze_iv')
+    def analyze_iv(self):
+        if self.df is None:
+            return
+        v_col = self.voltage_combo.currentText()
+        i_col = self.current_combo.currentText()
+        try:
+            tap_length = float(self.tap_length_input.text())
+            criterion = float(self.criterion_input.text())
+        except ValueError:
+            self.iv_label.setText("Enter a tap length and criterion")
+            return
+        settings = (v_col, i_col, self.voltage_scale_combo.currentText(), tap_length, criterion)
+        try:
+            table = DERIVED.get((self.dataset_key(), 'iv') + settings, lambda: iv_table(
+                self.df, i_col, [v_col], tap_length_cm=tap_length, criterion=criterion,
+                voltage_scale=settings[2]))
+        except Exception as e:
+            print(f"IV analysis failed: {e}")
+            self.iv_label.setText("")
+            return
+        self.iv_label.setText(describe_iv(table))
+        self.iv_label.setToolTip(table.to_string(index=False))
+
+    def series_transforms(self, abs_checkbox, deriv_checkbox):
+        # Applied in this order: |y| first, then d/dx with the chosen method
+        transforms = ('abs',) if abs_checkbox.isChecked() else ()
+        if deriv_checkbox.isChecked():
+            try:
+                window = int(self.deriv_window_input.text())
+            except ValueError:
+                window = 11
+            transforms += (('deriv', self.deriv_method_combo.currentData(), window),)
+        return transforms
+
+    def dataset_key(self):
+        # Identifies the loaded file and its version, so derived series of an edited file are recomputed
+        if self.df_source is not None:
+            try:
+                return DATASETS.key(*self.df_source)
+            except OSError:
+                pass
+        return ('dataframe', id(self.df))
+
+    def plot_source(self):
+        # The loaded run, or its per-plateau averages, with the key its derived series are cached under
+        dataset = self.dataset_key()
+        if not self.plateau_checkbox.isChecked():
+            return self.resampled_source(dataset)
+        currents = self.supply_currents()
+        key = (dataset, 'plateaus') + currents
+        return DERIVED.get(key, lambda: plateau_table(self.df, list(currents))), key
+
+    def resampled_source(self, dataset):
+        # The loaded run on a uniform time grid if a resample period is set, else the run itself
+        text = self.resample_input.text().strip()
+        if not text or 'Timestamp' not in self.df.columns:
+            return self.df, dataset
+        try:
+            period_s = float(text)
+        except ValueError:
+            print(f"Invalid resample period: {text}")
+            return self.df, dataset
+        how = self.resample_how_combo.currentText()
+        # The engine works in minutes; scale the period to the Timestamp's base unit instead
+        period = period_s / UNIT_TO_MIN[self.base_unit_combo.currentText()]
+        key = (dataset, 'resampled', period, how)
+        return DERIVED.get(key, lambda: resample_frame(self.df, period, how)), key
+
+    def column_values(self, df, dataset, col, lag_s):
+        # A column as recorded, or read lag_s later so it lines up with the other channels
+        if not lag_s or 'Timestamp' not in df.columns:
+            return df[col].to_numpy()
+        base_unit = self.base_unit_combo.currentText()
+        return DERIVED.get((dataset, 'shifted', col, lag_s, base_unit), lambda: shifted_values(
+            df['Timestamp'].to_numpy() * UNIT_TO_MIN[base_unit], df[col].to_numpy(), lag_s))
+
+    @PROFILER.method('plotter.align_channels')
+    def align_channels(self):
+        # Lag of each other Y column behind Y1 from their cross-correlation
+        if self.df is None or 'Timestamp' not in self.df.columns:
+            return
+        reference = self.y1_axis_combo.currentText()
+        combos = [self.y2_axis_combo, self.y3_axis_combo, self.y4_axis_combo]
+        columns = [c.currentText() for c in combos if c.isEnabled() and c.currentText() not in ('', reference)]
+        if self.enable_resistance_checkbox.isChecked():
+            columns = [self.voltage_combo.currentText()]
+        t = self.df['Timestamp'].to_numpy() * UNIT_TO_MIN[self.base_unit_combo.currentText()]
+        results = []
+        for col in dict.fromkeys(columns):
+            try:
+                lag = estimate_lag(t, self.df[reference].to_numpy(), t, self.df[col].to_numpy())
+            except Exception as e:
+                print(f"Failed to align {col}: {e}")
+                continue
+            self.time_shifts[col] = lag.lag_s
+            results.append(f"{col}: {lag.lag_s:+.4g} s (r = {lag.correlation:.2f})")
+        self.align_label.setText('\n'.join(results))
+        self.plot_selected()
+
+    def clear_time_shifts(self):
+        self.time_shifts = {}
+        self.align_label.setText("")
+        self.plot_selected()
+
+    def supply_currents(self):
+        return tuple(c for c in PLATEAU_CURRENTS if c in self.df.columns) or (self.current_combo.currentText(),)
+
+    def sweep_spec(self):
+        # (direction, sweep numbers) to keep, or None to plot every row
+        direction = self.sweep_combo.currentData()
+        try:
+            numbers = parse_sweep_numbers(self.sweep_numbers_input.text())
+        except ValueError:
+            print(f"Invalid sweep numbers: {self.sweep_numbers_input.text()}")
+            numbers = None
+        if self.plateau_checkbox.isChecked() or (direction is None and numbers is None):
+            return None
+        return direction, numbers
+
+    def ramp_index(self, df, dataset):
+        # Sweeps of the first supply current, found once per file version
+        current_col = self.supply_currents()[0]
+        time_min = df['Timestamp'].to_numpy(dtype=np.float64) if 'Timestamp' in df.columns else None
+        return DERIVED.get((dataset, 'ramps', current_col), lambda: RampIndex.from_current(
+            df[current_col].to_numpy(dtype=np.float64), time_min))
+
+    def x_values(self, df, x_spec):
+        if len(x_spec) == 3:
+            # Use base/plot unit scaling
+            return convert_time(df.iloc[:, 0].values, x_spec[1], x_spec[2])
+        return df[x_spec[0]].to_numpy()
+
+    def x_range(self, df, dataset, x_full, x_key):
+        # Rows inside the X range (and the selected sweeps), and the X values to plot
+        x_min, x_max, sweep_spec = x_key[-3:]
+        mask = range_mask(x_full, x_min, x_max)
+        breaks = ()
+        if sweep_spec is not None:
+            index = self.ramp_index(df, dataset)
+            mask &= index.mask(index.select(*sweep_spec))
+        rows = np.flatnonzero(mask)
+        if sweep_spec is not None:
+            # Break the line between sweeps instead of joining the end of one to the start of the next
+            breaks = np.flatnonzero(np.diff(rows) > 1) + 1
+        return rows, breaks, take_rows(x_full, rows, breaks)
+
+    def resistance_series(self, voltage, current, voltage_scale):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return resistance(np.asarray(voltage, dtype=np.float64), np.asarray(current, dtype=np.float64),
+                              voltage_scale)
+
+    def apply_y_limits(self, ax, min_input, max_input):
+        try:
+            y_min = float(min_input.text())
+            y_max = float(max_input.text())
+            ax.set_ylim(y_min, y_max)
+        except ValueError:
+            # No limits: autoscale again, in case limits were set on an earlier restyle
+            ax.set_autoscaley_on(True)
+            ax.relim()
+            ax.autoscale_view(scalex=False)
+
+    def update_legend(self):
+        state = self.plot_state
+        ax1 = state['ax1']
+        if ax1.get_legend() is not None:
+            ax1.get_legend().remove()
+        if self.show_legend_checkbox.isChecked():
+            lines, labels = [], []
+            for ax in state['legend_axes']:
+                l, lb = ax.get_legend_handles_labels()
+                lines += l
+                labels += lb
+            ax1.legend(lines, labels, loc='best', fontsize=state['fontsize'])
+
+    @PROFILER.method('plotter.restyle_plot')
+    def restyle_plot(self):
+        # Apply label, legend and Y limit changes to the existing lines without recomputing them
+        state = self.plot_state
+        for ax, line, col, legend_input, label_input, min_input, max_input in state['slots']:
+            if legend_input is not None:
+                line.set_label(legend_input.text() or col)
+                ax.set_ylabel(label_input.text() or col)
+            self.apply_y_limits(ax, min_input, max_input)
+        state['ax1'].set_xlabel(self.x_label_input.text() or state['x_col'])
+        self.update_legend()
+        with PROFILER.span('tight_layout'):
             self.figure.tight_layout()
+        with PROFILER.span('draw'):
             self.canvas.draw()
 
     def open_external_file(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Open CSV File", "", "CSV Files (*.csv);;All Files (*)")
         if file_path:
             try:
-                self.df = pd.read_csv(file_path)
+                self.df = acquire_dataset(self, file_path, 'cleaned')
                 self.x_axis_combo.clear()
                 self.y1_axis_combo.clear()
                 self.y2_axis_combo.clear()
@@ -1154,20 +1735,58 @@ class PlotterUI(QMainWindow):
                 print(f"Failed to open file: {e}")
 
 
+class ArchiveScanThread(QThread):
+    """Brings the catalog up to date with the archive roots in the background."""
+    progress = pyqtSignal(str)
+    scanned = pyqtSignal(object)
+
+    def __init__(self, catalog, roots=None, quick=True, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self.roots = roots
+        self.quick = quick
+
+    def run(self):
+        indexer = ArchiveIndexer(self.catalog)
+        totals = {}
+        for root in self.roots or indexer.roots():
+            if self.isInterruptionRequested():
+                break
+            try:
+                counts = indexer.scan(root, quick=self.quick, progress=self.progress.emit,
+                                      should_stop=self.isInterruptionRequested)
+            except Exception as e:
+                print(f"Archive scan of {root} failed: {e}")
+                continue
+            for key, value in counts.items():
+                totals[key] = totals.get(key, 0) + value
+        self.scanned.emit(totals)
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.loading_label = QLabel(self)
-        self.loading_movie = QMovie("spinning_magnet.gif")
-        self.loading_label.setMovie(self.loading_movie)
-        self.loading_label.setVisible(True)
-        self.loading_movie.start()
+        # Shown while a tab is being built (the gif sits next to main.py; without it a plain label)
+        self.loading_label = QLabel("Loading…", self)
+        self.loading_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        gif_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "spinning_magnet.gif")
+        self.loading_movie = QMovie(gif_path) if os.path.exists(gif_path) else None
+        if self.loading_movie is not None and self.loading_movie.isValid():
+            self.loading_label.setMovie(self.loading_movie)
+        self.loading_label.setVisible(False)
 
         self.setWindowTitle("Magnet Data Analysis Tool")
         self.setGeometry(100, 100, 1400, 800)
 
-        self.shared_data_manager = SharedDataManager()
+        self.catalog = Catalog()
+        self.archive_scan = None
+        self.cleaner = None
+        self.plotter = None
+        self.combiner = None
+        self.live_viewer = None
         self.setup_ui()
+        self.setup_performance_panel()
+        STARTUP.mark("main window")
 
     def setup_ui(self):
         central_widget = QWidget()
@@ -1189,17 +1808,17 @@ class MainWindow(QMainWindow):
         button_layout.addWidget(live_button)
         layout.addWidget(button_widget)
 
-        # Stacked widget for interfaces
+        # Stacked widget for interfaces. Each tab is built the first time it is shown,
+        # until then its page is an empty placeholder.
         self.stacked_widget = QStackedWidget()
-        self.cleaner = DataCleanerUI(self.shared_data_manager)
-        self.plotter = PlotterUI(self.shared_data_manager)
-        self.combiner = FileCombinerUI(self.shared_data_manager)
-        self.live_viewer = LiveViewerUI()
-
-        self.stacked_widget.addWidget(self.cleaner)
-        self.stacked_widget.addWidget(self.plotter)
-        self.stacked_widget.addWidget(self.combiner)
-        self.stacked_widget.addWidget(self.live_viewer)
+        self.tab_factories = [
+            ('cleaner', lambda: DataCleanerUI(self.catalog)),
+            ('plotter', self.build_plotter),
+            ('combiner', lambda: FileCombinerUI(self.catalog)),
+            ('live_viewer', LiveViewerUI),
+        ]
+        for _ in self.tab_factories:
+            self.stacked_widget.addWidget(QWidget())
 
         layout.addWidget(self.stacked_widget)
 
@@ -1209,26 +1828,125 @@ class MainWindow(QMainWindow):
         combiner_button.clicked.connect(self.switch_to_combiner)
         live_button.clicked.connect(self.switch_to_live_viewer)
 
+    def setup_performance_panel(self):
+        # Status bar: timings of the last profiled operation, the on/off switch and trace export
+        self.perf_label = QLabel("")
+        self.perf_label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Preferred)
+        self.profile_checkbox = QCheckBox("Profile")
+        self.profile_checkbox.setChecked(PROFILER.enabled)
+        self.profile_checkbox.stateChanged.connect(self.toggle_profiling)
+        trace_button = QPushButton("Save Trace")
+        trace_button.clicked.connect(self.save_trace)
+        self.index_label = QLabel("")
+        self.cache_label = QLabel(DATASETS.describe())
+        DATASETS.listeners.append(self.show_cache_stats)
+        self.statusBar().addWidget(self.perf_label, 1)
+        self.statusBar().addPermanentWidget(self.index_label)
+        self.statusBar().addPermanentWidget(self.cache_label)
+        self.statusBar().addPermanentWidget(self.profile_checkbox)
+        self.statusBar().addPermanentWidget(trace_button)
+        PROFILER.listeners.append(self.show_span)
+
+    def show_cache_stats(self, cache):
+        # The archive indexer loads files without the cache, so this only runs on the GUI thread
+        if threading.current_thread() is threading.main_thread():
+            self.cache_label.setText(cache.describe())
+
+    def toggle_profiling(self, state):
+        PROFILER.set_enabled(state == Qt.Checked)
+        if state != Qt.Checked:
+            self.perf_label.setText("")
+
+    def show_span(self, span):
+        # Spans from worker threads are only kept for the trace
+        if threading.current_thread() is threading.main_thread():
+            self.perf_label.setText(span.summary())
+
+    def save_trace(self):
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Save Chrome Trace", "magtrace_trace.json", "JSON Files (*.json);;All Files (*)")
+        if file_path:
+            PROFILER.write_chrome_trace(file_path)
+
+    def build_plotter(self):
+        plotter = PlotterUI(self.catalog)
+        plotter.archive_added.connect(lambda root: self.start_archive_scan([root]))
+        return plotter
+
+    def start_archive_scan(self, roots=None):
+        # Rescans the given roots, or all known ones; only new or changed files are opened
+        if self.archive_scan is not None and self.archive_scan.isRunning():
+            if roots:
+                QTimer.singleShot(1000, lambda: self.start_archive_scan(roots))
+            return
+        self.archive_scan = ArchiveScanThread(self.catalog, roots, parent=self)
+        self.archive_scan.progress.connect(self.index_label.setText)
+        self.archive_scan.scanned.connect(self.archive_scanned)
+        self.archive_scan.start()
+
+    def archive_scanned(self, counts):
+        changed = counts.get('new', 0) + counts.get('changed', 0) + counts.get('removed', 0)
+        self.index_label.setText(f"Archive: {counts.get('new', 0)} new, {counts.get('changed', 0)} changed, "
+                                 f"{counts.get('removed', 0)} removed" if changed else "")
+        if changed:
+            if self.plotter is not None:
+                self.plotter.update_file_list()
+            if self.combiner is not None:
+                self.combiner.update_file_list()
+
+    def closeEvent(self, event):
+        if self.archive_scan is not None and self.archive_scan.isRunning():
+            self.archive_scan.requestInterruption()
+            self.archive_scan.wait()
+        super().closeEvent(event)
+
+    def show_tab(self, index):
+        attr, factory = self.tab_factories[index]
+        tab = getattr(self, attr)
+        if tab is None:
+            self.show_loading(True)
+            tab = factory()
+            setattr(self, attr, tab)
+            placeholder = self.stacked_widget.widget(index)
+            self.stacked_widget.insertWidget(index, tab)
+            self.stacked_widget.removeWidget(placeholder)
+            placeholder.deleteLater()
+            self.show_loading(False)
+            STARTUP.mark(f"{attr} tab")
+        self.stacked_widget.setCurrentIndex(index)
+        return tab
+
+    def show_loading(self, visible):
+        if visible:
+            self.loading_label.setGeometry(self.rect())
+            self.loading_label.raise_()
+        self.loading_label.setVisible(visible)
+        if self.loading_movie is not None:
+            if visible:
+                self.loading_movie.start()
+            else:
+                self.loading_movie.stop()
+        if visible:
+            QApplication.processEvents()
+
     def switch_to_live_viewer(self):
-        self.stacked_widget.setCurrentIndex(3)
+        self.show_tab(3)
 
     def switch_to_cleaner(self):
-        self.stacked_widget.setCurrentIndex(0)
+        self.show_tab(0)
 
     def switch_to_plotter(self):
-        self.stacked_widget.setCurrentIndex(1)
-        self.plotter.update_file_list()
+        self.show_tab(1).update_file_list()
 
     def switch_to_combiner(self):
-        self.stacked_widget.setCurrentIndex(2)
-        self.combiner.update_file_list()
+        self.show_tab(2).update_file_list()
 
 
 # --- File Combiner UI ---
 class FileCombinerUI(QMainWindow):
-    def __init__(self, shared_data_manager):
+    def __init__(self, catalog):
         super().__init__()
-        self.shared_data_manager = shared_data_manager
+        self.catalog = catalog
         self.setWindowTitle("File Combiner")
         self.setGeometry(100, 100, 1400, 800)
         self.setup_ui()
@@ -1258,10 +1976,10 @@ class FileCombinerUI(QMainWindow):
 
     def update_file_list(self):
         self.file_list.clear()
-        for file in self.shared_data_manager.get_cleaned_files():
-            self.file_list.addItem(file)
+        add_dataset_items(self.file_list, self.catalog.datasets(PLOT_KINDS))
         self.refresh_numbered_file_list()
 
+    @PROFILER.method('combiner.combine_files')
     def combine_files(self):
         # Always refresh numbered file list to reflect selection order
         self.refresh_numbered_file_list()
@@ -1275,22 +1993,18 @@ class FileCombinerUI(QMainWindow):
         if not selected_paths:
             return
 
-        dfs = []
-        offset = 0
-        for file_path in selected_paths:
-            df = pd.read_csv(file_path)
-            if 'Timestamp' in df.columns:
-                df['Timestamp'] = df['Timestamp'] + offset
-                offset = df['Timestamp'].iloc[-1] + 0.01  # ensure next starts slightly after
-            dfs.append(df)
+        with PROFILER.span('read'):
+            dfs = [DATASETS.get(file_path, 'cleaned') for file_path in selected_paths]
 
         if dfs:
-            combined_df = pd.concat(dfs, ignore_index=True)
+            with PROFILER.span('combine'):
+                combined_df = combine_runs(dfs)
             save_path, _ = QFileDialog.getSaveFileName(
                 self, "Save Combined Data", "", "CSV Files (*.csv);;All Files (*)")
             if save_path:
-                combined_df.to_csv(save_path, index=False)
-                self.shared_data_manager.add_cleaned_file(save_path)
+                with PROFILER.span('write_csv'):
+                    combined_df.to_csv(save_path, index=False)
+                register_dataset(self.catalog, save_path, combined_df, kind='combined')
             # Update each list item text after combining to refresh ordering
             self.update_file_list()
             self.refresh_numbered_file_list()
@@ -1304,8 +2018,410 @@ class FileCombinerUI(QMainWindow):
             item.setText(f"{i + 1}: {text}")
 
 
-import threading
-import time
+class LiveRenderer:
+    """Draws the live plot grid with persistent artists and blits only the line data each frame.
+
+    All panels share one figure, so a frame is a single restore + blit however many files are
+    followed. Axis limits are recomputed (with a full redraw) only when new data leaves the view.
+    The number of points drawn, the figure DPI and the time between frames adapt to the
+    measured frame time: once the points are at their minimum, the figure is rendered at a
+    lower DPI and Qt scales the image up to the widget size.
+    """
+
+    def __init__(self, figure, canvas, target_fps=20):
+        self.figure = figure
+        self.canvas = canvas
+        self.target_fps = target_fps
+        self.resolution = 2000  # min/max buckets per line, shared between panels
+        self.min_resolution = 200
+        self.max_resolution = 8000
+        # Figure DPI relative to the screen's; it is set through the canvas pixel ratio, which
+        # older matplotlib does not expose, so there only the number of points adapts
+        self.render_scales = (0.5, 0.7, 1.0) if hasattr(canvas, '_set_device_pixel_ratio') else (1.0,)
+        self.render_scale = 1.0
+        self.frame_time = 0.0  # smoothed seconds per frame
+        self.fps = 0.0  # achieved frames per second
+        self.axes = []  # per panel: [left axis, twin axis...]
+        self.lines = []  # per panel: one line per series
+        self.key = None
+        self._last_frame = None
+        self._background = None
+        self._needs_full_draw = True
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def setup(self, key, panels, n_cols=1):
+        # panels: list of (title, x_label, series), series: list of (label, color);
+        # the first series goes on the left axis, the second on a twin axis
+        self.key = key
+        self.figure.clear()
+        self.axes = []
+        self.lines = []
+        n_cols = max(1, min(n_cols, len(panels)))
+        n_rows = -(-len(panels) // n_cols)
+        for k, (title, x_label, series) in enumerate(panels):
+            ax = self.figure.add_subplot(n_rows, n_cols, k + 1)
+            axes, lines = [ax], []
+            for i, (label, color) in enumerate(series):
+                axis = ax if i == 0 else ax.twinx()
+                if i > 0:
+                    axes.append(axis)
+                line, = axis.plot([], [], label=label, color=color, animated=True)
+                axis.set_ylabel(label, color=color)
+                axis.tick_params(axis='y', labelcolor=color)
+                lines.append(line)
+            ax.set_xlabel(x_label)
+            if title and len(panels) > 1:
+                ax.set_title(title, fontsize='small')
+            ax.legend(handles=lines, loc='upper left')
+            self.axes.append(axes)
+            self.lines.append(lines)
+        self.figure.tight_layout()
+        self._background = None
+        self._needs_full_draw = True
+
+    def frame_interval(self):
+        # Never render faster than the target rate, nor faster than frames can actually be drawn
+        return max(1.0 / self.target_fps, 1.5 * self.frame_time)
+
+    def next_frame_delay(self):
+        if self._last_frame is None:
+            return 0.0
+        return max(0.0, self._last_frame + self.frame_interval() - time.perf_counter())
+
+    def decimate(self, x, ys):
+        # Returns copies, so the caller can release the buffer before drawing
+        n_buckets = int(self.resolution / max(1, len(self.lines)))
+        out = [minmax_decimate(x, y, n_buckets) for y in ys]
+        return [np.array(pair[0]) for pair in out], [np.array(pair[1]) for pair in out]
+
+    def draw_frame(self, data):
+        # data: per panel (xs, ys) as returned by decimate()
+        start = time.perf_counter()
+        rescaled = False
+        for axes, lines, (xs, ys) in zip(self.axes, self.lines, data):
+            for line, x, y in zip(lines, xs, ys):
+                line.set_data(x, y)
+            rescaled |= self._rescale_if_needed(axes, xs, ys)
+        if rescaled or self._needs_full_draw or self._background is None:
+            self._needs_full_draw = False
+            self.canvas.draw()  # _on_draw captures the new background
+        self.canvas.restore_region(self._background)
+        for axes, lines in zip(self.axes, self.lines):
+            for axis, line in zip(axes, lines):
+                axis.draw_artist(line)
+        self.canvas.blit(self.figure.bbox)
+        self._adapt(start, time.perf_counter() - start)
+
+    def _adapt(self, start, elapsed):
+        self.frame_time = elapsed if self.frame_time == 0 else 0.8 * self.frame_time + 0.2 * elapsed
+        budget = 1.0 / self.target_fps
+        if self.frame_time > 0.8 * budget:
+            if self.resolution > self.min_resolution:
+                self.resolution = max(self.min_resolution, self.resolution * 0.7)
+            else:
+                self._step_render_scale(-1)
+        elif self.frame_time < 0.5 * budget:
+            # Back to full DPI first; the pixels drawn grow with the square of the scale
+            higher = self._next_render_scale(1)
+            if higher is None:
+                self.resolution = min(self.max_resolution, self.resolution * 1.2)
+            elif self.frame_time * (higher / self.render_scale) ** 2 < 0.6 * budget:
+                self._step_render_scale(1)
+        if self._last_frame is not None and start > self._last_frame:
+            rate = 1.0 / (start - self._last_frame)
+            self.fps = rate if self.fps == 0 else 0.8 * self.fps + 0.2 * rate
+        self._last_frame = start
+
+    def _next_render_scale(self, direction):
+        i = self.render_scales.index(self.render_scale) + direction
+        return self.render_scales[i] if 0 <= i < len(self.render_scales) else None
+
+    def _step_render_scale(self, direction):
+        scale = self._next_render_scale(direction)
+        if scale is not None:
+            self.set_render_scale(scale)
+
+    def set_render_scale(self, scale):
+        # Figure DPI = scale x screen DPI, through the canvas pixel ratio so the widget keeps its
+        # size and mouse coordinates stay right; the resize redraws and recaptures the background
+        if not hasattr(self.canvas, '_set_device_pixel_ratio'):
+            return
+        self.render_scale = scale
+        ratio = (self.canvas.devicePixelRatioF() or 1) * scale
+        if self.canvas._set_device_pixel_ratio(ratio):
+            self.canvas.resizeEvent(QResizeEvent(self.canvas.size(), self.canvas.size()))
+            self._needs_full_draw = True
+
+    def _rescale_if_needed(self, axes, xs, ys):
+        changed = False
+        x = np.concatenate(xs) if xs else np.empty(0)
+        x = x[np.isfinite(x)]
+        if len(x):
+            x_min, x_max = x.min(), x.max()
+            lo, hi = axes[0].get_xlim()
+            if x_min < lo or x_max > hi:
+                # Leave some headroom on the right so the view does not rescale on every new row
+                headroom = 0.1 * (x_max - x_min) or 1.0
+                axes[0].set_xlim(x_min, x_max + headroom)
+                changed = True
+        for axis, y in zip(axes, ys):
+            y = y[np.isfinite(y)]
+            if not len(y):
+                continue
+            y_min, y_max = y.min(), y.max()
+            lo, hi = axis.get_ylim()
+            if y_min < lo or y_max > hi:
+                margin = 0.05 * (y_max - y_min) or 0.05 * abs(y_max) or 1.0
+                axis.set_ylim(y_min - margin, y_max + margin)
+                changed = True
+        return changed
+
+    def _on_draw(self, event):
+        # Any full redraw (rescale, resize, toolbar zoom) invalidates the cached background
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+
+
+class LiveFileWatcher(QObject):
+    """Emits `changed` with the list of watched files that were written to.
+
+    Change events come from QFileSystemWatcher (inotify / ReadDirectoryChangesW). A slow size
+    poll is kept as a fallback for drives that do not deliver events (network and cloud-synced
+    folders). Events arriving within `coalesce_ms` of each other, from any of the files, are
+    merged into one notification.
+    """
+    changed = pyqtSignal(list)
+
+    def __init__(self, file_paths, poll_interval=1000, coalesce_ms=20, parent=None):
+        super().__init__(parent)
+        self.file_paths = list(file_paths)
+        self.poll_interval = poll_interval
+        self._sizes = {}
+        self._dirty = set()
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._on_event)
+        self._poll_timer = QTimer(self)
+        self._poll_timer.timeout.connect(self._poll)
+        self._coalesce_timer = QTimer(self)
+        self._coalesce_timer.setSingleShot(True)
+        self._coalesce_timer.setInterval(coalesce_ms)
+        self._coalesce_timer.timeout.connect(self._emit_changed)
+
+    def start(self):
+        for path in self.file_paths:
+            self._sizes[path] = os.path.getsize(path)
+            self._watcher.addPath(path)
+        self._poll_timer.start(self.poll_interval)
+
+    def stop(self):
+        self._poll_timer.stop()
+        self._coalesce_timer.stop()
+        if self._watcher.files():
+            self._watcher.removePaths(self._watcher.files())
+
+    def _on_event(self, path):
+        # Some writers replace the file, which drops the watch; re-arm it
+        if path not in self._watcher.files() and os.path.exists(path):
+            self._watcher.addPath(path)
+        self._trigger(path)
+
+    def _poll(self):
+        watched = self._watcher.files()
+        for path in self.file_paths:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            if path not in watched:
+                self._watcher.addPath(path)
+            if size != self._sizes.get(path):
+                self._trigger(path)
+
+    def _trigger(self, path):
+        self._dirty.add(path)
+        if not self._coalesce_timer.isActive():
+            self._coalesce_timer.start()
+
+    def _emit_changed(self):
+        dirty = [p for p in self.file_paths if p in self._dirty]
+        self._dirty.clear()
+        for path in dirty:
+            try:
+                self._sizes[path] = os.path.getsize(path)
+            except OSError:
+                pass
+        self.changed.emit(dirty)
+
+
+class LiveReaderPool(QObject):
+    """Incremental readers for all followed files behind one watcher.
+
+    One wake-up reads every file that grew and emits a single `rows_read` ({path: rows}),
+    so following more files does not add timers, threads or frames.
+    """
+    rows_read = pyqtSignal(object)
+
+    def __init__(self, tails, poll_interval=1000, parent=None):
+        super().__init__(parent)
+        self.tails = {tail.file_path: tail for tail in tails}
+        self.watcher = LiveFileWatcher(list(self.tails), poll_interval=poll_interval, parent=self)
+        self.watcher.changed.connect(self.read)
+
+    def start(self):
+        self.watcher.start()
+
+    def stop(self):
+        self.watcher.stop()
+
+    def read(self, paths):
+        new_rows = {}
+        for path in paths:
+            try:
+                rows = self.tails[path].read_new_rows()
+            except Exception as e:
+                print(f"Live plotting error ({os.path.basename(path)}): {e}")
+                continue
+            if len(rows):
+                new_rows[path] = rows
+        if new_rows:
+            self.rows_read.emit(new_rows)
+
+
+class SocketRowSource(QObject):
+    """Receives live rows over a local socket instead of tailing a file.
+
+    Protocol: one header line "#columns;<name>;<name>;..." followed either by ';'-separated
+    text rows (the same format as the LabVIEW file body) or, after a "#binary" line, by raw
+    little-endian float64 rows. transport is 'tcp' (127.0.0.1:port) or 'local' (a Unix socket,
+    or a named pipe on Windows). One publisher is served at a time; a new connection replaces it.
+    """
+    columns_received = pyqtSignal(list)
+    rows_received = pyqtSignal(object)
+
+    def __init__(self, transport='tcp', port=LIVE_SOCKET_PORT, name=LIVE_SOCKET_NAME, parent=None):
+        super().__init__(parent)
+        self.transport = transport
+        self.port = port
+        self.name = name
+        self.columns = None
+        self.binary = False
+        self._server = None
+        self._connection = None
+        self._pending = b''
+
+    def address(self):
+        return f"127.0.0.1:{self.port}" if self.transport == 'tcp' else self.name
+
+    def start(self):
+        if self.transport == 'tcp':
+            self._server = QTcpServer(self)
+            ok = self._server.listen(QHostAddress.LocalHost, self.port)
+        else:
+            QLocalServer.removeServer(self.name)
+            self._server = QLocalServer(self)
+            ok = self._server.listen(self.name)
+        if not ok:
+            raise OSError(f"Cannot listen on {self.address()}: {self._server.errorString()}")
+        self._server.newConnection.connect(self._accept)
+
+    def stop(self):
+        if self._connection is not None:
+            self._connection.abort()
+            self._connection = None
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+    def _accept(self):
+        if self._connection is not None:
+            self._connection.abort()
+        self._connection = self._server.nextPendingConnection()
+        self._connection.readyRead.connect(self._read)
+        self.columns = None
+        self.binary = False
+        self._pending = b''
+
+    def _read(self):
+        self._pending += bytes(self._connection.readAll())
+        # Header lines come first and always start with '#'
+        while self._pending.startswith(b'#'):
+            end = self._pending.find(b'\n')
+            if end < 0:
+                return
+            line = self._pending[:end].decode('utf-8', errors='replace').strip()
+            self._pending = self._pending[end + 1:]
+            if line.startswith('#columns'):
+                self.columns = [c.strip() for c in line.split(';')[1:]]
+                self.columns_received.emit(self.columns)
+            elif line == '#binary':
+                self.binary = True
+        if self.columns is None or not self._pending:
+            return
+        if self.binary:
+            row_bytes = 8 * len(self.columns)
+            n = len(self._pending) // row_bytes
+            if n == 0:
+                return
+            rows = np.frombuffer(self._pending[:n * row_bytes], dtype='<f8').reshape(n, len(self.columns))
+            self._pending = self._pending[n * row_bytes:]
+        else:
+            end = self._pending.rfind(b'\n')
+            if end < 0:
+                return
+            rows = parse_delimited_rows(self._pending[:end + 1], len(self.columns))
+            self._pending = self._pending[end + 1:]
+        if len(rows):
+            self.rows_received.emit(rows)
+
+
+class ReplaySource(QObject):
+    """Streams an archived export through the live pipeline, paced by its Timestamp column.
+
+    speed is a factor on the recorded rate (1, 10, ...) or 0 for as fast as possible. Each
+    batch is emitted with the wall-clock time its first row would have been written, which
+    ReplayMetrics uses for end-to-end latency.
+    """
+    rows_received = pyqtSignal(object, float)
+    finished = pyqtSignal()
+
+    def __init__(self, df, speed=1.0, time_column='Timestamp', time_scale=1e-3, max_batch=1000, parent=None):
+        super().__init__(parent)
+        self.columns = [str(c) for c in df.columns]
+        self.rows = df.to_numpy(dtype=np.float64)
+        self.speed = speed
+        self.max_batch = max_batch
+        self.sent = 0
+        self.t = None
+        if time_column in self.columns and speed > 0:
+            t = self.rows[:, self.columns.index(time_column)] * time_scale
+            t = np.nan_to_num(t - np.nanmin(t))
+            self.t = np.maximum.accumulate(t) / speed  # wall-clock offsets
+        self._start = None
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._tick)
+
+    def start(self):
+        self._start = time.perf_counter()
+        self._timer.start(0 if self.t is None else 5)
+
+    def stop(self):
+        self._timer.stop()
+
+    def _tick(self):
+        now = time.perf_counter()
+        if self.t is None:
+            stop = min(self.sent + self.max_batch, len(self.rows))
+            due = now
+        else:
+            stop = int(np.searchsorted(self.t, now - self._start, side='right'))
+            stop = min(stop, self.sent + self.max_batch)
+            due = self._start + self.t[self.sent] if self.sent < len(self.rows) else now
+        if stop > self.sent:
+            rows = self.rows[self.sent:stop]
+            self.sent = stop
+            self.rows_received.emit(rows, due)
+        if self.sent >= len(self.rows):
+            self._timer.stop()
+            self.finished.emit()
 
 
 class LiveViewerUI(QMainWindow):
@@ -1314,12 +2430,21 @@ class LiveViewerUI(QMainWindow):
         self.setWindowTitle("Live Viewer")
         self.setGeometry(100, 100, 1400, 800)
 
-        self.df = pd.DataFrame()
-        self.running = False
+        self.panels = []  # one LivePanel per followed file / stream
+        self.current_panel = 0
+        self.reader_pool = None
+        self.socket_source = None
+        self.replay_source = None
+        self.metrics = None
         self.file_path = ""
-        self.update_interval = 1000  # milliseconds
+        self.update_interval = 1000  # fallback poll interval in milliseconds
+        self.buffer_capacity = 200000  # rows kept in memory per panel, older rows go to the history file
+        self.window_minutes = 10.0
+        self.frame_pending = False
+        self.rules = None  # None means default_detector_rules for the file's columns
 
         self.setup_ui()
+        self.renderer = LiveRenderer(self.figure, self.canvas, target_fps=20)
 
     def setup_ui(self):
         main_widget = QWidget()
@@ -1332,11 +2457,36 @@ class LiveViewerUI(QMainWindow):
         self.load_button.clicked.connect(self.select_file)
         control_layout.addWidget(self.load_button)
 
+        # Follow more files at once, each in its own panel
+        self.add_file_button = QPushButton("Add File")
+        self.add_file_button.clicked.connect(self.add_file)
+        control_layout.addWidget(self.add_file_button)
+
+        # Rows can also be pushed over a local socket (see replay_publisher.py)
+        self.source_combo = QComboBox()
+        self.source_combo.addItems(["File", "TCP socket", "Local socket", "Replay file"])
+        control_layout.addWidget(QLabel("Source:"))
+        control_layout.addWidget(self.source_combo)
+        self.port_input = QLineEdit(str(LIVE_SOCKET_PORT))
+        self.port_input.setFixedWidth(110)
+        self.port_input.setToolTip("TCP port, or socket/pipe name for a local socket")
+        control_layout.addWidget(self.port_input)
+        self.speed_combo = QComboBox()
+        self.speed_combo.addItems(["1×", "10×", "Max"])
+        self.speed_combo.setToolTip("Replay speed")
+        control_layout.addWidget(self.speed_combo)
+
         self.interval_input = QLineEdit("1000")
         self.interval_input.setFixedWidth(80)
-        control_layout.addWidget(QLabel("Update ms:"))
+        control_layout.addWidget(QLabel("Poll ms:"))
         control_layout.addWidget(self.interval_input)
 
+        # Rolling window shown on screen; empty means everything still in the buffer
+        self.window_input = QLineEdit(f"{self.window_minutes:g}")
+        self.window_input.setFixedWidth(60)
+        control_layout.addWidget(QLabel("Window (min):"))
+        control_layout.addWidget(self.window_input)
+
         self.start_button = QPushButton("Start")
         self.start_button.clicked.connect(self.start_plotting)
         control_layout.addWidget(self.start_button)
@@ -1346,24 +2496,77 @@ class LiveViewerUI(QMainWindow):
         self.stop_button.setEnabled(False)
         control_layout.addWidget(self.stop_button)
 
+        # Record parsed rows to <file>.magrec for scrubbing back and fast reopening in the cleaner
+        self.record_checkbox = QCheckBox("Record")
+        self.record_checkbox.setChecked(True)
+        control_layout.addWidget(self.record_checkbox)
+
+        self.fps_label = QLabel("-- fps")
+        control_layout.addWidget(self.fps_label)
+        self.source_label = QLabel("")
+        control_layout.addWidget(self.source_label)
+
         layout.addLayout(control_layout)
 
-        # --- Replace QListWidget with three QComboBox for X, Y1, Y2 ---
+        # --- Per-panel X, Y1, Y2 selection ---
         selector_layout = QHBoxLayout()
+        self.panel_combo = QComboBox()
+        self.panel_combo.currentIndexChanged.connect(self.select_panel)
+        selector_layout.addWidget(QLabel("Panel:"))
+        selector_layout.addWidget(self.panel_combo)
         self.x_combo = QComboBox()
         self.y1_combo = QComboBox()
         self.y2_combo = QComboBox()
+        for combo in (self.x_combo, self.y1_combo, self.y2_combo):
+            combo.currentTextChanged.connect(self.store_selection)
         selector_layout.addWidget(QLabel("X:"))
         selector_layout.addWidget(self.x_combo)
         selector_layout.addWidget(QLabel("Y1:"))
         selector_layout.addWidget(self.y1_combo)
         selector_layout.addWidget(QLabel("Y2:"))
         selector_layout.addWidget(self.y2_combo)
+        self.grid_cols_input = QLineEdit("")
+        self.grid_cols_input.setFixedWidth(40)
+        self.grid_cols_input.setPlaceholderText("auto")
+        self.grid_cols_input.editingFinished.connect(self.schedule_frame)
+        selector_layout.addWidget(QLabel("Grid columns:"))
+        selector_layout.addWidget(self.grid_cols_input)
         layout.addLayout(selector_layout)
 
-        self.figure = Figure(figsize=(6, 4), dpi=300)
-        self.canvas = FigureCanvas(self.figure)
-        self.toolbar = NavigationToolbar(self.canvas, self)
+        # --- Streaming threshold / quench detectors ---
+        alarm_layout = QHBoxLayout()
+        self.detector_checkbox = QCheckBox("Detectors")
+        self.detector_checkbox.setChecked(True)
+        alarm_layout.addWidget(self.detector_checkbox)
+        rules_button = QPushButton("Load Alarm Rules")
+        rules_button.clicked.connect(self.load_rules)
+        alarm_layout.addWidget(rules_button)
+        self.alarm_label = QLabel("No alarms")
+        # Long alarm texts must not resize the canvas (which would force full redraws)
+        self.alarm_label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Preferred)
+        alarm_layout.addWidget(self.alarm_label, stretch=1)
+        ack_button = QPushButton("Acknowledge")
+        ack_button.clicked.connect(self.acknowledge_alarm)
+        alarm_layout.addWidget(ack_button)
+        layout.addLayout(alarm_layout)
+
+        # --- Scrub back through the recorded session ---
+        scrub_layout = QHBoxLayout()
+        self.follow_checkbox = QCheckBox("Follow live")
+        self.follow_checkbox.setChecked(True)
+        self.follow_checkbox.stateChanged.connect(self.toggle_follow)
+        scrub_layout.addWidget(self.follow_checkbox)
+        self.scrub_slider = QSlider(Qt.Orientation.Horizontal)
+        self.scrub_slider.setRange(0, 1000)
+        self.scrub_slider.setValue(1000)
+        self.scrub_slider.sliderMoved.connect(self.scrub)
+        scrub_layout.addWidget(self.scrub_slider, stretch=1)
+        self.scrub_label = QLabel("")
+        scrub_layout.addWidget(self.scrub_label)
+        layout.addLayout(scrub_layout)
+
+        # Screen resolution; the renderer lowers the DPI when frames take too long
+        self.figure, self.canvas, self.toolbar = create_figure_canvas(self, (6, 4), dpi=100)
         layout.addWidget(self.toolbar)
         layout.addWidget(self.canvas)
 
@@ -1372,98 +2575,330 @@ class LiveViewerUI(QMainWindow):
         if file_path:
             self.file_path = file_path
             try:
-                # Use the same logic as DataCleanerUI.load_file for multi-level headers
-                self.df = pd.read_csv(self.file_path, delimiter=';', skiprows=1, header=[0, 1], low_memory=False)
-                self.df = self.df.dropna(axis=1, how='all')
-                self.df.columns = [self._flatten_col(col) for col in self.df.columns]
-                self.df = self.df.apply(pd.to_numeric, errors='coerce')
-                # Populate combo boxes for X, Y1, Y2
-                self.x_combo.clear()
-                self.y1_combo.clear()
-                self.y2_combo.clear()
-                self.x_combo.addItems(self.df.columns)
-                self.y1_combo.addItems(self.df.columns)
-                self.y2_combo.addItems(self.df.columns)
-                # Optionally set default selection for X to 'Timestamp'
-                if 'Timestamp' in self.df.columns:
-                    self.x_combo.setCurrentText('Timestamp')
+                if self.source_combo.currentText() == "Replay file":
+                    # Replays also accept cleaned CSVs, so the columns come from the full loader
+                    columns = [str(c) for c in load_export(self.file_path).columns]
+                    self.set_panels([LivePanel(os.path.basename(file_path), columns)])
+                    return
+                self.set_panels([self.file_panel(file_path)])
+                self.source_combo.setCurrentText("File")
             except Exception as e:
                 print(f"Failed to load file: {e}")
 
-    def _flatten_col(self, col):
-        if isinstance(col, tuple):
-            first = str(col[0]).strip() if pd.notna(col[0]) else ""
-            second = str(col[1]).strip() if pd.notna(col[1]) else ""
-            if second and second != first:
-                return f"{first}({second})"
-            return first
-        return str(col).strip()
+    def add_file(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Add Data File", "", "All Files (*)")
+        if file_path and file_path not in [p.tail.file_path for p in self.panels if p.tail is not None]:
+            try:
+                self.source_combo.setCurrentText("File")
+                panels = [p for p in self.panels if p.tail is not None]
+                self.set_panels(panels + [self.file_panel(file_path)])
+                self.file_path = self.file_path or file_path
+            except Exception as e:
+                print(f"Failed to load file: {e}")
+
+    def file_panel(self, file_path):
+        # Same two-row LabVIEW header handling as DataCleanerUI.load_file
+        tail = LiveFileTail(file_path)
+        return LivePanel(os.path.basename(file_path), tail.read_header(), tail=tail)
+
+    def set_panels(self, panels):
+        for panel in self.panels:
+            if panel not in panels:
+                panel.close()
+        self.panels = panels
+        self.panel_combo.blockSignals(True)
+        self.panel_combo.clear()
+        self.panel_combo.addItems([f"{i + 1}: {p.name}" for i, p in enumerate(panels)])
+        self.panel_combo.blockSignals(False)
+        self.panel_combo.setCurrentIndex(len(panels) - 1)
+        self.select_panel(len(panels) - 1)
+
+    def select_panel(self, index):
+        # Load the chosen panel's columns and selection into the X/Y1/Y2 combo boxes
+        if not 0 <= index < len(self.panels):
+            return
+        self.current_panel = index
+        panel = self.panels[index]
+        combos = ((self.x_combo, panel.x_col), (self.y1_combo, panel.y1_col), (self.y2_combo, panel.y2_col))
+        for combo, value in combos:
+            combo.blockSignals(True)
+            combo.clear()
+            combo.addItems(panel.columns)
+            combo.setCurrentText(value)
+            combo.blockSignals(False)
+
+    def store_selection(self):
+        if 0 <= self.current_panel < len(self.panels):
+            panel = self.panels[self.current_panel]
+            panel.x_col = self.x_combo.currentText()
+            panel.y1_col = self.y1_combo.currentText()
+            panel.y2_col = self.y2_combo.currentText()
+            self.schedule_frame()
 
     def start_plotting(self):
-        if not self.file_path:
+        source = self.source_combo.currentText()
+        if source == "File" and not any(p.tail is not None for p in self.panels):
+            return
+        if source == "Replay file" and not self.file_path:
             return
         try:
             self.update_interval = int(self.interval_input.text())
         except ValueError:
             self.update_interval = 1000
-
-        # Fallback: Load the file once when live plotting starts
         try:
-            self.df = pd.read_csv(self.file_path)
-            self.plot_live_data()
-        except Exception as e:
-            print(f"Initial load error: {e}")
+            self.window_minutes = float(self.window_input.text()) if self.window_input.text() else None
+        except ValueError:
+            self.window_minutes = 10.0
 
-        self.running = True
+        if source == "File":
+            self.start_file_source()
+        elif source == "Replay file":
+            self.start_replay_source()
+        else:
+            try:
+                self.start_socket_source('tcp' if source == "TCP socket" else 'local')
+            except Exception as e:
+                print(f"Socket error: {e}")
+                return
         self.start_button.setEnabled(False)
         self.stop_button.setEnabled(True)
 
-        self.thread = threading.Thread(target=self.live_plot_loop, daemon=True)
-        self.thread.start()
+    def detector_rules(self, columns):
+        if not self.detector_checkbox.isChecked():
+            return None
+        return self.rules if self.rules is not None else default_detector_rules(columns)
+
+    def start_file_source(self):
+        self.panels = [p for p in self.panels if p.tail is not None]
+        for panel in self.panels:
+            panel.begin_session(panel.tail.file_path, self.buffer_capacity, self.detector_rules(panel.columns),
+                                record=self.record_checkbox.isChecked())
+            try:
+                panel.tail.read_header()
+                # Rows already in the file only warm up the detector statistics
+                panel.ingest(panel.tail.read_new_rows(), record=False)
+            except Exception as e:
+                print(f"Initial load error: {e}")
+        self.renderer.key = None
+        self.plot_live_data()
+
+        # New rows are read when a file changes, not on a fixed sleep; one watcher for all files
+        self.reader_pool = LiveReaderPool([p.tail for p in self.panels],
+                                          poll_interval=self.update_interval, parent=self)
+        self.reader_pool.rows_read.connect(self.ingest_pool_rows)
+        self.reader_pool.start()
+        self.source_label.setText(", ".join(p.name for p in self.panels))
+
+    def start_socket_source(self, transport):
+        text = self.port_input.text().strip()
+        if transport == 'tcp':
+            self.socket_source = SocketRowSource('tcp', port=int(text or LIVE_SOCKET_PORT), parent=self)
+        else:
+            self.socket_source = SocketRowSource('local', name=text or LIVE_SOCKET_NAME, parent=self)
+        self.socket_source.columns_received.connect(self.on_stream_columns)
+        self.socket_source.rows_received.connect(self.ingest_rows)
+        self.socket_source.start()
+        self.source_label.setText(f"Listening on {self.socket_source.address()}")
+
+    def start_replay_source(self):
+        speed = {"1×": 1.0, "10×": 10.0, "Max": 0.0}[self.speed_combo.currentText()]
+        df = load_export(self.file_path)
+        columns = [str(c) for c in df.columns]
+        self.begin_stream_session(os.path.basename(self.file_path), columns,
+                                  os.path.join(tempfile.gettempdir(), 'magtrace_replay'))
+        self.metrics = ReplayMetrics(self.renderer.target_fps)
+        self.replay_source = ReplaySource(df, speed=speed, parent=self)
+        self.replay_source.rows_received.connect(self.ingest_replay_rows)
+        self.replay_source.finished.connect(self.finish_replay)
+        self.replay_source.start()
+        self.source_label.setText(f"Replaying {os.path.basename(self.file_path)} at {self.speed_combo.currentText()}")
+
+    def ingest_replay_rows(self, rows, due):
+        self.metrics.on_ingest(len(rows), due)
+        self.ingest_rows(rows)
+
+    def finish_replay(self):
+        # Let the last frame render before taking the numbers
+        QTimer.singleShot(int(self.renderer.frame_interval() * 2000), self._report_replay)
+
+    def _report_replay(self):
+        if self.metrics is None:
+            return
+        self.metrics.finish()
+        summary = self.metrics.summary()
+        summary.update({'file': os.path.basename(self.file_path), 'speed': self.speed_combo.currentText(),
+                        'date': time.strftime('%Y-%m-%d %H:%M:%S')})
+        with open('replay_benchmarks.jsonl', 'a') as f:
+            f.write(json.dumps(summary) + '\n')
+        self.stop_plotting()
+        self.source_label.setText(
+            f"{summary['rows_per_s']} rows/s, latency p50/p95/p99 {summary['latency_ms_p50']}/"
+            f"{summary['latency_ms_p95']}/{summary['latency_ms_p99']} ms, {summary['dropped_frames']} dropped frames")
+
+    def on_stream_columns(self, columns):
+        # A (re)connecting publisher starts a new session
+        self.begin_stream_session(self.socket_source.address(), columns,
+                                  os.path.join(tempfile.gettempdir(), 'magtrace_stream'))
+        self.source_label.setText(f"Receiving on {self.socket_source.address()}")
+
+    def begin_stream_session(self, name, columns, base_path):
+        # Socket and replay sources feed a single panel
+        panel = LivePanel(name, columns)
+        if self.panels and self.panels[0].columns == list(columns):
+            old = self.panels[0]
+            panel.x_col, panel.y1_col, panel.y2_col = old.x_col, old.y1_col, old.y2_col
+        self.set_panels([panel])
+        panel.begin_session(base_path, self.buffer_capacity, self.detector_rules(columns),
+                            record=self.record_checkbox.isChecked())
+        self.renderer.key = None
 
     def stop_plotting(self):
-        self.running = False
+        if self.reader_pool is not None:
+            self.reader_pool.stop()
+            self.reader_pool = None
+        if self.socket_source is not None:
+            self.socket_source.stop()
+            self.socket_source = None
+        if self.replay_source is not None:
+            self.replay_source.stop()
+            self.replay_source = None
+        self.metrics = None
+        for panel in self.panels:
+            panel.close()
+        self.source_label.setText("")
         self.start_button.setEnabled(True)
         self.stop_button.setEnabled(False)
 
-    def live_plot_loop(self):
-        while self.running:
+    def ingest_pool_rows(self, new_rows):
+        # {path: rows} from the reader pool; all files share one frame
+        for panel in self.panels:
+            if panel.tail is not None and panel.tail.file_path in new_rows:
+                self.ingest_rows(new_rows[panel.tail.file_path], panel)
+
+    def ingest_rows(self, rows, panel=None):
+        # Common path for file, socket and replay sources
+        panel = panel or (self.panels[0] if self.panels else None)
+        if panel is None or panel.buffer is None or not len(rows):
+            return
+        with PROFILER.span('live.ingest'):
+            events = panel.ingest(rows)
+        if events:
+            self.raise_alarm(events, panel)
+        self.schedule_frame()
+
+    def load_rules(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Load Alarm Rules", "", "JSON Files (*.json);;All Files (*)")
+        if file_path:
             try:
-                self.df = pd.read_csv(self.file_path)
-                self.plot_live_data()
+                self.rules = load_detector_rules(file_path)
             except Exception as e:
-                print(f"Live plotting error: {e}")
-            time.sleep(self.update_interval / 1000.0)
+                print(f"Failed to load alarm rules: {e}")
+
+    def raise_alarm(self, events, panel=None):
+        event = events[0]
+        source = f"{panel.name}: " if panel is not None and len(self.panels) > 1 else ""
+        where = f" at t={event['time']:.0f}" if event['time'] is not None else ""
+        more = f" (+{len(events) - 1} more)" if len(events) > 1 else ""
+        self.alarm_label.setText(f"ALARM: {source}{event['rule']}, value {event['value']:.4g}{where}{more}")
+        self.alarm_label.setStyleSheet("background-color: red; color: white; font-weight: bold;")
+        QApplication.beep()
+
+    def acknowledge_alarm(self):
+        self.alarm_label.setText("No alarms")
+        self.alarm_label.setStyleSheet("")
+
+    def window_span(self):
+        # Raw LabVIEW timestamps are in ms
+        if self.window_minutes is None:
+            return None
+        return self.window_minutes * 60 * 1000
+
+    def toggle_follow(self, state):
+        if state == Qt.Checked:
+            self.scrub_slider.setValue(1000)
+            self.scrub_label.setText("")
+        self.schedule_frame()
+
+    def scrub(self, value):
+        # Moving the slider leaves live mode and shows the recorded window ending at that point
+        if self.follow_checkbox.isChecked():
+            self.follow_checkbox.blockSignals(True)
+            self.follow_checkbox.setChecked(False)
+            self.follow_checkbox.blockSignals(False)
+        self.schedule_frame()
+
+    def window_data(self, panel, span):
+        # (x, [y...]) for one panel: the ring buffer when following, the recording when scrubbed back
+        columns = [panel.x_col] + panel.y_cols()
+        session = None if self.follow_checkbox.isChecked() else panel.session_range()
+        if session is None:
+            rows = panel.buffer.window(span)
+            arrays = [panel.buffer.column(c, rows) for c in columns]
+        else:
+            t_end = session[0] + (session[1] - session[0]) * self.scrub_slider.value() / 1000
+            self.scrub_label.setText(f"{(t_end - session[0]) / 60000:.1f} min")
+            if panel.recording.is_open():
+                panel.recording.flush_files()
+            arrays = panel.recording.read_window(columns, panel.time_column, t_end, span,
+                                                 max_points=int(self.renderer.resolution))
+        return self.renderer.decimate(arrays[0], arrays[1:])
+
+    def grid_columns(self, n_panels):
+        try:
+            return max(1, int(self.grid_cols_input.text()))
+        except ValueError:
+            return int(np.ceil(np.sqrt(n_panels))) if n_panels > 2 else 1
 
-    def plot_live_data(self):
-        # Always attempt to plot; only check for valid columns
-        x_col = self.x_combo.currentText()
-        y1_col = self.y1_combo.currentText()
-        y2_col = self.y2_combo.currentText()
-        if not x_col or not y1_col or x_col not in self.df.columns or y1_col not in self.df.columns:
+    def schedule_frame(self):
+        # Coalesce ingests from all panels into at most one frame per renderer.frame_interval()
+        if self.frame_pending:
             return
-        self.figure.clear()
-        ax = self.figure.add_subplot(111)
-        x = self.df[x_col]
-        # Plot Y1
-        if y1_col in self.df.columns:
-            ax.plot(x, self.df[y1_col], label=y1_col, color='tab:blue')
-            ax.set_ylabel(y1_col, color='tab:blue')
-            ax.tick_params(axis='y', labelcolor='tab:blue')
-        # Plot Y2 if selected and different from Y1 and present in columns
-        if y2_col and y2_col != y1_col and y2_col in self.df.columns:
-            ax2 = ax.twinx()
-            ax2.plot(x, self.df[y2_col], label=y2_col, color='tab:red')
-            ax2.set_ylabel(y2_col, color='tab:red')
-            ax2.tick_params(axis='y', labelcolor='tab:red')
-        ax.set_xlabel(x_col)
-        # ax.grid(True)  # Removed as per instructions
-        ax.legend(loc='upper left')
-        self.figure.tight_layout()
-        self.canvas.draw()
+        self.frame_pending = True
+        QTimer.singleShot(int(self.renderer.next_frame_delay() * 1000), self.plot_live_data)
 
-if __name__ == '__main__':
-    app = QApplication(sys.argv)
+    @PROFILER.method('live.frame')
+    def plot_live_data(self):
+        self.frame_pending = False
+        # Always attempt to plot; only panels with a valid column selection are drawn
+        panels = [p for p in self.panels
+                  if p.buffer is not None and p.x_col in p.columns and p.y_cols()]
+        if not panels:
+            return
+        n_cols = self.grid_columns(len(panels))
+        key = (tuple((id(p), p.x_col, tuple(p.y_cols())) for p in panels), n_cols)
+        if self.renderer.key != key:
+            layout = [(p.name, p.x_col, list(zip(p.y_cols(), ['tab:blue', 'tab:red']))) for p in panels]
+            self.renderer.setup(key, layout, n_cols)
+        span = self.window_span()
+        data = []
+        with PROFILER.span('window'):
+            for panel in panels:
+                data.append(self.window_data(panel, span))
+        with PROFILER.span('draw'):
+            self.renderer.draw_frame(data)
+        self.fps_label.setText(f"{self.renderer.fps:.1f} fps")
+        if self.metrics is not None:
+            self.metrics.on_frame()
+
+
+def main():
+    # --startup-report prints where the start-up time went once the first tab is usable
+    report = '--startup-report' in sys.argv
+    app = QApplication([arg for arg in sys.argv if arg != '--startup-report'])
     window = MainWindow()
     window.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    STARTUP.mark("window shown")
+
+    def first_tab():
+        window.switch_to_cleaner()
+        if report:
+            print(STARTUP.report())
+
+    # Build the first tab once the (empty) window is on screen, then catch up on the archives
+    QTimer.singleShot(0, first_tab)
+    QTimer.singleShot(2000, window.start_archive_scan)
+    sys.exit(app.exec())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Stand-in for the LabVIEW logger: replays an archived export into the live viewer's socket.
+
+Start the live viewer with source "TCP socket" (or "Local socket"), press Start, then run e.g.
+
+    python replay_publisher.py "Test data/Cleaned1.csv" --speed 10
+    python replay_publisher.py run.txt --speed 0 --binary      # as fast as possible
+
+Both raw LabVIEW exports and cleaned CSVs are accepted. Cleaned files store Timestamp in
+minutes; it is sent in ms like the logger does, so the live window settings behave the same.
+"""
+import argparse
+import io
+import os
+import socket
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from magtrace.dataio import load_export
+from magtrace.live import LIVE_SOCKET_NAME, LIVE_SOCKET_PORT
+
+
+def connect(transport='tcp', port=LIVE_SOCKET_PORT, name=LIVE_SOCKET_NAME):
+    # Returns a write(bytes) callable and a close() callable
+    if transport == 'tcp':
+        sock = socket.create_connection(('127.0.0.1', port))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock.sendall, sock.close
+    if sys.platform == 'win32':
+        pipe = open(r'\\.\pipe\%s' % name, 'wb', buffering=0)
+        return pipe.write, pipe.close
+    # QLocalServer puts a plain name into the temp directory
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(name if os.path.isabs(name) else os.path.join(tempfile.gettempdir(), name))
+    return sock.sendall, sock.close
+
+
+def encode_rows(rows, binary):
+    if binary:
+        return np.ascontiguousarray(rows, dtype='<f8').tobytes()
+    out = io.BytesIO()
+    np.savetxt(out, rows, fmt='%.10g', delimiter=';')
+    return out.getvalue()
+
+
+def replay(df, write, speed=1.0, binary=False, time_column='Timestamp', time_scale=1e-3):
+    """Send the rows of df paced by their timestamps (speed=0: as fast as possible).
+
+    Returns (rows sent, seconds taken).
+    """
+    columns = [str(c) for c in df.columns]
+    rows = df.to_numpy(dtype=np.float64)
+    write(("#columns;" + ";".join(columns) + "\n").encode('utf-8'))
+    if binary:
+        write(b"#binary\n")
+
+    if time_column in columns and speed > 0:
+        t = rows[:, columns.index(time_column)] * time_scale
+        t = np.nan_to_num(t - np.nanmin(t))
+        t = np.maximum.accumulate(t)  # tolerate small timestamp jitter
+    else:
+        t = None
+
+    start = time.perf_counter()
+    sent = 0
+    batch = 5000
+    while sent < len(rows):
+        if t is None:
+            stop = min(sent + batch, len(rows))
+        else:
+            now = (time.perf_counter() - start) * speed
+            stop = int(np.searchsorted(t, now, side='right'))
+            if stop <= sent:
+                time.sleep(min(0.005, (t[sent] - now) / speed))
+                continue
+        write(encode_rows(rows[sent:stop], binary))
+        sent = stop
+    return sent, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay an archived export into the live viewer socket.")
+    parser.add_argument('file', help="LabVIEW export or cleaned CSV")
+    parser.add_argument('--speed', type=float, default=1.0, help="replay speed factor, 0 = as fast as possible")
+    parser.add_argument('--transport', choices=['tcp', 'local'], default='tcp')
+    parser.add_argument('--port', type=int, default=LIVE_SOCKET_PORT)
+    parser.add_argument('--name', default=LIVE_SOCKET_NAME, help="local socket / pipe name")
+    parser.add_argument('--binary', action='store_true', help="send float64 rows instead of text lines")
+    args = parser.parse_args()
+
+    df = load_export(args.file)
+    write, close = connect(args.transport, args.port, args.name)
+    try:
+        sent, elapsed = replay(df, write, speed=args.speed, binary=args.binary)
+    finally:
+        close()
+    print(f"Sent {sent} rows in {elapsed:.2f} s ({sent / max(elapsed, 1e-9):.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
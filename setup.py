@@ -6,11 +6,13 @@ setup(
     description="HTS magnet data analysis, cleaning, and plotting. Developed in the Barnes Group, ETH Zurich.",
     author="Fionn Ferreira",
     packages=find_packages(),
+    py_modules=["main", "replay_publisher"],
     include_package_data=True,
     install_requires=[
         "PyQt5>=5.15",
+        "numpy>=1.17",
         "pandas>=1.0",
-        "matplotlib>=3.0",
+        "matplotlib>=3.5",
         "scipy>=1.5"
     ],
     entry_points={
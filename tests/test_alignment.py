@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from magtrace.alignment import cross_correlation, estimate_lag, shift_frame, shifted_values
+
+
+def random_walk(seed=0, fs=50.0, minutes=12.0):
+    # A smoothed random walk as a function of time (minutes), defined from -1 to `minutes`
+    rng = np.random.default_rng(seed)
+    n = int((minutes + 1) * 60 * fs)
+    t = np.arange(n) / fs / 60 - 1
+    walk = np.convolve(np.cumsum(rng.standard_normal(n + 49)), np.ones(50) / 50, 'valid')
+    return lambda time_min: np.interp(time_min, t, walk)
+
+
+def test_cross_correlation_matches_numpy():
+    rng = np.random.default_rng(1)
+    a, b = rng.standard_normal(37), rng.standard_normal(52)
+    lags, c = cross_correlation(a, b)
+    np.testing.assert_allclose(c, np.correlate(b, a, 'full'), atol=1e-10)
+    assert lags[0] == -36 and lags[-1] == 51
+
+
+@pytest.mark.parametrize('lag_s', [-3.7, 0.0, 2.0, 12.35])
+@pytest.mark.parametrize('decimate', [1, 8])
+def test_estimate_lag_between_channels(lag_s, decimate):
+    # 50 Hz, 10 minutes; b is a delayed by lag_s, plus noise
+    t = np.arange(30000) / 50 / 60
+    signal = random_walk()
+    a = signal(t)
+    b = signal(t - lag_s / 60) + np.random.default_rng(2).normal(0, 0.05, len(t))
+    lag = estimate_lag(t, a, t, b, decimate=decimate)
+    assert lag.lag_s == pytest.approx(lag_s, abs=0.02)
+    assert lag.correlation > 0.95
+
+
+def test_estimate_lag_across_runs():
+    # The second run started 90 s later on its own clock and lags by 1.5 s
+    signal = random_walk(seed=3, fs=20.0, minutes=17.0)
+    t = np.arange(20000) / 20 / 60
+    t_b = t[:15000] + 1.5
+    a = signal(t)
+    b = signal(t_b - 1.5 - 1.5 / 60)
+    lag = estimate_lag(t, a, t_b, b)
+    assert lag.lag_s == pytest.approx(90 + 1.5, abs=0.05)
+
+
+def test_max_lag_limits_search():
+    signal = random_walk(seed=4, fs=10.0)
+    t = np.arange(6000) / 10 / 60
+    a, b = signal(t), signal(t - 20 / 60)
+    with pytest.raises(ValueError):
+        estimate_lag(t, a, t, b, max_lag_s=-1)
+    assert estimate_lag(t, a, t, b, max_lag_s=30).lag_s == pytest.approx(20, abs=0.1)
+
+
+def test_shifts():
+    pd = pytest.importorskip('pandas')
+    t = np.linspace(0, 1, 61)
+    values = 2 * t
+    np.testing.assert_allclose(shifted_values(t, values, 6.0)[:-6], 2 * (t[:-6] + 0.1))
+    assert np.isnan(shifted_values(t, values, 6.0)[-1])
+    df = pd.DataFrame({'Timestamp': t, 'V': values})
+    shifted = shift_frame(df, 30.0)
+    np.testing.assert_allclose(shifted['Timestamp'], t + 0.5)
+    np.testing.assert_array_equal(df['Timestamp'], t)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from magtrace.analysis import RampIndex, iv_table, parse_sweep_numbers, plateau_table
+from magtrace.dataio import load_run
+from magtrace.synthetic import write_labview_export
+
+
+@pytest.fixture(scope='module')
+def run(tmp_path_factory):
+    # Two ramp cycles at 10 Hz; Ic 250 A and n 25 on CH1, CH2 reaching 1 µV 10 % earlier
+    path = tmp_path_factory.mktemp('synthetic') / 'run.txt'
+    write_labview_export(str(path), 10800, n_channels=10)
+    return load_run(str(path))
+
+
+def test_iv_table(run):
+    table = iv_table(run, 'Magna_1_current', ['CH1', 'CH2'])
+    assert list(table['ramp']) == [1, 1, 3, 3]
+    assert table['reached'].all()
+    expected_ic = {'CH1': 250.0, 'CH2': 250.0 * 1.1 ** (-1 / 25)}
+    for _, row in table.iterrows():
+        assert row['ic'] == pytest.approx(expected_ic[row['tap']], abs=1.5)
+        assert row['n_value'] == pytest.approx(25, abs=2.5)
+
+
+def test_iv_table_ramp_down(run):
+    table = iv_table(run, 'Magna_1_current', ['CH1'], direction=-1)
+    assert list(table['ramp']) == [2, 4]
+
+
+def test_plateau_table(run):
+    table = plateau_table(run, ['Magna_1_current', 'Magna_2_current'])
+    # 100, 200 and 300 A then 0 A, twice
+    np.testing.assert_allclose(table['Magna_1_current'], [100, 200, 300, 0] * 2, atol=0.1)
+    assert list(table['plateau']) == list(range(1, 9))
+    assert (table['duration_s'] > 30).all()
+    assert (table['Magna_1_current_std'] < 0.1).all()
+    # Hall sensor 1 follows the current at 2.3 mT/A
+    np.testing.assert_allclose(table['CH9(Hall sensor 1)'], 0.0023 * table['Magna_1_current'], atol=1e-3)
+    assert (table['t_end'] > table['t_start']).all()
+
+
+def test_ramp_index(run):
+    current = run['Magna_1_current'].to_numpy()
+    index = RampIndex.from_current(current, run['Timestamp'].to_numpy())
+    assert len(index) == 4
+    assert list(index.directions) == [1, -1, 1, -1]
+    number, direction = index.labels()
+    assert set(np.unique(number)) - {0} == {1, 2, 3, 4}
+    # Each sweep spans the whole 0-300 A range and moves the way it is labelled
+    for k in range(4):
+        sweep = current[number == k + 1]
+        assert sweep.max() - sweep.min() > 290
+        assert np.sign(sweep[-1] - sweep[0]) == index.directions[k]
+    np.testing.assert_array_equal(index.select(direction=1), [0, 2])
+    np.testing.assert_array_equal(index.select(numbers=(2, 3)), [1, 2])
+    np.testing.assert_array_equal(index.mask(index.select(direction=-1)), direction == -1)
+
+
+def test_parse_sweep_numbers():
+    assert parse_sweep_numbers('1-3, 7') == (1, 2, 3, 7)
+    assert parse_sweep_numbers(' ') is None
+    with pytest.raises(ValueError):
+        parse_sweep_numbers('1-x')
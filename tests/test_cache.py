@@ -0,0 +1,114 @@
+import os
+
+import numpy as np
+import pytest
+
+from magtrace.cache import DatasetCache
+
+pd = pytest.importorskip('pandas')
+
+
+@pytest.fixture
+def runs(tmp_path):
+    # Four cleaned CSVs of the same size
+    paths = []
+    for i in range(4):
+        path = str(tmp_path / f'run_{i}.csv')
+        pd.DataFrame({'Timestamp': np.arange(1000.0), 'CH1': np.full(1000, float(i))}).to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def run_bytes(path):
+    return int(pd.read_csv(path).memory_usage(deep=True).sum())
+
+
+def test_hits_and_misses(runs):
+    cache = DatasetCache(budget_bytes=10 * run_bytes(runs[0]))
+    first = cache.get(runs[0])
+    assert cache.get(runs[0]) is first
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+    assert [cache.get(path)['CH1'].iloc[0] for path in runs] == [0, 1, 2, 3]
+    assert cache.stats()['entries'] == 4
+
+
+def test_evicts_least_recently_used_within_budget(runs):
+    cache = DatasetCache(budget_bytes=int(2.5 * run_bytes(runs[0])))
+    cache.get(runs[0])
+    cache.get(runs[1])
+    cache.get(runs[0])  # run 1 is now the least recently used
+    cache.get(runs[2])
+    assert [key[0] for key in cache.entries] == [os.path.abspath(runs[i]) for i in (0, 2)]
+    assert cache.nbytes <= cache.budget and cache.stats()['evictions'] == 1
+    cache.set_budget(0)
+    assert cache.stats()['entries'] == 0 and cache.nbytes == 0
+
+
+def test_pinned_entries_stay(runs):
+    cache = DatasetCache(budget_bytes=int(1.5 * run_bytes(runs[0])))
+    pinned = cache.acquire(runs[0])
+    for path in runs[1:]:
+        cache.get(path)
+    assert cache.get(runs[0]) is pinned
+    assert cache.stats()['pinned'] == 1
+    cache.release(runs[0])
+    cache.get(runs[3])
+    cache.get(runs[2])
+    assert os.path.abspath(runs[0]) not in [key[0] for key in cache.entries]
+
+
+def test_changed_file_is_loaded_again(runs):
+    cache = DatasetCache(budget_bytes=10 * run_bytes(runs[0]))
+    old = cache.get(runs[0])
+    pd.DataFrame({'Timestamp': [0.0], 'CH1': [7.0]}).to_csv(runs[0], index=False)
+    os.utime(runs[0], (0, 0))
+    new = cache.get(runs[0])
+    assert new is not old and new['CH1'].tolist() == [7.0]
+    assert cache.stats()['entries'] == 1  # the stale version is dropped
+
+
+def test_too_large_for_the_budget_is_not_kept(runs):
+    cache = DatasetCache(budget_bytes=10)
+    assert len(cache.get(runs[0])) == 1000
+    assert cache.stats()['entries'] == 0
+
+
+def test_derived_cache():
+    from magtrace.derived import DerivedCache
+    cache = DerivedCache(budget_bytes=3 * 800)
+    first = cache.get(1, lambda: np.full(100, 1.0))
+    cache.get(2, lambda: np.full(100, 2.0))
+    assert cache.get(1, lambda: None) is first
+    cache.get(3, lambda: np.full(100, 3.0))
+    cache.get(4, lambda: np.full(100, 4.0))
+    # Byte budget of three arrays: the least recently used key (2) went out
+    assert list(cache.entries) == [1, 3, 4] and cache.nbytes == 2400
+    assert cache.hits == 1 and cache.misses == 4
+
+
+def test_derived_get_many():
+    from magtrace.derived import DerivedCache
+    cache = DerivedCache(budget_bytes=3 * 800)
+    calls = []
+
+    def compute(missing):
+        calls.append(list(missing))
+        return [np.full(100, float(key)) for key in missing]
+
+    a, b = cache.get_many([1, 2], compute)
+    assert calls == [[1, 2]] and a[0] == 1 and b[0] == 2
+    # Only the missing keys are computed, in one call
+    assert [v[0] for v in cache.get_many([2, 3, 1], compute)] == [2, 3, 1]
+    assert calls[-1] == [3]
+    assert cache.get(4, lambda: np.zeros(100)).nbytes == 800
+    assert list(cache.entries) == [1, 3, 4] and cache.nbytes == 2400
+    assert cache.hits == 2 and cache.misses == 4
+
+
+def test_get_many_loads_in_parallel(runs):
+    cache = DatasetCache(budget_bytes=10 * run_bytes(runs[0]))
+    first = cache.get(runs[0])
+    dfs = cache.get_many(runs, workers=2)
+    assert [df['CH1'].iloc[0] for df in dfs] == [0, 1, 2, 3]
+    assert dfs[0] is first
+    assert cache.stats()['entries'] == 4 and cache.stats()['hits'] == 1
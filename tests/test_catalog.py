@@ -0,0 +1,112 @@
+import os
+
+import numpy as np
+import pytest
+
+from magtrace.catalog import Catalog, detect_kind, parse_query
+from magtrace.synthetic import write_labview_export
+
+pd = pytest.importorskip('pandas')
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    return Catalog(str(tmp_path / 'catalog.sqlite'))
+
+
+def write_cleaned(path, peak_field):
+    df = pd.DataFrame({'Timestamp': np.linspace(0, 10, 101),
+                       'Magna_1_current': np.linspace(0, 300, 101),
+                       'CH9(Hall sensor 1)': np.linspace(0, peak_field, 101)})
+    df.to_csv(path, index=False)
+    return df
+
+
+def names(rows):
+    return [os.path.basename(r['path']) for r in rows]
+
+
+def test_parse_query():
+    assert parse_query('CH9(Hall sensor 1) > 5') == ('CH9(Hall sensor 1)', '>', 5.0)
+    assert parse_query('Magna_1_current<=-1e2') == ('Magna_1_current', '<=', -100.0)
+    assert parse_query('Mgn_012') is None
+
+
+def test_register_and_query(catalog, tmp_path):
+    weak = write_cleaned(tmp_path / 'Mgn_012_cleaned.csv', 2.0)
+    write_cleaned(tmp_path / 'Mgn_013_cleaned.csv', 8.0)
+    row = catalog.register(str(tmp_path / 'Mgn_012_cleaned.csv'), weak)
+    catalog.register(str(tmp_path / 'Mgn_013_cleaned.csv'))
+    assert row['kind'] == 'cleaned' and row['rows'] == 101 and row['n_channels'] == 3
+    assert row['t_start'] == 0 and row['t_end'] == 10
+    channels = {c['name']: c for c in catalog.channels(str(tmp_path / 'Mgn_013_cleaned.csv'))}
+    assert channels['CH9(Hall sensor 1)']['max'] == pytest.approx(8.0)
+
+    assert names(catalog.datasets()) == ['Mgn_012_cleaned.csv', 'Mgn_013_cleaned.csv']
+    assert names(catalog.query('CH9(Hall sensor 1) > 5')) == ['Mgn_013_cleaned.csv']
+    assert names(catalog.query('CH9(Hall sensor 1) < 1')) == ['Mgn_012_cleaned.csv', 'Mgn_013_cleaned.csv']
+    assert names(catalog.query('mgn_012')) == ['Mgn_012_cleaned.csv']
+    assert catalog.query('CH10 > 0') == []
+
+
+def test_register_skips_unchanged_files(catalog, tmp_path, monkeypatch):
+    path = str(tmp_path / 'run.csv')
+    write_cleaned(path, 2.0)
+    first = catalog.register(path)
+    assert catalog.is_current(path)
+    with monkeypatch.context() as patch:
+        patch.setattr('magtrace.dataio.load_cleaned', None)  # would fail if the file were reparsed
+        assert catalog.register(path)['content_hash'] == first['content_hash']
+    write_cleaned(path, 9.0)
+    os.utime(path, (0, 0))
+    assert not catalog.is_current(path)
+    assert catalog.register(path)['content_hash'] != first['content_hash']
+    assert catalog.query('CH9(Hall sensor 1) > 5')[0]['path'] == path
+
+
+def test_datasets_by_kind(catalog, tmp_path):
+    raw = str(tmp_path / 'export.txt')
+    write_labview_export(raw, 100, n_channels=10)
+    assert detect_kind(raw) == 'raw'
+    catalog.register(raw)
+    write_cleaned(tmp_path / 'cleaned.csv', 6.0)
+    catalog.register(str(tmp_path / 'cleaned.csv'))
+    combined = write_cleaned(tmp_path / 'combined.csv', 6.0)
+    catalog.register(str(tmp_path / 'combined.csv'), combined, kind='combined')
+    assert [r['kind'] for r in catalog.datasets()] == ['raw', 'cleaned', 'combined']
+    assert [r['kind'] for r in catalog.datasets(('cleaned', 'combined'))] == ['cleaned', 'combined']
+    assert names(catalog.datasets(('raw',))) == ['export.txt']
+
+
+def test_query_by_kind(catalog, tmp_path):
+    raw = str(tmp_path / 'export.txt')
+    write_labview_export(raw, 100, n_channels=10)
+    catalog.register(raw)
+    write_cleaned(tmp_path / 'cleaned.csv', 6.0)
+    catalog.register(str(tmp_path / 'cleaned.csv'))
+    combined = write_cleaned(tmp_path / 'combined.csv', 6.0)
+    catalog.register(str(tmp_path / 'combined.csv'), combined, kind='combined')
+    kinds = ('cleaned', 'combined')
+    assert [r['kind'] for r in catalog.query('.', kinds)] == ['cleaned', 'combined']
+    assert [r['kind'] for r in catalog.query('Magna_1_current > 1', kinds)] == ['cleaned', 'combined']
+    assert [r['kind'] for r in catalog.query('Magna_1_current > -1')] == ['raw', 'cleaned', 'combined']
+
+
+def test_combined_runs_are_read_as_cleaned_csv(catalog, tmp_path):
+    path = str(tmp_path / 'combined.csv')
+    write_cleaned(path, 6.0)
+    row = catalog.register(path, kind='combined')
+    assert row['kind'] == 'combined' and row['rows'] == 101 and row['n_channels'] == 3
+    channels = {c['name']: c for c in catalog.channels(path)}
+    assert channels['CH9(Hall sensor 1)']['max'] == pytest.approx(6.0)
+
+
+def test_missing_files_are_hidden(catalog, tmp_path):
+    path = str(tmp_path / 'run.csv')
+    write_cleaned(path, 2.0)
+    catalog.register(path)
+    os.remove(path)
+    assert catalog.datasets() == []
+    assert len(catalog.datasets(existing_only=False)) == 1
+    catalog.remove(path)
+    assert catalog.datasets(existing_only=False) == []
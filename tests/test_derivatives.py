@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from magtrace.derivatives import derivative, interp_columns, uniform_grid
+
+
+@pytest.fixture
+def irregular():
+    # sin and x^2 sampled at non-uniform x (steps from 0.003 to 0.017)
+    u = np.arange(1000) * 0.01
+    x = u + 0.7 * np.sin(u)
+    return x, np.column_stack([np.sin(x), x ** 2])
+
+
+@pytest.mark.parametrize('method, tolerance', [('gradient', 1e-4), ('savgol', 2e-3), ('resampled', 1e-3)])
+def test_matches_the_analytic_derivative(irregular, method, tolerance):
+    x, ys = irregular
+    d = derivative(x, ys, method, window=11)
+    assert d.shape == ys.shape
+    inner = slice(10, -10)
+    np.testing.assert_allclose(d[inner, 0], np.cos(x[inner]), atol=tolerance)
+    np.testing.assert_allclose(d[inner, 1], 2 * x[inner], atol=tolerance)
+
+
+def test_difference():
+    x = np.array([0.0, 1.0, 3.0, 6.0])
+    y = np.array([0.0, 2.0, 4.0, 10.0])
+    np.testing.assert_array_equal(derivative(x, y, 'difference'), [np.nan, 2.0, 1.0, 2.0])
+
+
+def test_sweeps_up_and_down():
+    # dV/dI over a current that goes up and comes back: same slope on both sweeps
+    current = np.concatenate([np.linspace(0, 100, 200), np.linspace(100, 0, 200)[1:]])
+    voltage = 0.5 * current
+    for method in ('gradient', 'savgol'):
+        d = derivative(current, voltage, method)
+        finite = np.isfinite(d)
+        assert finite.mean() > 0.95
+        np.testing.assert_allclose(d[finite], 0.5)
+    with pytest.raises(ValueError):
+        derivative(current, voltage, 'resampled')
+
+
+def test_repeated_x_gives_nan_not_inf():
+    x = np.array([0.0, 1.0, 1.0, 1.0, 2.0, 3.0])
+    d = derivative(x, x * 3, 'gradient')
+    assert not np.isinf(d).any()
+    assert np.isnan(d[2])
+
+
+def test_short_and_invalid_input():
+    assert np.isnan(derivative([1.0], [2.0])).all()
+    # A savgol window longer than the data falls back to a shorter one
+    x = np.arange(5.0)
+    np.testing.assert_allclose(derivative(x, 2 * x, 'savgol', window=51), 2.0)
+    with pytest.raises(ValueError):
+        derivative(x, x, 'spline')
+
+
+def test_grid_helpers():
+    x = np.array([0.0, 0.1, 0.2, 0.2, 0.3, 0.5])
+    np.testing.assert_allclose(uniform_grid(x), np.arange(6) * 0.1, atol=1e-12)
+    ys = np.column_stack([x, -x])
+    x_new = np.array([0.05, 0.3])
+    np.testing.assert_allclose(interp_columns(x_new, x[[0, 1, 2, 4, 5]], ys[[0, 1, 2, 4, 5]]),
+                               [[0.05, -0.05], [0.3, -0.3]])
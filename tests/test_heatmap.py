@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from magtrace.heatmap import Heatmap, bin_field, field_heatmap, run_heatmap
+
+pd = pytest.importorskip('pandas')
+
+
+def samples(seed, n=20000, low=-30, high=60):
+    rng = np.random.default_rng(seed)
+    current_1 = rng.uniform(low, high, n)
+    current_2 = rng.uniform(low / 2, high / 2, n)
+    return current_1, current_2, rng.normal(current_1 + current_2, 1.0)
+
+
+def assert_same(a, b):
+    assert (a.step, a.x0, a.y0) == (b.step, b.x0, b.y0)
+    np.testing.assert_array_equal(a.count, b.count)
+    np.testing.assert_allclose(a.total, b.total)
+    np.testing.assert_array_equal(a.max, b.max)
+
+
+def test_bin_field_matches_histogram2d():
+    current_1, current_2, values = samples(0)
+    values[::97] = np.nan
+    heatmap = bin_field(current_1, current_2, values, step=2.5)
+    valid = np.isfinite(values)
+    edges = heatmap.x_edges, heatmap.y_edges
+    count, _, _ = np.histogram2d(current_1[valid], current_2[valid], edges)
+    total, _, _ = np.histogram2d(current_1[valid], current_2[valid], edges, weights=values[valid])
+    np.testing.assert_array_equal(heatmap.count, count)
+    with np.errstate(invalid='ignore'):
+        np.testing.assert_allclose(heatmap.mean, total / count)
+    np.testing.assert_array_equal(heatmap.values('count'), heatmap.count)
+
+
+def test_bin_field_max_matches_brute_force():
+    current_1, current_2, values = samples(1, n=3000)
+    heatmap = bin_field(current_1, current_2, values, step=5.0)
+    peak = np.full(heatmap.count.shape, np.nan)
+    for c1, c2, v in zip(current_1, current_2, values):
+        i, j = int(np.floor(c1 / 5.0)) - heatmap.x0, int(np.floor(c2 / 5.0)) - heatmap.y0
+        peak[i, j] = v if np.isnan(peak[i, j]) else max(peak[i, j], v)
+    np.testing.assert_array_equal(heatmap.values('max'), peak)
+    assert np.isnan(heatmap.mean[heatmap.count == 0]).all()
+
+
+def test_merge_equals_binning_together():
+    # Overlapping but different ranges, so the merged grid is larger than either part
+    a = samples(2, low=-30, high=20)
+    b = samples(3, low=0, high=60)
+    together = bin_field(*(np.concatenate([x, y]) for x, y in zip(a, b)), step=2.0)
+    merged = bin_field(*a, step=2.0).merge(bin_field(*b, step=2.0))
+    assert_same(merged, together)
+    assert Heatmap.empty(2.0).merge(merged) is merged
+
+
+def test_swapped_exchanges_the_currents():
+    current_1, current_2, values = samples(4)
+    df = pd.DataFrame({'Magna_1_current': current_1, 'Magna_2_current': current_2, 'B': values})
+    swapped = run_heatmap(df, 'B', step=2.0, swapped=True)
+    assert_same(swapped, bin_field(current_2, current_1, np.abs(values), step=2.0))
+    normal = run_heatmap(df, 'B', step=2.0)
+    np.testing.assert_array_equal(swapped.count, normal.count.T)
+
+
+def test_field_heatmap_of_several_runs():
+    a, b = samples(5), samples(6)
+    runs = {name: pd.DataFrame({'Magna_1_current': c1, 'Magna_2_current': c2, 'B': v})
+            for name, (c1, c2, v) in (('a', a), ('b', b))}
+    heatmap = field_heatmap(runs, 'B', step=3.0, swapped=['b'], workers=2)
+    expected = bin_field(np.concatenate([a[0], b[1]]), np.concatenate([a[1], b[0]]),
+                         np.abs(np.concatenate([a[2], b[2]])), step=3.0)
+    assert_same(heatmap, expected)
+    table = heatmap.frame()
+    assert len(table) == (heatmap.count > 0).sum() and table['count'].sum() == 40000
+
+
+def test_missing_second_current_maps_at_zero():
+    df = pd.DataFrame({'Magna_1_current': np.linspace(0, 10, 101), 'B': np.ones(101)})
+    heatmap = run_heatmap(df, 'B', step=1.0)
+    assert heatmap.count.shape == (11, 1) and heatmap.y0 == 0
+
+
+def test_interpolated_fills_holes_inside_the_measured_area():
+    # A plane on a 10 x 10 grid with the centre cells missing
+    x, y = np.meshgrid(np.arange(10) + 0.5, np.arange(10) + 0.5, indexing='ij')
+    keep = ~((np.abs(x - 5) < 2) & (np.abs(y - 5) < 2))
+    heatmap = bin_field(x[keep], y[keep], (2 * x + y)[keep], step=1.0)
+    filled = heatmap.interpolated()
+    np.testing.assert_allclose(filled, 2 * x + y)
+    # All cells on one line: nothing to interpolate, the gaps stay NaN
+    line = bin_field([0.5, 1.5, 5.5, 9.5], [0.5] * 4, [1.0, 2.0, 3.0, 4.0], step=1.0)
+    assert np.isnan(line.interpolated()[2:5, 0]).all()
+
+
+def test_interpolated_only_ignores_degenerate_grids(monkeypatch):
+    def broken(*args, **kwargs):
+        raise TypeError('bug in the caller')
+
+    monkeypatch.setattr('scipy.interpolate.griddata', broken)
+    heatmap = bin_field([0.5, 5.5, 0.5, 5.5], [0.5, 0.5, 5.5, 5.5], [1.0, 2.0, 3.0, 4.0], step=1.0)
+    with pytest.raises(TypeError):
+        heatmap.interpolated()
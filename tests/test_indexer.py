@@ -0,0 +1,132 @@
+import os
+
+import pytest
+
+from magtrace.catalog import Catalog
+from magtrace.indexer import ArchiveIndexer, export_kind
+from magtrace.synthetic import write_labview_export
+
+pd = pytest.importorskip('pandas')
+
+
+def write_cleaned(path, rows=10):
+    pd.DataFrame({'Timestamp': range(rows), 'CH1': range(rows)}).to_csv(path, index=False)
+
+
+def touch(path, mtime):
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def archive(tmp_path):
+    # Magnets/Mgn_1 with an export, its cleaned CSV and a note; Mgn_2 empty; folders to skip
+    root = tmp_path / 'Magnets'
+    for folder in ('Mgn_1', 'Mgn_2', '.sync', 'Mgn_1/run.txt.magrec'):
+        (root / folder).mkdir(parents=True)
+    write_labview_export(str(root / 'Mgn_1' / 'run.txt'), 100, n_channels=10)
+    write_cleaned(root / 'Mgn_1' / 'run_cleaned.csv')
+    (root / 'Mgn_1' / 'notes.txt').write_text('magnet quenched at 250 A\n\n\n')
+    write_cleaned(root / '.sync' / 'hidden_cleaned.csv')
+    write_cleaned(root / 'Mgn_1' / 'run.txt.magrec' / 'inside.csv')
+    return root
+
+
+@pytest.fixture
+def indexer(tmp_path):
+    return ArchiveIndexer(Catalog(str(tmp_path / 'catalog.sqlite')))
+
+
+def indexed(indexer, root):
+    return sorted(os.path.relpath(r['path'], root) for r in indexer.catalog.datasets())
+
+
+def test_export_kind(archive):
+    assert export_kind(str(archive / 'Mgn_1' / 'run.txt')) == 'raw'
+    assert export_kind(str(archive / 'Mgn_1' / 'run_cleaned.csv')) == 'cleaned'
+    assert export_kind(str(archive / 'Mgn_1' / 'notes.txt')) is None
+
+
+def test_first_scan(archive, indexer):
+    counts = indexer.scan(str(archive))
+    assert counts['new'] == 2 and counts['ignored'] == 1 and counts['folders_listed'] == 3
+    assert indexed(indexer, archive) == [os.path.join('Mgn_1', 'run.txt'), os.path.join('Mgn_1', 'run_cleaned.csv')]
+    kinds = {os.path.basename(r['path']): r['kind'] for r in indexer.catalog.datasets()}
+    assert kinds == {'run.txt': 'raw', 'run_cleaned.csv': 'cleaned'}
+    assert indexer.roots() == [str(archive)]
+
+
+def test_rescans_only_open_what_changed(archive, indexer):
+    indexer.scan(str(archive))
+    counts = indexer.scan(str(archive))
+    assert counts['unchanged'] == 3 and counts['folders_listed'] == 0
+    assert counts['new'] == counts['changed'] == counts['removed'] == 0
+
+    # A file rewritten in place: its folder listing is unchanged, the file is reopened
+    folder = archive / 'Mgn_1'
+    folder_mtime = os.stat(folder).st_mtime
+    write_cleaned(folder / 'run_cleaned.csv', rows=20)
+    touch(folder, folder_mtime)
+    counts = indexer.scan(str(archive))
+    assert counts['changed'] == 1 and counts['unchanged'] == 2 and counts['folders_listed'] == 0
+    assert indexer.catalog.get(str(folder / 'run_cleaned.csv'))['rows'] == 20
+
+    # A new file and a removed file: only the folders whose mtime changed are listed
+    write_cleaned(archive / 'Mgn_2' / 'second_cleaned.csv')
+    touch(archive / 'Mgn_2', folder_mtime + 10)
+    os.remove(folder / 'run.txt')
+    touch(folder, folder_mtime + 10)
+    counts = indexer.scan(str(archive))
+    assert counts['new'] == 1 and counts['removed'] == 1 and counts['folders_listed'] == 2
+    assert indexed(indexer, archive) == [os.path.join('Mgn_1', 'run_cleaned.csv'),
+                                         os.path.join('Mgn_2', 'second_cleaned.csv')]
+
+
+def test_full_rescan_finds_files_behind_unchanged_folder_mtimes(archive, indexer):
+    indexer.scan(str(archive))
+    folder = archive / 'Mgn_2'
+    mtime = os.stat(folder).st_mtime
+    write_cleaned(folder / 'late_cleaned.csv')
+    touch(folder, mtime)  # a drive that does not update folder mtimes
+    assert indexer.scan(str(archive))['new'] == 0
+    counts = indexer.scan(str(archive), quick=False)
+    assert counts['new'] == 1 and counts['folders_listed'] == 3
+
+
+def test_stopped_scan_keeps_what_it_had(archive, indexer):
+    indexer.scan(str(archive))
+    counts = indexer.scan(str(archive), quick=False, should_stop=lambda: True)
+    assert counts['removed'] == 0
+    assert len(indexed(indexer, archive)) == 2
+
+
+def test_find_cleaned_csv_and_remove_root(archive, indexer):
+    assert indexer.find_cleaned_csv(str(archive / 'Mgn_1')) == str(archive / 'Mgn_1' / 'run_cleaned.csv')
+    assert indexer.find_cleaned_csv(str(archive / 'Mgn_2')) is None
+    assert indexer.roots() == []  # looking up a folder does not make it a root
+    assert len(indexed(indexer, archive)) == 2
+    indexer.scan(str(archive))
+    indexer.remove_root(str(archive))
+    assert indexer.catalog.datasets() == []
+    assert str(archive) not in indexer.roots()
+
+
+def test_nested_roots(archive, indexer):
+    # A folder inside an indexed root is covered by it
+    indexer.scan(str(archive))
+    assert indexer.add_root(str(archive / 'Mgn_1')) == str(archive)
+    assert indexer.scan(str(archive / 'Mgn_1'))['unchanged'] == 3
+    assert indexer.roots() == [str(archive)]
+    assert indexer.root_of(str(archive / 'Mgn_2')) == str(archive)
+    assert indexer.root_of(str(archive) + '_old') is None
+
+
+def test_enclosing_root_takes_over_nested_roots(archive, indexer):
+    indexer.scan(str(archive / 'Mgn_1'))
+    indexer.scan(str(archive / 'Mgn_2'))
+    assert indexer.roots() == [str(archive / 'Mgn_1'), str(archive / 'Mgn_2')]
+    counts = indexer.scan(str(archive))
+    assert indexer.roots() == [str(archive)]
+    # The files indexed under Mgn_1 are not opened again
+    assert counts['unchanged'] == 3 and counts['new'] == 0
+    indexer.remove_root(str(archive))
+    assert indexer.catalog.datasets() == []
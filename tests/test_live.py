@@ -0,0 +1,89 @@
+import types
+
+import numpy as np
+import pytest
+
+from magtrace import live
+from magtrace.live import LiveRingBuffer, ReplayMetrics, load_live_history
+
+
+def rows(first, n, n_columns=3):
+    # Row i holds (i, 10 i, 100 i), so the time column (0) increases by 1 per row
+    return np.arange(first, first + n)[:, np.newaxis] * np.array([1.0, 10.0, 100.0][:n_columns])
+
+
+@pytest.mark.parametrize('batches', [[1] * 25, [3, 7, 2, 9, 4], [25], [4, 30, 1]])
+def test_keeps_the_latest_rows(batches):
+    buffer = LiveRingBuffer(['t', 'a', 'b'], capacity=10, time_column='t')
+    first = 0
+    for n in batches:
+        buffer.append(rows(first, n))
+        first += n
+        np.testing.assert_array_equal(buffer.view(), rows(max(0, first - 10), min(first, 10)))
+    assert len(buffer) == min(first, 10)
+    assert buffer.total_rows == first
+    np.testing.assert_array_equal(buffer.column('a'), 10 * np.arange(first - 10, first))
+    # The view is one contiguous slice of the doubled storage, not a copy
+    assert np.shares_memory(buffer.view(), buffer._data)
+
+
+def test_single_row_and_empty_batches():
+    buffer = LiveRingBuffer(['t', 'a', 'b'], capacity=4)
+    buffer.append(np.zeros((0, 3)))
+    assert len(buffer) == 0 and len(buffer.view()) == 0
+    buffer.append([1.0, 2.0, 3.0])
+    np.testing.assert_array_equal(buffer.view(), [[1.0, 2.0, 3.0]])
+
+
+def test_window():
+    buffer = LiveRingBuffer(['t', 'a', 'b'], capacity=50, time_column='t')
+    buffer.append(rows(0, 80))
+    np.testing.assert_array_equal(buffer.window(5)[:, 0], np.arange(74, 80))
+    assert len(buffer.window(None)) == 50
+    assert len(buffer.window(1000)) == 50
+
+
+def test_history_holds_the_evicted_rows(tmp_path):
+    pytest.importorskip('pandas')
+    path = str(tmp_path / 'run.txt.history.bin')
+    buffer = LiveRingBuffer(['t', 'a', 'b'], capacity=10, time_column='t', history_path=path)
+    for first, n in ((0, 6), (6, 6), (12, 25), (37, 3)):
+        buffer.append(rows(first, n))
+    buffer.close()
+    history = load_live_history(path)
+    assert list(history.columns) == ['t', 'a', 'b']
+    assert buffer.history_rows == len(history) == 30
+    np.testing.assert_array_equal(np.vstack([history.to_numpy(), buffer.view()]), rows(0, 40))
+
+
+def test_replay_metrics_dropped_frames(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(live, 'time', types.SimpleNamespace(perf_counter=lambda: clock[0]))
+    metrics = ReplayMetrics(target_fps=10)
+
+    def ingest(t, due=None):
+        clock[0] = t
+        metrics.on_ingest(100, t if due is None else due)
+
+    def frame(t):
+        clock[0] = t
+        metrics.on_frame()
+        return metrics.dropped_frames
+
+    ingest(0.0)
+    assert frame(0.05) == 0
+    ingest(0.1)
+    assert frame(0.15) == 0
+    # Drawn 0.35 s after the data arrived: three 100 ms slots went by without a frame
+    ingest(0.2)
+    assert frame(0.55) == 3
+    assert frame(0.6) == 3  # nothing was waiting
+    # Counted from the later of the last frame and the oldest waiting batch
+    ingest(0.9)
+    ingest(1.0)
+    assert frame(1.26) == 6
+    ingest(1.3, due=1.1)  # due before the last frame
+    assert frame(1.42) == 7
+    summary = metrics.summary()
+    assert summary['frames'] == 6 and summary['rows'] == 600
+    assert summary['latency_ms_p50'] == pytest.approx(290)
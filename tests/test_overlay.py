@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from magtrace.overlay import Overlay, bin_by_current, overlay_runs, run_curve
+
+pd = pytest.importorskip('pandas')
+
+
+def brute_force(current, values, step):
+    # Mean, std and count per bin with a loop over the bins
+    bins = np.floor(current / step).astype(int)
+    out = {}
+    for b in np.unique(bins):
+        v = values[bins == b]
+        out[b] = [(np.nanmean(col), np.nanstd(col), np.isfinite(col).sum()) for col in v.T]
+    return out
+
+
+def test_bin_by_current_matches_brute_force():
+    rng = np.random.default_rng(0)
+    current = rng.uniform(-20, 50, 5000)
+    values = np.column_stack([current * 2 + rng.normal(size=5000), rng.normal(size=5000)])
+    values[rng.integers(0, 5000, 100), 1] = np.nan
+    first, mean, std, count = bin_by_current(current, values, step=2.5)
+    expected = brute_force(current, values, 2.5)
+    assert first == min(expected) and len(mean) == max(expected) - min(expected) + 1
+    for b, columns in expected.items():
+        for j, (m, s, n) in enumerate(columns):
+            assert mean[b - first, j] == pytest.approx(m)
+            assert std[b - first, j] == pytest.approx(s, abs=1e-9)
+            assert count[b - first, j] == n
+
+
+def test_direction_keeps_one_sweep_direction():
+    # Up 0 -> 100 A at V = I, down again at V = I + 10 (hysteresis)
+    up = np.linspace(0, 100, 1001)
+    df = pd.DataFrame({'Timestamp': np.arange(2002) / 600,
+                       'I': np.concatenate([up, up[::-1]]),
+                       'V': np.concatenate([up, up[::-1] + 10])})
+    first_up, mean_up, _, _ = run_curve(df, 'I', ['V'], step=10, direction=1)
+    first_down, mean_down, _, _ = run_curve(df, 'I', ['V'], step=10, direction=-1)
+    assert first_up == first_down == 0
+    n = min(len(mean_up), len(mean_down))
+    np.testing.assert_allclose(mean_down[:n] - mean_up[:n], 10, atol=0.5)
+
+
+def test_overlay_of_runs_on_a_common_grid():
+    a = pd.DataFrame({'I': np.linspace(0, 10, 101), 'B': np.linspace(0, 10, 101) * 2})
+    b = pd.DataFrame({'I': np.linspace(5, 20, 151), 'B': np.linspace(5, 20, 151) * 2 + 1})
+    overlay = overlay_runs({'a': a, 'b': b}, 'I', 'B', step=1.0, workers=2)
+    assert overlay.names == ['a', 'b'] and overlay.mean.shape == (2, 21, 1)
+    np.testing.assert_allclose(overlay.centres, np.arange(21) + 0.5)
+    centres, mean, _ = overlay.curve('b')
+    assert centres[0] == 5.5 and centres[-1] == 20.5
+    delta, spread = overlay.difference('a', 'b')
+    np.testing.assert_allclose(delta[5:10], 1.0, atol=1e-9)
+    assert np.isnan(delta[:5]).all() and np.isnan(delta[11:]).all()
+    table = overlay.frame()
+    assert list(table.columns) == ['run', 'current', 'B', 'B_std', 'B_count']
+    assert len(table) == 11 + 16
+
+
+def test_interpolate_fills_gaps_inside_a_run():
+    current = np.array([0.5, 1.5, 4.5, 5.5])
+    curve = bin_by_current(current, current * 3, step=1.0)
+    filled = Overlay(['run'], ['V'], 1.0, [curve], interpolate=True)
+    np.testing.assert_allclose(filled.mean[0, :, 0], [1.5, 4.5, 7.5, 10.5, 13.5, 16.5])
+    assert np.isnan(Overlay(['run'], ['V'], 1.0, [curve]).mean[0, 2:4, 0]).all()
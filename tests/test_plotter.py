@@ -0,0 +1,72 @@
+"""Plotter tab checks, run headless (Qt offscreen platform)."""
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip('PyQt5')
+pytest.importorskip('matplotlib')
+pd = pytest.importorskip('pandas')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from magtrace.synthetic import write_labview_export  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def plotter(app, tmp_path, monkeypatch):
+    monkeypatch.setenv('MAGTRACE_CATALOG', str(tmp_path / 'catalog.sqlite'))
+    import main
+    window = main.MainWindow()
+    yield window, window.show_tab(1)
+    window.close()
+
+
+def select(plotter, path):
+    paths = [plotter.file_list.item(i).text() for i in range(plotter.file_list.count())]
+    plotter.file_list.setCurrentRow(paths.index(path))
+    plotter.load_file()
+
+
+def test_lists_only_cleaned_and_combined_runs(plotter, tmp_path):
+    window, tab = plotter
+    raw = str(tmp_path / 'export.txt')
+    write_labview_export(raw, 100, n_channels=10)
+    cleaned = str(tmp_path / 'cleaned.csv')
+    pd.DataFrame({'Timestamp': [0.0, 1.0], 'CH1': [0.0, 1.0]}).to_csv(cleaned, index=False)
+    for path in (raw, cleaned):
+        window.catalog.register(path)
+    tab.update_file_list()
+    assert [tab.file_list.item(i).text() for i in range(tab.file_list.count())] == [cleaned]
+
+
+def test_resistance_follows_time_shift(plotter, tmp_path):
+    # V is 62.5 µΩ x I, recorded 2 s late; after aligning, the resistance is constant
+    window, tab = plotter
+    rng = np.random.default_rng(0)
+    t = np.arange(60000) / 50 / 60
+    current = np.convolve(np.cumsum(rng.standard_normal(len(t))), np.ones(200) / 200, 'same') + 150
+    df = pd.DataFrame({'Timestamp': t, 'I': current, 'V': np.interp(t - 2.0 / 60, t, current) * 0.0625})
+    path = str(tmp_path / 'shifted.csv')
+    df.to_csv(path, index=False)
+    window.catalog.register(path, df, kind='cleaned')
+    tab.update_file_list()
+    select(tab, path)
+    tab.x_axis_combo.setCurrentText('Timestamp')
+    tab.y1_axis_combo.setCurrentText('I')
+    tab.enable_resistance_checkbox.setChecked(True)
+    tab.voltage_combo.setCurrentText('V')
+    tab.current_combo.setCurrentText('I')
+    tab.plot_selected()
+    before = tab.figure.axes[1].lines[0].get_ydata().copy()
+    tab.align_channels()
+    after = tab.figure.axes[1].lines[0].get_ydata()
+    assert tab.time_shifts['V'] == pytest.approx(2.0, abs=0.05)
+    assert np.nanstd(after) < 1e-3 * np.nanstd(before)
+    assert '62.50' in tab.r100a_label.text()
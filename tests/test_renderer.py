@@ -0,0 +1,37 @@
+"""Adaptive quality of the live renderer, with stand-in canvases (no window is shown)."""
+import types
+
+import pytest
+
+pytest.importorskip('PyQt5')
+pytest.importorskip('matplotlib')
+
+
+def renderer(canvas):
+    from main import LiveRenderer
+    canvas.mpl_connect = lambda event, callback: None
+    return LiveRenderer(None, canvas, target_fps=20)
+
+
+def slow_frames(r, n=30):
+    for i in range(n):
+        r._adapt(start=float(i), elapsed=0.2)
+
+
+def test_lowers_points_then_dpi():
+    ratios = []
+    canvas = types.SimpleNamespace(devicePixelRatioF=lambda: 2.0,
+                                   _set_device_pixel_ratio=lambda ratio: ratios.append(ratio) and False)
+    r = renderer(canvas)
+    slow_frames(r)
+    assert r.resolution == r.min_resolution
+    assert r.render_scale == 0.5 and ratios == [1.4, 1.0]
+
+
+def test_without_pixel_ratio_only_points_adapt():
+    # matplotlib < 3.5 canvases have no _set_device_pixel_ratio
+    r = renderer(types.SimpleNamespace(devicePixelRatioF=lambda: 1.0))
+    slow_frames(r)
+    assert r.resolution == r.min_resolution and r.render_scale == 1.0
+    r.set_render_scale(0.5)
+    assert r.render_scale == 1.0
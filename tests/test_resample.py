@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from magtrace.resample import Resampler, resample
+
+
+def uneven_run(n=5000, seed=0):
+    # Timestamps in minutes with jitter, a gap and a few NaN values
+    rng = np.random.default_rng(seed)
+    t = np.cumsum(rng.uniform(0.01, 0.03, n)) / 60
+    t[2000:] += 0.5
+    values = np.column_stack([np.sin(t * 20), rng.normal(size=n)])
+    values[rng.integers(0, n, 50), 1] = np.nan
+    return t, values
+
+
+@pytest.mark.parametrize('how', ['mean', 'min', 'max', 'last', 'linear'])
+@pytest.mark.parametrize('chunk', [1, 7, 1000])
+def test_chunks_match_one_pass(how, chunk):
+    t, values = uneven_run()
+    grid, expected = resample(t, values, 0.5, how)
+    resampler = Resampler(0.5, how)
+    parts = [resampler.feed(t[i:i + chunk], values[i:i + chunk]) for i in range(0, len(t), chunk)]
+    parts.append(resampler.flush())
+    np.testing.assert_array_equal(np.concatenate([p[0] for p in parts]), grid)
+    np.testing.assert_array_equal(np.concatenate([p[1] for p in parts if len(p[0])]), expected)
+
+
+def test_mean_matches_pandas():
+    pd = pytest.importorskip('pandas')
+    t, values = uneven_run()
+    grid, out = resample(t, values[:, 0], 1.0, 'mean')
+    # Both grids start at the first sample
+    expected = pd.Series(values[:, 0], index=pd.to_timedelta(t, unit='min')).resample('1s').mean()
+    np.testing.assert_allclose(out, expected.to_numpy())
+    np.testing.assert_allclose(grid, expected.index.total_seconds().to_numpy() / 60)
+
+
+def test_empty_intervals_are_nan():
+    grid, out = resample(np.array([0.0, 1.0]), np.array([1.0, 2.0]), 15.0)
+    assert len(grid) == 5
+    np.testing.assert_array_equal(out, [1.0, np.nan, np.nan, np.nan, 2.0])
+
+
+def test_rejects_unknown_aggregation():
+    with pytest.raises(ValueError):
+        Resampler(1.0, 'median')
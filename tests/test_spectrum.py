@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from magtrace.spectrum import WelchAccumulator, welch_file, welch_frame
+
+signal = pytest.importorskip('scipy.signal')
+pd = pytest.importorskip('pandas')
+
+FS = 1000.0
+
+
+@pytest.fixture
+def run():
+    # 20 s at 1 kHz: 50 Hz pickup on CH1, 120 Hz on CH2, white noise on both
+    rng = np.random.default_rng(0)
+    t = np.arange(20000) / FS
+    return pd.DataFrame({'Timestamp': t / 60,
+                         'CH1': np.sin(2 * np.pi * 50 * t) + rng.normal(0, 0.1, len(t)),
+                         'CH2': 0.2 * np.sin(2 * np.pi * 120 * t) + rng.normal(0, 0.1, len(t))})
+
+
+@pytest.mark.parametrize('nperseg, overlap', [(1024, 0.5), (1000, 0.5), (256, 0.0), (512, 0.75)])
+def test_matches_scipy_welch(run, nperseg, overlap):
+    spectrum = welch_frame(run, ['CH1', 'CH2'], nperseg=nperseg, overlap=overlap)
+    values = run[['CH1', 'CH2']].to_numpy()
+    freqs, psd = signal.welch(values, FS, nperseg=nperseg, noverlap=int(nperseg * overlap), axis=0)
+    assert spectrum.fs == pytest.approx(FS)
+    np.testing.assert_allclose(spectrum.freqs, freqs)
+    np.testing.assert_allclose(spectrum.psd, psd, rtol=1e-9, atol=1e-15)
+
+
+def test_blocks_match_one_pass(run):
+    one = welch_frame(run, ['CH1', 'CH2'], nperseg=1024, spectrogram=True)
+    blocks = welch_frame(run, ['CH1', 'CH2'], nperseg=1024, spectrogram=True, block_rows=777)
+    np.testing.assert_allclose(blocks.psd, one.psd, rtol=1e-12)
+    np.testing.assert_allclose(blocks.spec, one.spec, rtol=1e-6)
+    np.testing.assert_allclose(blocks.times, one.times)
+
+
+def test_spectrogram_matches_scipy(run):
+    spectrum = welch_frame(run, ['CH1'], nperseg=1000, overlap=0.5, spectrogram=True)
+    freqs, times, spec = signal.spectrogram(run['CH1'].to_numpy(), FS, window='hann', nperseg=1000,
+                                            noverlap=500)
+    np.testing.assert_allclose(spectrum.spec[:, :, 0].T, spec, rtol=1e-5, atol=1e-12)
+    np.testing.assert_allclose(spectrum.times * 60, times, atol=1e-9)
+
+
+def test_spectrogram_columns_are_bounded(run):
+    spectrum = welch_frame(run, ['CH1'], nperseg=64, spectrogram=True, max_columns=50)
+    assert len(spectrum.spec) <= 50
+    np.testing.assert_allclose(np.nanmean(spectrum.spec[:, :, 0], axis=0), spectrum.psd[:, 0], rtol=0.05)
+
+
+def test_nan_segments_and_gaps_are_skipped(run):
+    values = run['CH1'].to_numpy().copy()
+    values[5000] = np.nan
+    accumulator = WelchAccumulator(FS, nperseg=1000, overlap=0.0)
+    accumulator.feed(values[:, np.newaxis])
+    # Segment 5 (rows 5000-5999) is left out
+    assert accumulator.result().counts[0] == 19
+    clean = np.delete(run['CH1'].to_numpy(), np.s_[5000:6000])
+    _, psd = signal.welch(clean, FS, nperseg=1000, noverlap=0)
+    np.testing.assert_allclose(accumulator.result().psd[:, 0], psd, rtol=1e-9)
+    # A time gap (excluded region) starts a new segment instead of joining both sides
+    gapped = run.drop(index=range(5900, 6100))  # 19 segments if the sides were joined
+    assert welch_frame(gapped, ['CH1'], nperseg=1000, overlap=0.0).counts[0] == 18
+
+
+def test_peaks(run):
+    spectrum = welch_frame(run, ['CH1', 'CH2'], nperseg=2000)
+    assert spectrum.peaks('CH1')[0][0] == pytest.approx(50.0)
+    assert spectrum.peaks('CH2', count=1)[0][0] == pytest.approx(120.0)
+
+
+def test_welch_file_matches_loaded_run(tmp_path):
+    from magtrace.dataio import load_run
+    from magtrace.synthetic import write_labview_export
+    path = str(tmp_path / 'run.txt')
+    write_labview_export(path, 5000, n_channels=8)
+    streamed = welch_file(path, ['CH1', 'CH2'], nperseg=256, chunk_rows=1234)
+    loaded = welch_frame(load_run(path), ['CH1', 'CH2'], nperseg=256)
+    assert streamed.fs == pytest.approx(10.0)
+    np.testing.assert_allclose(streamed.psd, loaded.psd, rtol=1e-9)
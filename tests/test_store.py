@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+import pytest
+
+from magtrace.store import ColumnStore, find_recording
+
+
+def record(path, data, batches=(1, 63, 200, 4097, 7)):
+    # Append data (n, 3) in uneven batches, cycling through the sizes
+    store = ColumnStore.create(path, ['Timestamp', 'CH1', 'CH2'], source='run.txt')
+    start, i = 0, 0
+    while start < len(data):
+        n = batches[i % len(batches)]
+        store.append(data[start:start + n])
+        start += n
+        i += 1
+    return store
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    n = 300000
+    return np.column_stack([np.arange(n) * 10.0, rng.normal(size=n), np.cumsum(rng.normal(size=n))])
+
+
+def test_columns_round_trip(tmp_path, data):
+    path = str(tmp_path / 'run.txt.magrec')
+    record(path, data).close(source_size=123)
+    store = ColumnStore.open(path)
+    assert len(store) == len(data) and store.complete and store.source_size == 123
+    np.testing.assert_array_equal(store.read('CH1'), data[:, 1])
+    np.testing.assert_array_equal(store.read('CH2', 1000, 1010), data[1000:1010, 2])
+    np.testing.assert_array_equal(store.to_dataframe().to_numpy(), data)
+
+
+def test_pyramid_levels_match_brute_force(tmp_path, data):
+    store = record(str(tmp_path / 'run.magrec'), data)
+    store.close()
+    for level in range(store.pyramid.levels):
+        size = store.pyramid.block ** (level + 1)
+        n_blocks = len(data) // size
+        assert store.pyramid.blocks(level) == n_blocks
+        mins, maxs = store.pyramid.read(level, 0, n_blocks)
+        blocks = data[:n_blocks * size].reshape(n_blocks, size, 3)
+        np.testing.assert_array_equal(mins, blocks.min(axis=1))
+        np.testing.assert_array_equal(maxs, blocks.max(axis=1))
+
+
+def test_read_window(tmp_path, data):
+    store = record(str(tmp_path / 'run.magrec'), data)
+    store.flush()
+    # Fits the point budget: the raw rows with t_end - span <= t <= t_end
+    t, y = store.read_window(['Timestamp', 'CH1'], 'Timestamp', 50000.0, 1000.0, max_points=2000)
+    np.testing.assert_array_equal(t, data[4900:5001, 0])
+    np.testing.assert_array_equal(y, data[4900:5001, 1])
+    # Too many rows: min/max pairs, which keep the extremes of the window
+    t, y = store.read_window(['Timestamp', 'CH2'], 'Timestamp', 2500000.0, 2000000.0, max_points=2000)
+    window = data[50000:250001]
+    assert len(y) < 4 * 2000
+    assert y.min() == window[:, 2].min() and y.max() == window[:, 2].max()
+    assert t[0] == window[0, 0] and t[-1] == window[-1, 0]
+    assert np.all(np.diff(t) >= 0)
+    store.close()
+
+
+def test_find_recording(tmp_path, data):
+    source = tmp_path / 'run.txt'
+    source.write_text('x' * 100)
+    path = str(source) + '.magrec'
+    store = record(path, data[:1000])
+    store.flush()
+    assert find_recording(str(source)) is None  # still recording
+    store.close(source_size=100)
+    assert find_recording(str(source)) == path
+    assert find_recording(os.path.join(path, 'meta.json')) == path
+    source.write_text('x' * 200)  # the export grew after the recording stopped
+    assert find_recording(str(source)) is None
+
+
+def test_flush_files_leaves_meta_alone(tmp_path, data):
+    source = tmp_path / 'run.txt'
+    source.write_text('x' * 100)
+    path = str(source) + '.magrec'
+    store = record(path, data[:1000])
+    meta = os.path.join(path, 'meta.json')
+    os.utime(meta, (0, 0))
+    store.flush_files()
+    # Readable from the column files while recording, without rewriting meta.json
+    np.testing.assert_array_equal(np.fromfile(store.column_path(1)), data[:1000, 1])
+    assert os.path.getmtime(meta) == 0
+    store.close(source_size=100)
+    store.flush_files()  # e.g. scrubbing back after Stop
+    assert find_recording(str(source)) == path